@@ -0,0 +1,157 @@
+import importlib.util
+import json
+import logging
+import os
+import tempfile
+
+# Increase whenever the way converted files are prepared changes so stale files are not reused
+ARROW_FORMAT_VERSION = 2
+
+# Schema metadata key holding the details of the conversion
+ARROW_METADATA_KEY = b"pvaccompare"
+
+
+def get_arrow_path(input_file):
+    """
+    Purpose:    Get the location of the converted Arrow IPC file of a tsv file, which is kept next to it
+    Modifies:   Nothing
+    Returns:    String of the Arrow file path
+    """
+    return f"{input_file}.arrow"
+
+
+def get_source_stamp(input_file):
+    """
+    Purpose:    Get the size and modification time of a tsv file, used to check that its converted file is up to date
+    Modifies:   Nothing
+    Returns:    List of the size and the modification time in nanoseconds
+    """
+    stat = os.stat(input_file)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_arrow_file(df, input_file, id_columns=None, renames=None):
+    """
+    Purpose:    Write a prepared dataframe as the uncompressed Arrow IPC file of its tsv file, so it can be memory mapped
+                and loaded without copying, along with what is needed to check it is up to date
+    Modifies:   The Arrow file of input_file
+    Returns:    String of the Arrow file path
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = {
+        "version": ARROW_FORMAT_VERSION,
+        "source": get_source_stamp(input_file),
+        "id_columns": id_columns,
+        "renames": renames or {},
+    }
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), ARROW_METADATA_KEY: json.dumps(metadata)}
+    )
+
+    arrow_path = get_arrow_path(input_file)
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(arrow_path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, arrow_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return arrow_path
+
+
+def get_arrow_metadata(reader):
+    """
+    Purpose:    Read the conversion details stored in the schema of an Arrow file
+    Modifies:   Nothing
+    Returns:    Dictionary of the conversion details, or None if the file was not written by write_arrow_file
+    """
+    metadata = (reader.schema.metadata or {}).get(ARROW_METADATA_KEY)
+    return json.loads(metadata) if metadata else None
+
+
+def is_arrow_file_current(metadata, input_file, id_columns=None):
+    """
+    Purpose:    Check that a converted file was written from the current contents of its tsv file, by this version
+                of the conversion and with the same ID columns
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    return (
+        metadata is not None
+        and metadata["version"] == ARROW_FORMAT_VERSION
+        and metadata["source"] == get_source_stamp(input_file)
+        and metadata["id_columns"] == id_columns
+    )
+
+
+def check_arrow_file(input_file, id_columns=None):
+    """
+    Purpose:    Check if a tsv file has an up to date converted file
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    import pyarrow as pa
+
+    try:
+        with pa.memory_map(get_arrow_path(input_file)) as source:
+            metadata = get_arrow_metadata(pa.ipc.open_file(source))
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return is_arrow_file_current(metadata, input_file, id_columns)
+
+
+def load_arrow_file(input_file, id_columns=None, columns=None):
+    """
+    Purpose:    Memory map the converted Arrow file of a tsv file and convert only the given columns, or all of them if
+                columns is None, to a dataframe. Numeric columns without missing values share the mapped pages instead
+                of being copied.
+    Modifies:   Nothing
+    Returns:    Tuple of the prepared dataframe and its column renames, or None if there is no up to date converted file
+    """
+    arrow_path = get_arrow_path(input_file)
+    if not os.path.exists(arrow_path):
+        return None
+    if importlib.util.find_spec("pyarrow") is None:
+        logging.warning(
+            "\u2022 pyarrow is not installed, parsing %s instead of its converted file",
+            input_file,
+        )
+        return None
+    import numpy as np
+    import pyarrow as pa
+
+    try:
+        # The mapped pages stay valid after the file is closed for as long as the table uses them
+        with pa.memory_map(arrow_path) as source:
+            reader = pa.ipc.open_file(source)
+            metadata = get_arrow_metadata(reader)
+            if not is_arrow_file_current(metadata, input_file, id_columns):
+                logging.info(
+                    "\u2022 The converted file of %s is out of date, parsing it instead",
+                    input_file,
+                )
+                return None
+            table = reader.read_all()
+    except Exception as e:
+        logging.warning(
+            "\u2022 Could not read the converted file of %s, parsing it instead: %s",
+            input_file,
+            e,
+        )
+        return None
+
+    if columns is not None:
+        table = table.select([col for col in table.column_names if col in columns])
+    df = table.to_pandas(split_blocks=True)
+    # Arrow nulls become None in object columns, while the tsv parsers give NaN
+    for col in df.select_dtypes(include="object").columns:
+        missing = df[col].isna()
+        if missing.any():
+            df[col] = df[col].where(~missing, np.nan)
+    return df, metadata["renames"]
@@ -0,0 +1 @@
+# Synthetic results generators and timing harness, run from pvaccompare/ with python -m benchmarks.run_benchmarks
@@ -0,0 +1,457 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import yaml
+
+CHROMOSOMES = [f"chr{number}" for number in range(1, 23)] + ["chrX", "chrY"]
+AMINO_ACIDS = list("ACDEFGHIKLMNPQRSTVWY")
+NUCLEOTIDES = list("ACGT")
+ALLELES = ["HLA-A*29:02", "HLA-B*45:01", "HLA-B*82:02", "HLA-C*06:02"]
+BIOTYPES = ["protein_coding", "nonsense_mediated_decay", "retained_intron"]
+TIERS = ["Pass", "Anchor", "Subclonal", "LowExpr", "Poor", "NoExpr"]
+PREDICTORS = [
+    "MHCflurry",
+    "MHCnuggetsI",
+    "NetMHC",
+    "NetMHCcons",
+    "NetMHCpan",
+    "PickPocket",
+    "SMM",
+    "SMMPMBEC",
+]
+
+
+def random_sequences(rng, count, length):
+    """
+    Purpose:    Generate random peptide sequences
+    Modifies:   Nothing
+    Returns:    Numpy array of peptide strings
+    """
+    letters = np.frombuffer("".join(AMINO_ACIDS).encode(), dtype="S1")
+    residues = letters[rng.integers(0, len(AMINO_ACIDS), size=(count, length))]
+    return residues.view(f"S{length}").ravel().astype(str).astype(object)
+
+
+def get_variant_ids(df):
+    """
+    Purpose:    Build the Chromosome-Start-Stop-Reference-Variant ID of each row
+    Modifies:   Nothing
+    Returns:    Series of IDs
+    """
+    return (
+        df["Chromosome"]
+        + "-"
+        + df["Start"].astype(str)
+        + "-"
+        + df["Stop"].astype(str)
+        + "-"
+        + df["Reference"]
+        + "-"
+        + df["Variant"]
+    )
+
+
+def generate_variants(rng, num_variants):
+    """
+    Purpose:    Generate the variants shared by every generated file, one transcript and mutation per variant
+    Modifies:   Nothing
+    Returns:    Dataframe of variants
+    """
+    chromosomes = rng.choice(CHROMOSOMES, size=num_variants)
+    starts = rng.integers(1_000_000, 200_000_000, size=num_variants)
+    reference_bases = rng.integers(0, len(NUCLEOTIDES), size=num_variants)
+    variant_bases = (
+        reference_bases + rng.integers(1, len(NUCLEOTIDES), size=num_variants)
+    ) % len(NUCLEOTIDES)
+    references = np.array(NUCLEOTIDES, dtype=object)[reference_bases]
+    variants = np.array(NUCLEOTIDES, dtype=object)[variant_bases]
+    genes = np.array([f"GENE{i}" for i in range(num_variants)], dtype=object)
+    positions = rng.integers(1, 1000, size=num_variants)
+    wt_residues = rng.choice(AMINO_ACIDS, size=num_variants)
+    mt_residues = rng.choice(AMINO_ACIDS, size=num_variants)
+    df = pd.DataFrame(
+        {
+            "Chromosome": chromosomes,
+            "Start": starts,
+            "Stop": starts + 1,
+            "Reference": references,
+            "Variant": variants,
+            "Transcript": [f"ENST{i:011d}.1" for i in range(num_variants)],
+            "Gene": genes,
+            "AA Change": [
+                f"{wt}{position}{mt}"
+                for wt, position, mt in zip(wt_residues, positions, mt_residues)
+            ],
+        }
+    )
+    df["ID"] = get_variant_ids(df)
+    return df.drop_duplicates("ID").reset_index(drop=True)
+
+
+def generate_unaggregated_tsv(rng, variants, peptides_per_variant):
+    """
+    Purpose:    Generate the all_epitopes.tsv rows, one per variant, allele and sub-peptide, with a score and
+                percentile column for every predictor
+    Modifies:   Nothing
+    Returns:    Dataframe of the unaggregated tsv rows
+    """
+    rows = np.repeat(np.arange(len(variants)), peptides_per_variant)
+    num_rows = len(rows)
+    df = variants.iloc[rows][
+        ["Chromosome", "Start", "Stop", "Reference", "Variant", "Transcript"]
+    ].reset_index(drop=True)
+    df["Biotype"] = rng.choice(BIOTYPES, size=num_rows, p=[0.8, 0.1, 0.1])
+    df["Gene Name"] = variants["Gene"].to_numpy()[rows]
+    df["HLA Allele"] = np.tile(np.resize(ALLELES, peptides_per_variant), len(variants))
+    df["Peptide Length"] = 9
+    df["Sub-peptide Position"] = np.tile(
+        np.arange(1, peptides_per_variant + 1), len(variants)
+    )
+    df["MT Epitope Seq"] = random_sequences(rng, num_rows, 9)
+    df["WT Epitope Seq"] = random_sequences(rng, num_rows, 9)
+    for metric in ["MT IC50 Score", "WT IC50 Score"]:
+        df[f"Best {metric}"] = rng.uniform(1, 50000, size=num_rows).round(3)
+    df["Tumor DNA Depth"] = rng.integers(10, 500, size=num_rows)
+    df["Tumor DNA VAF"] = rng.uniform(0, 1, size=num_rows).round(3)
+    df["Tumor RNA Depth"] = rng.integers(0, 2000, size=num_rows)
+    df["Tumor RNA VAF"] = rng.uniform(0, 1, size=num_rows).round(3)
+    df["Gene Expression"] = rng.uniform(0, 500, size=num_rows).round(3)
+    df["Median MT IC50 Score"] = rng.uniform(1, 50000, size=num_rows).round(3)
+    df["Median WT IC50 Score"] = rng.uniform(1, 50000, size=num_rows).round(3)
+    df["Median MT Percentile"] = rng.uniform(0, 100, size=num_rows).round(3)
+    df["Median WT Percentile"] = rng.uniform(0, 100, size=num_rows).round(3)
+    for predictor in PREDICTORS:
+        for allele_type in ["WT", "MT"]:
+            df[f"{predictor} {allele_type} IC50 Score"] = rng.uniform(
+                1, 50000, size=num_rows
+            )
+            df[f"{predictor} {allele_type} Percentile"] = rng.uniform(
+                0, 100, size=num_rows
+            )
+    df["Index"] = [
+        f"{row}.{gene}" for row, gene in zip(range(num_rows), df["Gene Name"])
+    ]
+    df["Problematic Positions"] = "None"
+    return df
+
+
+def generate_aggregated_tsv(rng, variants):
+    """
+    Purpose:    Generate the all_epitopes.aggregated.tsv rows, one per variant
+    Modifies:   Nothing
+    Returns:    Dataframe of the aggregated tsv rows
+    """
+    num_rows = len(variants)
+    df = pd.DataFrame({"ID": variants["ID"]})
+    for allele in ALLELES:
+        df[allele.replace("HLA-", "")] = rng.integers(0, 10, size=num_rows)
+    df["Gene"] = variants["Gene"]
+    df["AA Change"] = variants["AA Change"]
+    df["Num Passing Transcripts"] = rng.integers(1, 20, size=num_rows)
+    df["Best Peptide"] = random_sequences(rng, num_rows, 9)
+    df["Best Transcript"] = variants["Transcript"]
+    df["TSL"] = rng.integers(1, 6, size=num_rows)
+    df["Allele"] = rng.choice(ALLELES, size=num_rows)
+    df["Pos"] = rng.integers(1, 10, size=num_rows)
+    df["Prob Pos"] = "None"
+    df["Num Passing Peptides"] = rng.integers(0, 20, size=num_rows)
+    df["IC50 MT"] = rng.uniform(1, 50000, size=num_rows).round(3)
+    df["IC50 WT"] = rng.uniform(1, 50000, size=num_rows).round(3)
+    df["%ile MT"] = rng.uniform(0, 100, size=num_rows).round(3)
+    df["%ile WT"] = rng.uniform(0, 100, size=num_rows).round(3)
+    df["RNA Expr"] = rng.uniform(0, 500, size=num_rows).round(3)
+    df["RNA VAF"] = rng.uniform(0, 1, size=num_rows).round(3)
+    df["Allele Expr"] = rng.uniform(0, 500, size=num_rows).round(3)
+    df["RNA Depth"] = rng.integers(0, 2000, size=num_rows)
+    df["DNA VAF"] = rng.uniform(0, 1, size=num_rows).round(3)
+    df["Tier"] = rng.choice(TIERS, size=num_rows)
+    df["Ref Match"] = False
+    df["Evaluation"] = "Pending"
+    return df
+
+
+def generate_reference_matches_tsv(rng, variants, match_rate):
+    """
+    Purpose:    Generate the reference_matches rows for a fraction of the variants
+    Modifies:   Nothing
+    Returns:    Dataframe of the reference match rows
+    """
+    matched = variants[rng.uniform(size=len(variants)) < match_rate]
+    num_rows = len(matched)
+    df = matched[
+        ["Chromosome", "Start", "Stop", "Reference", "Variant", "Transcript"]
+    ].reset_index(drop=True)
+    df["MT Epitope Seq"] = random_sequences(rng, num_rows, 9)
+    df["Peptide"] = random_sequences(rng, num_rows, 15)
+    df["Hit ID"] = [f"ENSP{i:011d}.1" for i in rng.integers(0, 10**6, size=num_rows)]
+    df["Hit Definition"] = [
+        f"{hit_id} pep gene_symbol:{gene}"
+        for hit_id, gene in zip(df["Hit ID"], matched["Gene"])
+    ]
+    df["Match Window"] = random_sequences(rng, num_rows, 8)
+    df["Match Sequence"] = random_sequences(rng, num_rows, 60)
+    df["Match Start"] = rng.integers(1, 500, size=num_rows)
+    df["Match Stop"] = df["Match Start"] + 8
+    return df
+
+
+def generate_metrics(rng, variants, settings):
+    """
+    Purpose:    Generate the aggregated metrics json, the run settings followed by an entry for each variant
+    Modifies:   Nothing
+    Returns:    Dictionary of the metrics
+    """
+    metrics = dict(settings)
+    for variant_id, transcript in zip(variants["ID"], variants["Transcript"]):
+        peptides = random_sequences(rng, 3, 9)
+        metrics[variant_id] = {
+            "good_binders": {
+                transcript: {
+                    "peptides": {
+                        peptide: {"hla_types": ALLELES[:2], "mutation_position": 5}
+                        for peptide in peptides
+                    },
+                    "transcript_expr": round(float(rng.uniform(0, 500)), 3),
+                }
+            },
+            "sets": [transcript],
+        }
+    return metrics
+
+
+def get_inputs(version):
+    """
+    Purpose:    Build the inputs.yml settings of a run, the versions differ in a few settings
+    Modifies:   Nothing
+    Returns:    Dictionary of the inputs
+    """
+    return {
+        "alleles": ALLELES,
+        "binding_threshold": 500,
+        "aggregate_inclusion_binding_threshold": 1000 + 500 * version,
+        "epitope_lengths": [8, 9, 10, 11],
+        "n_threads": 8 * version,
+        "prediction_algorithms": PREDICTORS,
+        "tumor_sample_name": "SAMPLE_TUMOR",
+        "normal_sample_name": "SAMPLE_NORMAL",
+        "percentile_threshold": None,
+    }
+
+
+def perturb_columns(rng, df, columns, difference_rate):
+    """
+    Purpose:    Change the values of a fraction of the rows in each column, by more than the numeric tolerance for
+                numeric columns
+    Modifies:   df
+    Returns:    None
+    """
+    for col in columns:
+        rows = rng.uniform(size=len(df)) < difference_rate
+        if not rows.any():
+            continue
+        if pd.api.types.is_bool_dtype(df[col]):
+            df.loc[rows, col] = ~df.loc[rows, col]
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df.loc[rows, col] = df.loc[rows, col] + 1
+        elif pd.api.types.is_float_dtype(df[col]):
+            df.loc[rows, col] = df.loc[rows, col] * 1.5 + 1
+        else:
+            df.loc[rows, col] = df.loc[rows, col].astype(str) + "X"
+
+
+def split_unique_variants(rng, variants, unique_rate):
+    """
+    Purpose:    Mark each variant as in both versions, only in version 1 or only in version 2
+    Modifies:   Nothing
+    Returns:    Two dataframes of the variants in version 1 and version 2
+    """
+    draws = rng.uniform(size=len(variants))
+    in_version1 = draws >= unique_rate / 2
+    in_version2 = (draws < unique_rate / 2) | (draws >= unique_rate)
+    return (
+        variants[in_version1].reset_index(drop=True),
+        variants[in_version2].reset_index(drop=True),
+    )
+
+
+def write_results_folder(
+    results_folder,
+    prefix,
+    version,
+    aggregated,
+    unaggregated,
+    reference_matches,
+    metrics,
+):
+    """
+    Purpose:    Write the generated files in the layout of a pVACtools results folder
+    Modifies:   results_folder
+    Returns:    None
+    """
+    os.makedirs(os.path.join(results_folder, prefix, "log"), exist_ok=True)
+    file_prefix = os.path.join(results_folder, prefix, "sample")
+    with open(os.path.join(results_folder, prefix, "log", "inputs.yml"), "w") as f:
+        yaml.safe_dump(get_inputs(version), f)
+    with open(f"{file_prefix}.all_epitopes.aggregated.metrics.json", "w") as f:
+        json.dump(metrics, f, indent=4)
+    aggregated.to_csv(
+        f"{file_prefix}.all_epitopes.aggregated.tsv", sep="\t", index=False
+    )
+    unaggregated.to_csv(f"{file_prefix}.all_epitopes.tsv", sep="\t", index=False)
+    reference_matches.to_csv(
+        f"{file_prefix}.all_epitopes.aggregated.tsv.reference_matches",
+        sep="\t",
+        index=False,
+    )
+
+
+def generate_results_folders(
+    output_dir,
+    num_variants=10000,
+    peptides_per_variant=10,
+    difference_rate=0.01,
+    unique_rate=0.02,
+    match_rate=0.1,
+    prefix="MHC_Class_I",
+    seed=0,
+):
+    """
+    Purpose:    Generate a pair of synthetic results folders, the second one differing from the first in a fraction of
+                the values of every column and in a fraction of the variants
+    Modifies:   output_dir
+    Returns:    Tuple of the two results folder paths
+    """
+    rng = np.random.default_rng(seed)
+    variants = generate_variants(rng, num_variants)
+    variants1, variants2 = split_unique_variants(rng, variants, unique_rate)
+
+    aggregated = generate_aggregated_tsv(rng, variants)
+    unaggregated = generate_unaggregated_tsv(rng, variants, peptides_per_variant)
+    reference_matches = generate_reference_matches_tsv(rng, variants, match_rate)
+    settings = get_inputs(1)
+    metrics = generate_metrics(rng, variants, settings)
+
+    results_folders = []
+    for version, version_variants in enumerate([variants1, variants2], start=1):
+        ids = set(version_variants["ID"])
+        version_aggregated = aggregated[aggregated["ID"].isin(ids)].reset_index(
+            drop=True
+        )
+        version_unaggregated = unaggregated[
+            get_variant_ids(unaggregated).isin(ids)
+        ].reset_index(drop=True)
+        version_reference_matches = reference_matches[
+            get_variant_ids(reference_matches).isin(ids)
+        ].reset_index(drop=True)
+        version_metrics = {
+            key: value
+            for key, value in metrics.items()
+            if key in settings or key in ids
+        }
+
+        if version == 2:
+            perturb_columns(
+                rng,
+                version_aggregated,
+                version_aggregated.columns.drop(["ID", "Gene", "AA Change"]),
+                difference_rate,
+            )
+            perturb_columns(
+                rng,
+                version_unaggregated,
+                version_unaggregated.columns.drop(
+                    [
+                        "Chromosome",
+                        "Start",
+                        "Stop",
+                        "Reference",
+                        "Variant",
+                        "HLA Allele",
+                        "Sub-peptide Position",
+                        "MT Epitope Seq",
+                        "Index",
+                    ]
+                ),
+                difference_rate,
+            )
+            perturb_columns(
+                rng,
+                version_reference_matches,
+                ["Peptide", "Hit Definition", "Match Window", "Match Sequence"],
+                difference_rate,
+            )
+            version_metrics.update(get_inputs(2))
+
+        results_folder = os.path.join(output_dir, f"results{version}")
+        write_results_folder(
+            results_folder,
+            prefix,
+            version,
+            version_aggregated,
+            version_unaggregated,
+            version_reference_matches,
+            version_metrics,
+        )
+        results_folders.append(results_folder)
+    return tuple(results_folders)
+
+
+def define_parser():
+    """
+    Purpose:    Define arguments for the parser that the user can use
+    Modifies:   Nothing
+    Returns:    The parser
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Generate a pair of synthetic pVACtools results folders to benchmark the comparisons with",
+    )
+    parser.add_argument(
+        "output_dir", help="Directory the results folders are written to"
+    )
+    parser.add_argument("--num_variants", type=int, default=10000)
+    parser.add_argument(
+        "--peptides_per_variant",
+        type=int,
+        default=10,
+        help="Number of unaggregated TSV rows of each variant",
+    )
+    parser.add_argument(
+        "--difference_rate",
+        type=float,
+        default=0.01,
+        help="Fraction of the rows whose value is changed in each column of the second results folder",
+    )
+    parser.add_argument(
+        "--unique_rate",
+        type=float,
+        default=0.02,
+        help="Fraction of the variants only found in one of the results folders",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def main():
+    """
+    Purpose:    Control function for generating synthetic results folders
+    Modifies:   Nothing
+    Returns:    None
+    """
+    args = define_parser().parse_args()
+    results_folders = generate_results_folders(
+        args.output_dir,
+        args.num_variants,
+        args.peptides_per_variant,
+        args.difference_rate,
+        args.unique_rate,
+        seed=args.seed,
+    )
+    print("\n".join(results_folders))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generate_results import generate_results_folders
+from profiling import get_peak_rss_mb
+
+# The runner benchmarks, named after the --comparisons they run, followed by the end-to-end run_comparison benchmark
+BENCHMARKS = [
+    "yml",
+    "json",
+    "aggregated",
+    "unaggregated",
+    "reference_matches",
+    "run_comparison",
+]
+PREFIX = "MHC_Class_I"
+DEFAULT_RESULTS_FILE = os.path.join(os.path.dirname(__file__), "results.jsonl")
+# Slowdowns smaller than this are timing noise, however large they are relative to a short benchmark
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def get_default_columns():
+    """
+    Purpose:    Get the default columns of each comparison from the command line parser
+    Modifies:   Nothing
+    Returns:    Tuple of the aggregated, unaggregated and reference match columns
+    """
+    from run import define_parser
+
+    args = define_parser().parse_args(["--pvactools_release", "1", "2", "output"])
+    return (
+        args.aggregated_columns,
+        args.unaggregated_columns,
+        args.reference_match_columns,
+    )
+
+
+def run_benchmark(name, results_folder1, results_folder2, output_dir):
+    """
+    Purpose:    Time a single benchmark, meant to be run in a fresh process so imports and peak memory are its own
+    Modifies:   output_dir
+    Returns:    Dictionary of the elapsed seconds and the peak resident memory of the process in megabytes
+    """
+    from compare_tools.comparison_router import get_comparison_jobs, run_comparison
+
+    columns = get_default_columns()
+    # The progress messages of the comparisons would drown out the benchmark results
+    logging.disable(logging.INFO)
+    output_file = os.path.join(output_dir, name)
+    start = time.perf_counter()
+    if name == "run_comparison":
+        run_comparison(PREFIX, results_folder1, results_folder2, output_file, *columns)
+    else:
+        jobs = get_comparison_jobs(
+            PREFIX, results_folder1, results_folder2, *columns, comparisons=[name]
+        )
+        for _, runner, input_file1, input_file2, args in jobs:
+            runner(input_file1, input_file2, output_file, *args)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "max_rss_mb": get_peak_rss_mb()}
+
+
+def run_benchmarks(results_folder1, results_folder2, benchmarks, repeats):
+    """
+    Purpose:    Run every benchmark the given number of times, each run in a new process
+    Modifies:   Nothing
+    Returns:    Dictionary of benchmark names to the median seconds, every run's seconds and the peak memory
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="pvaccompare_benchmark_") as output_dir:
+        for name in benchmarks:
+            runs = []
+            for _ in range(repeats):
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    runs.append(
+                        executor.submit(
+                            run_benchmark,
+                            name,
+                            results_folder1,
+                            results_folder2,
+                            output_dir,
+                        ).result()
+                    )
+            seconds = [run["seconds"] for run in runs]
+            results[name] = {
+                "seconds": statistics.median(seconds),
+                "all_seconds": seconds,
+                "max_rss_mb": max(run["max_rss_mb"] for run in runs),
+            }
+            print(
+                f"{name}: {results[name]['seconds']:.3f}s, {results[name]['max_rss_mb']:.0f} MB",
+                flush=True,
+            )
+    return results
+
+
+def get_commit():
+    """
+    Purpose:    Get the current git commit and whether the working tree has uncommitted changes
+    Modifies:   Nothing
+    Returns:    Tuple of the commit hash, or None outside a git repository, and True/False
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(status.strip())
+
+
+def get_results_folders(data_dir, config):
+    """
+    Purpose:    Reuse the results folders generated in data_dir with the same configuration, generating them otherwise
+    Modifies:   data_dir
+    Returns:    Tuple of the two results folder paths
+    """
+    config_file = os.path.join(data_dir, "config.json")
+    results_folders = (
+        os.path.join(data_dir, "results1"),
+        os.path.join(data_dir, "results2"),
+    )
+    if os.path.exists(config_file):
+        with open(config_file) as f:
+            if json.load(f) == config:
+                return results_folders
+
+    print(f"Generating the results folders in {data_dir}...", flush=True)
+    results_folders = generate_results_folders(data_dir, **config)
+    with open(config_file, "w") as f:
+        json.dump(config, f)
+    return results_folders
+
+
+def load_previous_record(results_file, config):
+    """
+    Purpose:    Find the most recent stored benchmark record with the same configuration
+    Modifies:   Nothing
+    Returns:    Dictionary of the record, or None
+    """
+    if not os.path.exists(results_file):
+        return None
+    previous = None
+    with open(results_file) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["config"] == config:
+                previous = record
+    return previous
+
+
+def find_regressions(record, previous, threshold):
+    """
+    Purpose:    Compare the benchmark times against the previous record, printing the change of each benchmark
+    Modifies:   Nothing
+    Returns:    List of the benchmarks that are slower than the previous record by more than the threshold
+    """
+    regressions = []
+    print(f"\nCompared to {previous['commit']} ({previous['timestamp']}):")
+    for name, result in record["results"].items():
+        if name not in previous["results"]:
+            continue
+        previous_seconds = previous["results"][name]["seconds"]
+        change = result["seconds"] / previous_seconds - 1
+        flag = ""
+        if (
+            change > threshold
+            and result["seconds"] - previous_seconds > MIN_REGRESSION_SECONDS
+        ):
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"\t{name}: {previous_seconds:.3f}s -> {result['seconds']:.3f}s ({change:+.1%}){flag}"
+        )
+    return regressions
+
+
+def define_parser():
+    """
+    Purpose:    Define arguments for the parser that the user can use
+    Modifies:   Nothing
+    Returns:    The parser
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Time each comparison runner and run_comparison end-to-end on synthetic results folders",
+    )
+    parser.add_argument(
+        "--data_dir",
+        help="Directory the synthetic results folders are generated in and reused from, a temporary directory by default",
+    )
+    parser.add_argument("--num_variants", type=int, default=10000)
+    parser.add_argument("--peptides_per_variant", type=int, default=10)
+    parser.add_argument("--difference_rate", type=float, default=0.01)
+    parser.add_argument("--unique_rate", type=float, default=0.02)
+    parser.add_argument(
+        "--benchmarks",
+        type=lambda s: [a for a in s.split(",")],
+        default=BENCHMARKS,
+        help=f"Comma-separated benchmarks to run, choices: {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--results_file",
+        default=DEFAULT_RESULTS_FILE,
+        help="JSON lines file the results are appended to and compared against",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Fraction a benchmark may slow down by compared to the previous run before it is reported as a regression",
+    )
+    parser.add_argument(
+        "--fail_on_regression",
+        action="store_true",
+        help="Exit with an error if any benchmark regressed",
+    )
+    return parser
+
+
+def main():
+    """
+    Purpose:    Control function for the benchmarks
+    Modifies:   Nothing
+    Returns:    None
+    """
+    parser = define_parser()
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(
+                f"Invalid benchmark '{name}' specified.\nValid benchmarks are: {', '.join(BENCHMARKS)}"
+            )
+
+    config = {
+        "num_variants": args.num_variants,
+        "peptides_per_variant": args.peptides_per_variant,
+        "difference_rate": args.difference_rate,
+        "unique_rate": args.unique_rate,
+    }
+    with tempfile.TemporaryDirectory(prefix="pvaccompare_benchmark_data_") as temp_dir:
+        results_folders = get_results_folders(args.data_dir or temp_dir, config)
+        results = run_benchmarks(*results_folders, args.benchmarks, args.repeats)
+
+    commit, dirty = get_commit()
+    record = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results,
+    }
+    previous = load_previous_record(args.results_file, config)
+    regressions = []
+    if previous is not None:
+        regressions = find_regressions(record, previous, args.threshold)
+    with open(args.results_file, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(f"Benchmarks regressed: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
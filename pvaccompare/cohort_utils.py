@@ -0,0 +1,457 @@
+from run_utils import *
+import itertools
+from profiling import stage
+from report_writer import append_to_report
+from structured_output import write_structured_tables
+from tolerances import ColumnTolerances
+
+# Number of version pair comparisons made at a time when counting the differences between versions
+COHORT_PATTERN_BLOCK_SIZE = 1 << 22
+
+
+def get_replaced_ids(df, replacement_columns):
+    """
+    Purpose:    Combine the Gene and AA Change columns into the 'Gene (AA_Change)' ID used when a file has no ID column
+    Modifies:   Nothing
+    Returns:    Series of IDs
+    """
+    return (
+        df[replacement_columns[0]].astype(str)
+        + " ("
+        + df[replacement_columns[1]].astype(str)
+        + ")"
+    )
+
+
+def load_cohort_files(input_files, comparer, columns_to_compare, load_options=None):
+    """
+    Purpose:    Load the tsv file of every version the way the comparer loads a pair of files, replacing the ID
+                with Gene and AA Change in every version if any of them has no ID column
+    Modifies:   Nothing
+    Returns:    List of dataframes, one per version
+    """
+    required_columns, id_columns = comparer.get_load_arguments(columns_to_compare)
+    try:
+        dfs = [
+            load_prepared_tsv_file(
+                input_file,
+                number,
+                required_columns,
+                id_columns,
+                **(load_options or {}),
+            )
+            for number, input_file in enumerate(input_files, start=1)
+        ]
+    except Exception as e:
+        raise Exception(f"Error loading files: {e}")
+
+    replacement_columns = getattr(comparer, "ID_replacement_cols", None)
+    if replacement_columns and any("ID" not in df.columns for df in dfs):
+        if not all(col in df.columns for df in dfs for col in replacement_columns):
+            raise Exception("Error loading files: Could not create an ID column")
+        for df in dfs:
+            df["ID"] = get_replaced_ids(df, replacement_columns)
+        logging.info("\u2022 Replaced ID with Gene and AA Change")
+    return dfs
+
+
+def output_dropped_cohort_cols(dfs, original_columns):
+    """
+    Purpose:    Outputs the comparison columns missing from any version to the terminal and creates a columns dropped
+                message for the generated report
+    Modifies:   Nothing
+    Returns:    List of columns present in every version and the columns dropped message
+    """
+    columns_to_keep = []
+    columns_dropped_message = ""
+    for col in original_columns:
+        missing_versions = [
+            str(version)
+            for version, df in enumerate(dfs, start=1)
+            if col not in df.columns
+        ]
+        if missing_versions:
+            logging.info(
+                "\u2022 Column dropped: '%s' is not present in version %s",
+                col,
+                ", ".join(missing_versions),
+            )
+            columns_dropped_message += f"Column dropped: '{col}' is not present in version {', '.join(missing_versions)}\n"
+        else:
+            columns_to_keep.append(col)
+    return columns_to_keep, columns_dropped_message
+
+
+def join_cohort(dfs, columns):
+    """
+    Purpose:    Outer join every version on ID into one wide dataframe, keeping the first row of repeated IDs.
+                Categorical columns are compared as plain values since each version has its own categories.
+    Modifies:   Nothing
+    Returns:    Dataframe indexed by the integer code of each ID with (version, column) columns and a
+                (version, 'present') flag per version
+    """
+    frames = []
+    for df, codes in zip(dfs, get_variant_codes(*dfs)):
+        frame = df[columns].set_axis(codes)
+        frame = frame[~frame.index.duplicated()]
+        categorical_columns = frame.select_dtypes("category").columns
+        if len(categorical_columns) > 0:
+            frame = frame.astype({col: object for col in categorical_columns})
+        frames.append(frame.assign(present=True))
+    wide = pd.concat(
+        frames, axis=1, keys=range(1, len(dfs) + 1), join="outer", sort=False
+    )
+    for version in range(1, len(dfs) + 1):
+        wide[(version, "present")] = (
+            wide[(version, "present")].notna().to_numpy(dtype=bool)
+        )
+    return wide
+
+
+def get_version_codes(wide, col, present):
+    """
+    Purpose:    Encode the values of a column in every version as integer codes shared between the versions, equal
+                values and missing values getting the same code, so the versions are compared by their codes
+    Modifies:   Nothing
+    Returns:    Numpy array of the codes with one row per variant and one column per version, -1 where the variant is
+                not in the version
+    """
+    num_versions = present.shape[1]
+    values = pd.concat(
+        [wide[(version, col)] for version in range(1, num_versions + 1)],
+        ignore_index=True,
+    )
+    codes, _ = pd.factorize(values, use_na_sentinel=False)
+    codes = codes.reshape(num_versions, len(wide))
+    return np.where(present.T, codes, -1).T
+
+
+def count_pair_differences(codes):
+    """
+    Purpose:    Count the variants each pair of versions disagree on from their codes. Every distinct row of codes is
+                compared once and weighted by how many variants share it, as most variants have the same codes.
+    Modifies:   Nothing
+    Returns:    Symmetric numpy matrix of the counts
+    """
+    num_versions = codes.shape[1]
+    matrix = np.zeros((num_versions, num_versions), dtype=np.int64)
+    if len(codes) == 0:
+        return matrix
+    # Number the distinct rows of codes one version at a time, keeping the numbers below the number of variants
+    radix = int(codes.max()) + 2
+    keys = np.zeros(len(codes), dtype=np.int64)
+    for version in range(num_versions):
+        keys, _ = pd.factorize(keys * radix + codes[:, version] + 1)
+    _, first_rows, counts = np.unique(keys, return_index=True, return_counts=True)
+    patterns = codes[first_rows]
+    block_size = max(COHORT_PATTERN_BLOCK_SIZE // (num_versions * num_versions), 1)
+    for start in range(0, len(patterns), block_size):
+        block = patterns[start : start + block_size]
+        present = block >= 0
+        differs = (
+            (block[:, :, None] != block[:, None, :])
+            & present[:, :, None]
+            & present[:, None, :]
+        )
+        matrix += np.tensordot(
+            counts[start : start + block_size], differs.astype(np.int64), axes=1
+        )
+    return matrix
+
+
+def get_tolerance_codes(wide, col, present, tolerance):
+    """
+    Purpose:    Encode the numeric values of a column in every version as codes that are equal exactly when the values
+                are within the absolute tolerance of each other. Each variant's sorted values are split into clusters
+                wherever consecutive values differ by more than the tolerance, which is exact when no cluster spans
+                more than the tolerance. Variants with a longer cluster, where agreement is not transitive, are flagged.
+    Modifies:   Nothing
+    Returns:    Tuple of the codes, laid out like those of get_version_codes, and a boolean numpy array of the variants
+                that still need every pair of versions compared
+    """
+    num_versions = present.shape[1]
+    # One row per version, so the reductions over the versions of each variant are contiguous
+    values = np.vstack(
+        [wide[(version, col)].to_numpy() for version in range(1, num_versions + 1)]
+    )
+    codes = np.where(np.isnan(values), num_versions, 0)
+    ambiguous = np.zeros(len(wide), dtype=bool)
+    # Most variants have every value within the tolerance, a single cluster that needs no sorting
+    with np.errstate(invalid="ignore"):
+        spans = np.fmax.reduce(values) - np.fmin.reduce(values)
+    rows = np.flatnonzero(~(spans <= tolerance))
+    if len(rows) > 0:
+        # Missing values sort last, so each cluster is a run of consecutive sorted values
+        order = np.argsort(values[:, rows], axis=0)
+        sorted_values = np.take_along_axis(values[:, rows], order, axis=0)
+        sorted_missing = np.isnan(sorted_values)
+        starts = np.ones(sorted_values.shape, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            starts[1:] = sorted_values[1:] - sorted_values[:-1] > tolerance
+            first_positions = np.maximum.accumulate(
+                np.where(starts, np.arange(num_versions)[:, None], 0), axis=0
+            )
+            cluster_spans = sorted_values - np.take_along_axis(
+                sorted_values, first_positions, axis=0
+            )
+        ambiguous[rows] = (~(cluster_spans <= tolerance) & ~sorted_missing).any(axis=0)
+        clusters = np.where(sorted_missing, num_versions, np.cumsum(starts, axis=0) - 1)
+        row_codes = np.empty_like(clusters)
+        np.put_along_axis(row_codes, order, clusters, axis=0)
+        codes[:, rows] = row_codes
+    return np.where(present.T, codes, -1).T, ambiguous
+
+
+def count_pairwise_differences(wide, col, present, rows, tolerance, relative_tolerance):
+    """
+    Purpose:    Count the variants each pair of versions disagree on among the given variants by comparing their values
+                with the tolerance, for the variants whose codes cannot tell
+    Modifies:   Nothing
+    Returns:    Tuple of the symmetric numpy matrix of the counts and a boolean numpy array of the given variants any
+                pair of versions disagrees on
+    """
+    num_versions = present.shape[1]
+    matrix = np.zeros((num_versions, num_versions), dtype=np.int64)
+    subset = wide[rows]
+    present = present[rows]
+    disagreeing = np.zeros(len(subset), dtype=bool)
+    for i, j in itertools.combinations(range(num_versions), 2):
+        mask = get_difference_mask(
+            subset[(i + 1, col)],
+            subset[(j + 1, col)],
+            tolerance,
+            relative_tolerance,
+        )
+        mask &= present[:, i] & present[:, j]
+        matrix[i, j] = matrix[j, i] = np.count_nonzero(mask)
+        disagreeing |= mask
+    return matrix, disagreeing
+
+
+def get_cohort_differences(dfs, columns, tolerances=None):
+    """
+    Purpose:    Count, in one pass over the joined versions, the variants missing between each pair of versions and
+                the common variants each pair of versions disagree on in every column. Values are compared through
+                codes shared between the versions, numeric columns with only an absolute tolerance getting the same
+                code for values within the tolerance of each other. Every pair of versions is still compared for the
+                few variants whose values only chain within the absolute tolerance, and with a relative tolerance or
+                a column numeric in only some versions, for every variant whose values are not all equal.
+    Modifies:   Nothing
+    Returns:    Dictionary of the cohort results, the matrices are indexed by version number starting at 0
+    """
+    if tolerances is None:
+        tolerances = ColumnTolerances()
+    num_versions = len(dfs)
+    wide = join_cohort(dfs, columns)
+    present = np.column_stack(
+        [
+            wide[(version, "present")].to_numpy()
+            for version in range(1, num_versions + 1)
+        ]
+    )
+
+    # Variants found in the row version but not the column version
+    missing = present.T.astype(np.int64) @ (~present).astype(np.int64)
+
+    differences = {}
+    num_agreeing = {}
+    in_all_versions = present.all(axis=1)
+    for col in columns:
+        num_numeric_versions = sum(
+            is_numeric_column(wide[(version, col)])
+            for version in range(1, num_versions + 1)
+        )
+        tolerance, relative_tolerance = tolerances.get(col)
+        if (
+            num_numeric_versions == num_versions
+            and tolerance
+            and not relative_tolerance
+        ):
+            codes, pairwise_rows = get_tolerance_codes(wide, col, present, tolerance)
+        else:
+            codes = get_version_codes(wide, col, present)
+            pairwise_rows = None
+        highest = codes.max(axis=1)
+        # Only the variants whose versions do not all share a code can differ between versions
+        differing = np.where(codes < 0, highest[:, None], codes).min(axis=1) != highest
+        if pairwise_rows is None:
+            # Equal values never differ, so a tolerance only needs the variants with unequal values compared
+            if num_numeric_versions >= 2 and (tolerance or relative_tolerance):
+                pairwise_rows = differing
+            else:
+                pairwise_rows = np.zeros(len(wide), dtype=bool)
+
+        matrix = count_pair_differences(codes[differing & ~pairwise_rows])
+        agreeing = ~differing
+        if pairwise_rows.any():
+            pairwise_matrix, disagreeing = count_pairwise_differences(
+                wide, col, present, pairwise_rows, tolerance, relative_tolerance
+            )
+            matrix += pairwise_matrix
+            agreeing[pairwise_rows] = ~disagreeing
+        differences[col] = matrix
+        num_agreeing[col] = int(np.count_nonzero(in_all_versions & agreeing))
+
+    return {
+        "num_variants": len(wide),
+        "num_variants_in_all_versions": int(np.count_nonzero(in_all_versions)),
+        "num_missing": (len(wide) - present.sum(axis=0)).tolist(),
+        "num_repeated_ids": [len(df) - len(drop_duplicate_ids(df)) for df in dfs],
+        "missing": missing,
+        "differences": differences,
+        "num_agreeing": num_agreeing,
+    }
+
+
+def format_version_matrix(matrix):
+    """
+    Purpose:    Format a version by version matrix of counts as tab separated lines, leaving the diagonal blank
+    Modifies:   Nothing
+    Returns:    String of the matrix lines
+    """
+    num_versions = len(matrix)
+    lines = ["\t" + "\t".join(str(i) for i in range(1, num_versions + 1)) + "\n"]
+    for i, row in enumerate(matrix):
+        values = ["-" if i == j else str(value) for j, value in enumerate(row)]
+        lines.append(f"{i + 1}\t" + "\t".join(values) + "\n")
+    return "".join(lines)
+
+
+def generate_cohort_summary(results):
+    """
+    Purpose:    Create a summary of the variant counts and per column agreement across the versions
+    Modifies:   Nothing
+    Returns:    String of the summary
+    """
+    summary = f"\n/* Cohort Summary */\n"
+    summary += f"-----------------------------\n"
+    summary += f"Total number of variants: {results['num_variants']}\n"
+    summary += f"Number of variants in every version: {results['num_variants_in_all_versions']}\n"
+    for version, num_missing in enumerate(results["num_missing"], start=1):
+        summary += f"Number of variants missing from version {version}: {num_missing}\n"
+    for version, num_repeated_ids in enumerate(results["num_repeated_ids"], start=1):
+        if num_repeated_ids:
+            summary += f"Number of repeated IDs in version {version}, only the first row is compared: {num_repeated_ids}\n"
+    for col, num_agreeing in results["num_agreeing"].items():
+        summary += f"-----\n"
+        summary += (
+            f"Number of variants in every version agreeing on {col}: {num_agreeing}\n"
+        )
+    return summary
+
+
+def generate_cohort_report(
+    tool, results, input_files, output_path, columns_dropped_message=""
+):
+    """
+    Purpose:    Write the cohort summary and the version by version matrices of missing variants and of column
+                differences to the generated report, skipping matrices without any differences
+    Modifies:   Nothing
+    Returns:    None
+    """
+    try:
+        with append_to_report(output_path) as f:
+            f.write(
+                f"\n\n============================== {tool.upper()} COHORT COMPARISON ==============================\n\n\n"
+            )
+            for version, input_file in enumerate(input_files, start=1):
+                f.write(f"Version {version}: {input_file}\n")
+            if columns_dropped_message != "":
+                f.write(f"\n{columns_dropped_message}")
+            f.write(generate_cohort_summary(results))
+
+            if results["missing"].any():
+                f.write(
+                    f"\n\n============[ VARIANTS MISSING BETWEEN VERSIONS ]============\n\n\n"
+                )
+                f.write(
+                    "Variants in the row version missing from the column version\n\n"
+                )
+                f.write(format_version_matrix(results["missing"]))
+
+            for col, matrix in results["differences"].items():
+                if matrix.any():
+                    f.write(
+                        f"\n\n============[ DIFFERENCES IN {col.upper()} ]============\n\n\n"
+                    )
+                    f.write(
+                        "Common variants differing between each pair of versions\n\n"
+                    )
+                    f.write(format_version_matrix(matrix))
+    except Exception as e:
+        raise Exception(f"Error writing differences to file: {e}")
+
+
+def get_cohort_tables(tool, input_files, results):
+    """
+    Purpose:    Build the versions, missing variants and differences tables of a cohort comparison, with one row per
+                pair of versions
+    Modifies:   Nothing
+    Returns:    Dictionary of table names to dataframes
+    """
+    versions = pd.DataFrame(
+        {
+            "comparison": tool,
+            "version": range(1, len(input_files) + 1),
+            "file": input_files,
+            "num_missing": results["num_missing"],
+            "num_repeated_ids": results["num_repeated_ids"],
+        }
+    )
+    pairs = list(itertools.combinations(range(len(input_files)), 2))
+    version1 = [i + 1 for i, _ in pairs]
+    version2 = [j + 1 for _, j in pairs]
+    missing = pd.DataFrame(
+        {
+            "version1": version1,
+            "version2": version2,
+            "num_missing_from_version2": [results["missing"][i, j] for i, j in pairs],
+            "num_missing_from_version1": [results["missing"][j, i] for i, j in pairs],
+        }
+    )
+    differences = pd.DataFrame(
+        [
+            {
+                "column": col,
+                "version1": i + 1,
+                "version2": j + 1,
+                "num_differences": int(matrix[i, j]),
+            }
+            for col, matrix in results["differences"].items()
+            for i, j in pairs
+        ],
+        columns=["column", "version1", "version2", "num_differences"],
+    )
+    return {"versions": versions, "missing": missing, "differences": differences}
+
+
+def run_cohort_comparison(
+    tool,
+    comparison,
+    comparer,
+    input_files,
+    output_path,
+    columns_to_compare,
+    load_options=None,
+    tolerances=None,
+):
+    """
+    Purpose:    Control function for the cohort comparison of one tsv file across every version
+    Modifies:   Nothing
+    Returns:    None
+    """
+    with stage("load_cohort_files") as record:
+        dfs = load_cohort_files(input_files, comparer, columns_to_compare, load_options)
+        num_rows = record["rows"] = sum(len(df) for df in dfs)
+    columns, columns_dropped_message = output_dropped_cohort_cols(
+        dfs, columns_to_compare
+    )
+    with stage("get_cohort_differences", num_rows):
+        results = get_cohort_differences(dfs, columns, tolerances)
+    with stage("write_report", results["num_variants"]):
+        generate_cohort_report(
+            tool, results, input_files, output_path, columns_dropped_message
+        )
+    write_structured_tables(
+        output_path, comparison, get_cohort_tables, tool, input_files, results
+    )
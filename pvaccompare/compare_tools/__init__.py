@@ -1,2 +1,2 @@
-from .comparison_router import run_comparison
+from .comparison_router import run_comparison, run_comparisons
 from .validators import *
@@ -1,8 +1,23 @@
+from concurrent.futures import ProcessPoolExecutor
+import functools
 import glob
+import importlib
 import os
 import datetime
 import logging
-from runners import *
+import shutil
+import tempfile
+from file_utils import check_identical_files
+from profiling import add_stages, call_recording_stages, is_profiling, stage
+from report_writer import open_report
+from structured_output import (
+    get_structured_output_prefix,
+    record_structured_output,
+    write_identical_tables,
+)
+
+# The comparisons that can be selected, in report order
+COMPARISON_TYPES = ["yml", "json", "aggregated", "unaggregated", "reference_matches"]
 
 
 def find_file(results_folder, subfolder, pattern):
@@ -16,178 +31,520 @@ def find_file(results_folder, subfolder, pattern):
     return files[0] if files else None
 
 
+def run_lazy_runner(runner_module, *args):
+    """
+    Purpose:    Imports the runner module only when its comparison is run, so the dependencies of comparisons that
+                are not run are never loaded
+    Modifies:   Nothing
+    Returns:    The return value of the runner
+    """
+    return importlib.import_module(f"runners.{runner_module}").main(*args)
+
+
+run_compare_yml = functools.partial(run_lazy_runner, "run_compare_yml")
+run_compare_json = functools.partial(run_lazy_runner, "run_compare_json")
+run_compare_aggregated_tsv = functools.partial(
+    run_lazy_runner, "run_compare_aggregated_tsv"
+)
+run_compare_unaggregated_tsv = functools.partial(
+    run_lazy_runner, "run_compare_unaggregated_tsv"
+)
+run_compare_reference_matches_tsv = functools.partial(
+    run_lazy_runner, "run_compare_reference_matches_tsv"
+)
+
+
+def get_tsv_files(comparisons=None):
+    """
+    Purpose:    Lists the tsv files loaded into dataframes for the selected comparisons, or all of them if comparisons
+                is None, importing their comparers only when needed
+    Modifies:   Nothing
+    Returns:    List of (file type, file pattern, comparer class) tuples
+    """
+    from comparisons import (
+        CompareAggregatedTSV,
+        CompareReferenceMatchesTSV,
+        CompareUnaggregatedTSV,
+    )
+
+    tsv_files = {
+        "aggregated": (
+            "aggregated TSV",
+            "*all_epitopes.aggregated.tsv",
+            CompareAggregatedTSV,
+        ),
+        "unaggregated": (
+            "unaggregated TSV",
+            "*all_epitopes.tsv",
+            CompareUnaggregatedTSV,
+        ),
+        "reference_matches": (
+            "reference match TSV",
+            "*.reference_matches",
+            CompareReferenceMatchesTSV,
+        ),
+    }
+    return [
+        tsv_file
+        for comparison, tsv_file in tsv_files.items()
+        if comparisons is None or comparison in comparisons
+    ]
+
+
 def write_header(
-    output_file, aggregated_columns, unaggregated_columns, reference_match_columns
+    output_file,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    comparisons=None,
+    tolerances=None,
 ):
     """
-    Purpose:    Writes the report generation date and time to the top of the output file
+    Purpose:    Writes the report generation date and time, the comparisons that are run, their columns and any
+                configured numeric tolerances to the top of the output file
     Modifies:   Nothing
     Returns:    None
     """
+    if comparisons is None:
+        comparisons = COMPARISON_TYPES
+    comparisons_run = [
+        comparison for comparison in COMPARISON_TYPES if comparison in comparisons
+    ]
     with open(output_file, "w") as f:
         f.write(f"Report Generation Date and Time: {datetime.datetime.now()}\n\n")
-        f.write(f"Aggregated Columns: {aggregated_columns}\n")
-        f.write(f"Unaggregated Columns: {unaggregated_columns}\n")
-        f.write(f"Reference Match Columns: {reference_match_columns}\n\n")
+        f.write(f"Comparisons: {', '.join(comparisons_run)}\n")
+        if "aggregated" in comparisons:
+            f.write(f"Aggregated Columns: {aggregated_columns}\n")
+        if "unaggregated" in comparisons:
+            f.write(f"Unaggregated Columns: {unaggregated_columns}\n")
+        if "reference_matches" in comparisons:
+            f.write(f"Reference Match Columns: {reference_match_columns}\n")
+        if tolerances is not None:
+            f.write(f"Tolerances: {tolerances.describe()}\n")
+        f.write("\n")
 
 
-def run_comparison(
+def locate_files(
+    results_folder1, results_folder2, subfolder, pattern, file_type, prefix
+):
+    """
+    Purpose:    Locates the files for a comparison in both results folders, logging if either is missing
+    Modifies:   Nothing
+    Returns:    A tuple of the two file paths, or None if the comparison should be skipped
+    """
+    path1 = find_file(results_folder1, subfolder, pattern)
+    path2 = find_file(results_folder2, subfolder, pattern)
+    if path1 and path2:
+        return path1, path2
+
+    if path1:
+        logging.error(
+            "ERROR: Could not locate the %s file in results folder 2 for %s.",
+            file_type,
+            prefix,
+        )
+    elif path2:
+        logging.error(
+            "ERROR: Could not locate the %s file in results folder 1 for %s.",
+            file_type,
+            prefix,
+        )
+    else:
+        logging.error(
+            "ERROR: Could not locate the %s file in either results folder for %s.",
+            file_type,
+            prefix,
+        )
+    logging.info("\u2716 Comparison skipped.")
+    return None
+
+
+def get_comparison_jobs(
     prefix,
     results_folder1,
     results_folder2,
-    output_file,
     aggregated_columns,
     unaggregated_columns,
     reference_match_columns,
+    chunksize=None,
+    num_buckets=64,
+    load_options=None,
+    comparisons=None,
+    tolerances=None,
+    group_reference_matches=False,
+    snapshot_store=None,
 ):
     """
-    Purpose:    Runs all of the different comparisons
+    Purpose:    Locates the files for each selected comparison, or all of them if comparisons is None, in report
+                order as they are needed. The files of comparisons that are not selected are never located.
     Modifies:   Nothing
-    Returns:    None
+    Returns:    Generator of (comparison name, runner, file 1, file 2, extra runner arguments) tuples
     """
-    output_file = output_file + "_" + prefix.replace("/", "_") + ".tsv"
-    write_header(
-        output_file, aggregated_columns, unaggregated_columns, reference_match_columns
-    )
-
-    if "pVACseq" not in prefix:
-        yml1_path = find_file(results_folder1, prefix + "/log", "inputs.yml")
-        yml2_path = find_file(results_folder2, prefix + "/log", "inputs.yml")
-        if yml1_path and yml2_path:
-            logging.info("Running the input YML comparison tool...")
-            run_compare_yml(yml1_path, yml2_path, output_file)
-            logging.info("\u2713 Comparison completed successfully.")
-        else:
-            if yml1_path:
-                logging.error(
-                    "ERROR: Could not locate the input YML file in results folder 2 for %s.",
-                    prefix,
-                )
-            elif yml2_path:
-                logging.error(
-                    "ERROR: Could not locate the input YML file in results folder 1 for %s.",
-                    prefix,
-                )
-            else:
-                logging.error(
-                    "ERROR: Could not locate the input YML file in either results folder for %s.",
-                    prefix,
-                )
+    if comparisons is None:
+        comparisons = COMPARISON_TYPES
 
-            logging.info("\u2716 Comparison skipped.")
-    else:
-        logging.info("Input YML files are not included in immuno pipeline results")
-        logging.info("\u2716 Comparison skipped.")
-
-    json1_path = find_file(
-        results_folder1, prefix + "/", "*all_epitopes.aggregated.metrics.json"
-    )
-    json2_path = find_file(
-        results_folder2, prefix + "/", "*all_epitopes.aggregated.metrics.json"
-    )
-    if json1_path and json2_path:
-        logging.info("\nRunning the metrics JSON comparison tool...")
-        run_compare_json(json1_path, json2_path, output_file)
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if json1_path:
-            logging.error(
-                "ERROR: Could not locate the metrics JSON file in results folder 2 for %s.",
-                prefix,
-            )
-        elif json2_path:
-            logging.error(
-                "ERROR: Could not locate the metrics JSON file in results folder 1 for %s.",
+    if "yml" in comparisons:
+        if "pVACseq" not in prefix:
+            paths = locate_files(
+                results_folder1,
+                results_folder2,
+                prefix + "/log",
+                "inputs.yml",
+                "input YML",
                 prefix,
             )
+            if paths:
+                yield "input YML", run_compare_yml, *paths, ()
         else:
-            logging.error(
-                "ERROR: Could not locate the metrics JSON file in either results folder for %s.",
-                prefix,
-            )
-        logging.info("\u2716 Comparison skipped.")
+            logging.info("Input YML files are not included in immuno pipeline results")
+            logging.info("\u2716 Comparison skipped.")
 
-    agg_tsv1_path = find_file(
-        results_folder1, prefix + "/", "*all_epitopes.aggregated.tsv"
-    )
-    agg_tsv2_path = find_file(
-        results_folder2, prefix + "/", "*all_epitopes.aggregated.tsv"
-    )
-    if agg_tsv1_path and agg_tsv2_path:
-        logging.info("\nRunning the aggregated TSV comparison tool...")
-        run_compare_aggregated_tsv(
-            agg_tsv1_path, agg_tsv2_path, output_file, aggregated_columns
+    if "json" in comparisons:
+        paths = locate_files(
+            results_folder1,
+            results_folder2,
+            prefix + "/",
+            "*all_epitopes.aggregated.metrics.json",
+            "metrics JSON",
+            prefix,
         )
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if agg_tsv1_path:
-            logging.error(
-                "ERROR: Could not locate the aggregated TSV file in results folder 2 for %s.",
-                prefix,
-            )
-        elif agg_tsv2_path:
-            logging.error(
-                "ERROR: Could not locate the aggregated TSV file in results folder 1 for %s.",
-                prefix,
-            )
-        else:
-            logging.error(
-                "ERROR: Could not locate the aggregated TSV file in either results folder for %s.",
-                prefix,
-            )
-        logging.info("\u2716 Comparison skipped.")
-
-    unagg_tsv1_path = find_file(results_folder1, prefix + "/", "*all_epitopes.tsv")
-    unagg_tsv2_path = find_file(results_folder2, prefix + "/", "*all_epitopes.tsv")
-    if unagg_tsv1_path and unagg_tsv2_path:
-        logging.info("\nRunning the unaggregated TSV comparison tool...")
-        run_compare_unaggregated_tsv(
-            unagg_tsv1_path, unagg_tsv2_path, output_file, unaggregated_columns
+        if paths:
+            yield "metrics JSON", run_compare_json, *paths, ()
+
+    if "aggregated" in comparisons:
+        paths = locate_files(
+            results_folder1,
+            results_folder2,
+            prefix + "/",
+            "*all_epitopes.aggregated.tsv",
+            "aggregated TSV",
+            prefix,
         )
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if unagg_tsv1_path:
-            logging.error(
-                "ERROR: Could not locate the unaggregated TSV file in results folder 2 for %s.",
-                prefix,
-            )
-        elif unagg_tsv2_path:
-            logging.error(
-                "ERROR: Could not locate the unaggregated TSV file in results folder 1 for %s.",
-                prefix,
+        if paths:
+            yield (
+                "aggregated TSV",
+                run_compare_aggregated_tsv,
+                *paths,
+                (aggregated_columns, load_options, tolerances, snapshot_store),
             )
-        else:
-            logging.error(
-                "ERROR: Could not locate the unaggregated TSV file in either results folder for %s.",
-                prefix,
+
+    if "unaggregated" in comparisons:
+        paths = locate_files(
+            results_folder1,
+            results_folder2,
+            prefix + "/",
+            "*all_epitopes.tsv",
+            "unaggregated TSV",
+            prefix,
+        )
+        if paths:
+            yield (
+                "unaggregated TSV",
+                run_compare_unaggregated_tsv,
+                *paths,
+                (
+                    unaggregated_columns,
+                    chunksize,
+                    num_buckets,
+                    load_options,
+                    tolerances,
+                    snapshot_store,
+                ),
             )
-        logging.info("\u2716 Comparison skipped.")
-
-    refmatch_tsv1_path = find_file(results_folder1, prefix + "/", "*.reference_matches")
-    refmatch_tsv2_path = find_file(results_folder2, prefix + "/", "*.reference_matches")
-    if refmatch_tsv1_path and refmatch_tsv2_path:
-        logging.info("\nRunning the reference match TSV comparison tool...")
-        run_compare_reference_matches_tsv(
-            refmatch_tsv1_path, refmatch_tsv2_path, output_file, reference_match_columns
+
+    if "reference_matches" in comparisons:
+        paths = locate_files(
+            results_folder1,
+            results_folder2,
+            prefix + "/",
+            "*.reference_matches",
+            "reference match TSV",
+            prefix,
         )
-        logging.info("\u2713 Comparison completed successfully.")
-    else:
-        if refmatch_tsv1_path:
-            logging.error(
-                "ERROR: Could not locate the reference match TSV file in results folder 2 for %s.",
-                prefix,
+        if paths:
+            yield (
+                "reference match TSV",
+                run_compare_reference_matches_tsv,
+                *paths,
+                (
+                    reference_match_columns,
+                    load_options,
+                    tolerances,
+                    group_reference_matches,
+                ),
             )
-        elif refmatch_tsv2_path:
-            logging.error(
-                "ERROR: Could not locate the reference match TSV file in results folder 1 for %s.",
-                prefix,
+
+
+def get_report_path(output_file, prefix):
+    """
+    Purpose:    Builds the report file name for the given prefix
+    Modifies:   Nothing
+    Returns:    A string of the report file path
+    """
+    return output_file + "_" + prefix.replace("/", "_") + ".tsv"
+
+
+def get_structured_output(report_path, structured_format):
+    """
+    Purpose:    Builds the structured output settings for a report
+    Modifies:   Nothing
+    Returns:    A (path prefix, format) tuple, or None if structured output is disabled
+    """
+    if structured_format is None:
+        return None
+    return get_structured_output_prefix(report_path), structured_format
+
+
+def log_comparison_start(comparison_name, action="Running"):
+    """
+    Purpose:    Logs that a comparison is starting
+    Modifies:   Nothing
+    Returns:    None
+    """
+    separator = "" if comparison_name == "input YML" else "\n"
+    logging.info("%s%s the %s comparison tool...", separator, action, comparison_name)
+
+
+def log_report_completion(prefix):
+    """
+    Purpose:    Logs that the report for the given prefix has been generated
+    Modifies:   Nothing
+    Returns:    None
+    """
+    logging.info("\n" + "\u2500" * 55)
+    logging.info("Successfully generated %s comparison report.", prefix)
+    logging.info("\u2500" * 55)
+
+
+def run_comparison_job(
+    comparison_name,
+    runner,
+    input_file1,
+    input_file2,
+    output_file,
+    args,
+    structured_output=None,
+):
+    """
+    Purpose:    Runs a single comparison, skipping parsing entirely when the two files are byte-identical.
+                structured_output is a (path prefix, format) tuple if the results should also be written
+                as structured files, in which case identical files still get a summary table
+    Modifies:   output_file
+    Returns:    The path of the output file
+    """
+    identical_outputs = {
+        "input YML": ("The YAML input files are identical.", "input_yml", "Input YML"),
+        "metrics JSON": (
+            "The JSON metric inputs are identical.",
+            "metrics_json",
+            "Metrics JSON",
+        ),
+        "aggregated TSV": (
+            "The Aggregated TSV files are identical.",
+            "aggregated_tsv",
+            "Aggregated TSV",
+        ),
+        "unaggregated TSV": (
+            "The Unaggregated TSV files are identical.",
+            "unaggregated_tsv",
+            "Unaggregated TSV",
+        ),
+        "reference match TSV": (
+            "The Reference Matches TSV files are identical.",
+            "reference_match_tsv",
+            "Reference Matches TSV",
+        ),
+    }
+    with stage("check_identical_files"):
+        identical = check_identical_files(input_file1, input_file2)
+    with record_structured_output(output_file, structured_output):
+        if identical:
+            message, comparison, tool = identical_outputs[comparison_name]
+            logging.info(message)
+            write_identical_tables(
+                output_file, comparison, tool, input_file1, input_file2
             )
         else:
-            logging.error(
-                "ERROR: Could not locate the reference match TSV file in either results folder for %s.",
+            with open_report(output_file):
+                runner(input_file1, input_file2, output_file, *args)
+    return output_file
+
+
+def run_comparison(
+    prefix,
+    results_folder1,
+    results_folder2,
+    output_file,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    chunksize=None,
+    num_buckets=64,
+    load_options=None,
+    structured_format=None,
+    comparisons=None,
+    tolerances=None,
+    group_reference_matches=False,
+    snapshot_store=None,
+):
+    """
+    Purpose:    Runs the selected comparisons, or all of them if comparisons is None
+    Modifies:   Nothing
+    Returns:    None
+    """
+    output_file = get_report_path(output_file, prefix)
+    structured_output = get_structured_output(output_file, structured_format)
+    write_header(
+        output_file,
+        aggregated_columns,
+        unaggregated_columns,
+        reference_match_columns,
+        comparisons,
+        tolerances,
+    )
+
+    jobs = get_comparison_jobs(
+        prefix,
+        results_folder1,
+        results_folder2,
+        aggregated_columns,
+        unaggregated_columns,
+        reference_match_columns,
+        chunksize,
+        num_buckets,
+        load_options,
+        comparisons,
+        tolerances,
+        group_reference_matches,
+        snapshot_store,
+    )
+    with open_report(output_file):
+        for comparison_name, runner, input_file1, input_file2, args in jobs:
+            log_comparison_start(comparison_name)
+            with stage(f"{prefix} {comparison_name}"):
+                run_comparison_job(
+                    comparison_name,
+                    runner,
+                    input_file1,
+                    input_file2,
+                    output_file,
+                    args,
+                    structured_output,
+                )
+            logging.info("\u2713 Comparison completed successfully.")
+    log_report_completion(prefix)
+
+
+def run_comparisons(
+    prefixes,
+    results_folder1,
+    results_folder2,
+    output_file,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    chunksize=None,
+    num_buckets=64,
+    load_options=None,
+    jobs=1,
+    structured_format=None,
+    comparisons=None,
+    tolerances=None,
+    group_reference_matches=False,
+    snapshot_store=None,
+):
+    """
+    Purpose:    Runs the selected comparisons for every prefix, spreading them across a pool of processes when
+                jobs > 1. Each comparison writes to its own section file and the sections are assembled
+                in report order, so the reports do not depend on which comparison finishes first.
+    Modifies:   Nothing
+    Returns:    None
+    """
+    if jobs <= 1:
+        for prefix in prefixes:
+            run_comparison(
                 prefix,
+                results_folder1,
+                results_folder2,
+                output_file,
+                aggregated_columns,
+                unaggregated_columns,
+                reference_match_columns,
+                chunksize,
+                num_buckets,
+                load_options,
+                structured_format,
+                comparisons,
+                tolerances,
+                group_reference_matches,
+                snapshot_store,
             )
-        logging.info("\u2716 Comparison skipped.")
-    logging.info("\n" + "\u2500" * 55)
-    logging.info("Successfully generated %s comparison report.", prefix)
-    logging.info("\u2500" * 55)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="pvaccompare_sections_") as section_dir:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            scheduled = []
+            for prefix in prefixes:
+                structured_output = get_structured_output(
+                    get_report_path(output_file, prefix), structured_format
+                )
+                sections = []
+                for job in get_comparison_jobs(
+                    prefix,
+                    results_folder1,
+                    results_folder2,
+                    aggregated_columns,
+                    unaggregated_columns,
+                    reference_match_columns,
+                    chunksize,
+                    num_buckets,
+                    load_options,
+                    comparisons,
+                    tolerances,
+                    group_reference_matches,
+                    snapshot_store,
+                ):
+                    comparison_name, runner, input_file1, input_file2, args = job
+                    log_comparison_start(comparison_name, "Scheduling")
+                    section_file = os.path.join(
+                        section_dir, f"{prefix.replace('/', '_')}_{len(sections)}.tsv"
+                    )
+                    open(section_file, "w").close()
+                    future = executor.submit(
+                        call_recording_stages,
+                        is_profiling(),
+                        f"{prefix} {comparison_name}",
+                        run_comparison_job,
+                        comparison_name,
+                        runner,
+                        input_file1,
+                        input_file2,
+                        section_file,
+                        args,
+                        structured_output,
+                    )
+                    sections.append((comparison_name, future))
+                scheduled.append((prefix, sections))
+
+            for prefix, sections in scheduled:
+                report_path = get_report_path(output_file, prefix)
+                write_header(
+                    report_path,
+                    aggregated_columns,
+                    unaggregated_columns,
+                    reference_match_columns,
+                    comparisons,
+                    tolerances,
+                )
+                with open(report_path, "a") as report:
+                    for comparison_name, future in sections:
+                        section_file, stages = future.result()
+                        add_stages(stages)
+                        with open(section_file) as section:
+                            shutil.copyfileobj(section, report)
+                        logging.info(
+                            "\u2713 %s %s comparison completed successfully.",
+                            prefix,
+                            comparison_name,
+                        )
+                log_report_completion(prefix)
@@ -119,3 +119,23 @@ def validate_reference_match_columns(reference_match_columns, parser):
             parser.error(
                 f"Invalid reference match column '{col}' specified.\nValid columns are: {', '.join(valid_reference_match_columns)}"
             )
+
+
+def validate_comparisons(comparisons, parser):
+    """
+    Purpose:    Makes sure the user inputs valid comparison types
+    Modifies:   Nothing
+    Returns:    None
+    """
+    valid_comparisons = [
+        "yml",
+        "json",
+        "aggregated",
+        "unaggregated",
+        "reference_matches",
+    ]
+    for comparison in comparisons:
+        if comparison not in valid_comparisons:
+            parser.error(
+                f"Invalid comparison '{comparison}' specified.\nValid comparisons are: {', '.join(valid_comparisons)}"
+            )
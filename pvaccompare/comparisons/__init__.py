@@ -1,5 +1,25 @@
-from .compare_aggregated_tsv import CompareAggregatedTSV
-from .compare_json import CompareJSON
-from .compare_reference_matches_tsv import CompareReferenceMatchesTSV
-from .compare_unaggregated_tsv import CompareUnaggregatedTSV
-from .compare_yml import CompareYML
+import importlib
+
+# Each comparer is imported when it is first used, so the dependencies of the other comparisons are not loaded
+comparer_modules = {
+    "CompareAggregatedTSV": ".compare_aggregated_tsv",
+    "CompareJSON": ".compare_json",
+    "CompareReferenceMatchesTSV": ".compare_reference_matches_tsv",
+    "CompareUnaggregatedTSV": ".compare_unaggregated_tsv",
+    "CompareYML": ".compare_yml",
+}
+
+__all__ = list(comparer_modules)
+
+
+def __getattr__(name):
+    """
+    Purpose:    Import the comparer module on first access and return its comparer class
+    Modifies:   The comparisons package attributes
+    Returns:    The comparer class
+    """
+    if name not in comparer_modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    comparer = getattr(importlib.import_module(comparer_modules[name], __name__), name)
+    globals()[name] = comparer
+    return comparer
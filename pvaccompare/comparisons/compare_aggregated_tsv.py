@@ -3,15 +3,37 @@ import logging
 
 
 class CompareAggregatedTSV:
-    def __init__(self, input_file1, input_file2, output_file, columns_to_compare):
+    ID_replacement_cols = ["Gene", "AA Change"]
+
+    @classmethod
+    def get_load_arguments(cls, columns_to_compare):
+        """
+        Purpose:    Get the columns to load from the files and the columns combined into the ID
+        Modifies:   Nothing
+        Returns:    List of required columns and None, as the files already have an ID column
+        """
+        return ["ID"] + cls.ID_replacement_cols + columns_to_compare, None
+
+    def __init__(
+        self,
+        input_file1,
+        input_file2,
+        output_file,
+        columns_to_compare,
+        load_options=None,
+    ):
         self.input_file1 = input_file1
         self.input_file2 = input_file2
         self.output_path = output_file
-        self.df1, self.df2 = load_tsv_files(self.input_file1, self.input_file2)
         self.contains_id = True
         self.replaced_id = False
-        self.ID_replacement_cols = ["Gene", "AA Change"]
         self.columns_to_compare = columns_to_compare
+        self.df1, self.df2 = load_tsv_files(
+            self.input_file1,
+            self.input_file2,
+            *self.get_load_arguments(self.columns_to_compare),
+            **(load_options or {}),
+        )
 
     def check_id(self):
         """
@@ -1,4 +1,6 @@
 import json
+from report_writer import append_to_report
+from structured_output import get_change_table, get_summary_table
 
 
 class CompareJSON:
@@ -75,7 +77,7 @@ class CompareJSON:
         Returns:    None
         """
         try:
-            with open(self.output_path, "a") as f:
+            with append_to_report(self.output_path) as f:
                 f.write(
                     "\n============================== METRICS JSON COMPARISON ==============================\n\n\n"
                 )
@@ -104,3 +106,32 @@ class CompareJSON:
                                 f.write("\n")
         except Exception as e:
             print(f"Error writing metrics input differences to file: {e}")
+
+    def get_structured_tables(self):
+        """
+        Purpose:    Build the summary and structured output table of the json metric input differences, values written as json
+        Modifies:   Nothing
+        Returns:    Dictionary of table names to dataframes
+        """
+        filtered_data1 = self.filter_chr_keys(self.json1)
+        filtered_data2 = self.filter_chr_keys(self.json2)
+        records = []
+        for key, value in self.input_differences["Fields Unique to File 1"].items():
+            records.append(["Fields Unique to File 1", key, json.dumps(value), None])
+        for key, value in self.input_differences["Fields Unique to File 2"].items():
+            records.append(["Fields Unique to File 2", key, None, json.dumps(value)])
+        for key in self.input_differences["Values Changed"]:
+            records.append(
+                [
+                    "Values Changed",
+                    key,
+                    json.dumps(filtered_data1[key]),
+                    json.dumps(filtered_data2[key]),
+                ]
+            )
+        return {
+            "summary": get_summary_table(
+                "Metrics JSON", self.input_file1, self.input_file2, len(records)
+            ),
+            "differences": get_change_table(records),
+        }
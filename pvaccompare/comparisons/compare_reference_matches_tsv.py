@@ -3,71 +3,80 @@ import logging
 
 
 class CompareReferenceMatchesTSV:
-    def __init__(self, input_file1, input_file2, output_file, columns_to_compare):
+    id_columns = [
+        "Chromosome",
+        "Start",
+        "Stop",
+        "Reference",
+        "Variant",
+        "Transcript",
+        "MT Epitope Seq",
+        "Hit ID",
+        "Match Start",
+        "Match Stop",
+    ]
+
+    @classmethod
+    def get_load_arguments(cls, columns_to_compare):
+        """
+        Purpose:    Get the columns to load from the files and the columns combined into the ID
+        Modifies:   Nothing
+        Returns:    List of required columns and list of ID columns
+        """
+        return cls.id_columns + columns_to_compare, cls.id_columns
+
+    def __init__(
+        self,
+        input_file1,
+        input_file2,
+        output_file,
+        columns_to_compare,
+        load_options=None,
+    ):
         self.input_file1 = input_file1
         self.input_file2 = input_file2
         self.output_path = output_file
-        self.df1, self.df2 = load_tsv_files(self.input_file1, self.input_file2)
         self.columns_to_compare = columns_to_compare
+        self.df1, self.df2 = load_tsv_files(
+            self.input_file1,
+            self.input_file2,
+            *self.get_load_arguments(self.columns_to_compare),
+            **(load_options or {}),
+        )
         self.hits_file1 = {}
         self.hits_file2 = {}
 
-    def create_id_column(self):
-        """
-        Purpose:    Combines multiple columns into a singular unique ID column in both dataframes
-        Modifies:   df1 and df2
-        Returns:    None
+    def check_duplicate_ids(self, grouped=False):
         """
-        id_columns = [
-            "Chromosome",
-            "Start",
-            "Stop",
-            "Reference",
-            "Variant",
-            "Transcript",
-            "MT Epitope Seq",
-            "Hit ID",
-            "Match Start",
-            "Match Stop",
-        ]
-        self.df1["ID"] = self.df1[id_columns].apply(
-            lambda x: "-".join(map(str, x)), axis=1
-        )
-        self.df2["ID"] = self.df2[id_columns].apply(
-            lambda x: "-".join(map(str, x)), axis=1
-        )
-
-        self.df1.drop(columns=id_columns, inplace=True)
-        self.df2.drop(columns=id_columns, inplace=True)
-
-    def check_duplicate_ids(self):
-        """
-        Purpose:    Checks if duplicate IDs exist in either dataframe
+        Purpose:    Checks if duplicate IDs exist in either dataframe, logging whether the records are compared as
+                    groups or only their number of hits is written
         Modifies:   Nothing
         Returns:    Boolean value
         """
-        self.hits_file1 = self.df1["ID"].value_counts().to_dict()
-        self.hits_file2 = self.df2["ID"].value_counts().to_dict()
-
-        max_hits_file1 = max(self.hits_file1.values(), default=0)
-        max_hits_file2 = max(self.hits_file2.values(), default=0)
+        _, num_ids1 = get_variant_codes(self.df1)
+        _, num_ids2 = get_variant_codes(self.df2)
+        duplicates_file1 = num_ids1 < len(self.df1)
+        duplicates_file2 = num_ids2 < len(self.df2)
+        if not duplicates_file1 and not duplicates_file2:
+            return False
 
-        if max_hits_file1 > 1 or max_hits_file2 > 1:
-            if max_hits_file1 > 1 and max_hits_file2 > 1:
-                logging.error(
-                    "ERROR: Duplicate unique records were found in both files. Writing number of hits only."
-                )
-            elif max_hits_file1 > 1:
-                logging.error(
-                    "ERROR: Duplicate unique records were found in file 1. Writing number of hits only."
-                )
-            else:
-                logging.error(
-                    "ERROR: Duplicate unique records were found in file 2. Writing number of hits only."
-                )
-            return True
+        if duplicates_file1 and duplicates_file2:
+            files = "both files"
+        elif duplicates_file1:
+            files = "file 1"
         else:
-            return False
+            files = "file 2"
+        if grouped:
+            logging.info(
+                "\u2022 Duplicate unique records were found in %s. Comparing the values of each record as a group.",
+                files,
+            )
+        else:
+            logging.error(
+                "ERROR: Duplicate unique records were found in %s. Writing number of hits only.",
+                files,
+            )
+        return True
 
     def output_counts(self, differences_summary, id_format):
         """
@@ -75,14 +84,25 @@ class CompareReferenceMatchesTSV:
         Modifies:   Nothing
         Returns:    None
         """
-        sorted_hits_file1 = dict(
-            sorted(self.hits_file1.items(), key=lambda x: extract_id_parts(x[0]))
+        # Every ID is written, so the ID strings are built for all of the rows
+        self.hits_file1 = (
+            pd.Series(get_ids(self.df1, np.arange(len(self.df1))))
+            .value_counts()
+            .to_dict()
         )
-        sorted_hits_file2 = dict(
-            sorted(self.hits_file2.items(), key=lambda x: extract_id_parts(x[0]))
+        self.hits_file2 = (
+            pd.Series(get_ids(self.df2, np.arange(len(self.df2))))
+            .value_counts()
+            .to_dict()
         )
+        sorted_hits_file1 = {
+            key: self.hits_file1[key] for key in sort_ids(self.hits_file1)
+        }
+        sorted_hits_file2 = {
+            key: self.hits_file2[key] for key in sort_ids(self.hits_file2)
+        }
 
-        with open(self.output_path, "a") as f:
+        with append_to_report(self.output_path) as f:
             f.write(
                 f"\n\n============================== REFERENCE MATCH TSV COMPARISON ==============================\n\n\n"
             )
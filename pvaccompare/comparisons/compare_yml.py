@@ -1,6 +1,12 @@
 import yaml
-from deepdiff import DeepDiff
-import re
+from report_writer import append_to_report
+from structured_output import get_change_table, get_summary_table
+
+# The libyaml C loader is several times faster than the pure Python one when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Types of the values the flat differ compares directly, anything nested is compared with DeepDiff
+SCALAR_TYPES = (str, int, float, bool, type(None))
 
 
 class CompareYML:
@@ -9,14 +15,15 @@ class CompareYML:
         self.input_file2 = input_file2
         self.output_path = output_file
         self.data1, self.data2 = self.load_files()
-        self.differences = DeepDiff(self.data1, self.data2, ignore_order=True)
         self.output_mappings = {
+            "type_changes": "Types Changed",
             "dictionary_item_added": "Fields Unique to File 2",
             "dictionary_item_removed": "Fields Unique to File 1",
             "values_changed": "Values Changed",
             "iterable_item_added": "Values Added in File 2",
             "iterable_item_removed": "Values Removed in File 2",
         }
+        self.differences = self.get_differences()
 
     def load_files(self):
         """
@@ -25,49 +32,164 @@ class CompareYML:
         Returns:    Two dictionaries corresponding to the two input files
         """
         with open(self.input_file1, "r") as f1, open(self.input_file2, "r") as f2:
-            data1 = yaml.safe_load(f1)
-            data2 = yaml.safe_load(f2)
+            data1 = yaml.load(f1, Loader=YAML_LOADER)
+            data2 = yaml.load(f2, Loader=YAML_LOADER)
         return data1, data2
 
+    @staticmethod
+    def is_flat_value(value):
+        """
+        Purpose:    Check if a value is a scalar or a list of scalars, the only values found in the inputs.yml written
+                    by pVACtools
+        Modifies:   Nothing
+        Returns:    True/False
+        """
+        if isinstance(value, list):
+            return all(isinstance(item, SCALAR_TYPES) for item in value)
+        return isinstance(value, SCALAR_TYPES)
+
+    def get_differences(self):
+        """
+        Purpose:    Compare the top-level fields of the two yml files, comparing scalars directly and lists of scalars
+                    as sets, and only passing the nested fields to DeepDiff
+        Modifies:   Nothing
+        Returns:    Dictionary of change types to lists of (field, value in file 1, value in file 2) tuples, which is
+                    empty if the files are identical
+        """
+        if not isinstance(self.data1, dict) or not isinstance(self.data2, dict):
+            return self.get_nested_differences(self.data1, self.data2)
+
+        differences = {change_type: [] for change_type in self.output_mappings}
+        for field, value2 in self.data2.items():
+            if field not in self.data1:
+                differences["dictionary_item_added"].append((field, None, value2))
+        nested1, nested2 = {}, {}
+        for field, value1 in self.data1.items():
+            if field not in self.data2:
+                differences["dictionary_item_removed"].append((field, value1, None))
+                continue
+            value2 = self.data2[field]
+            if not self.is_flat_value(value1) or not self.is_flat_value(value2):
+                nested1[field] = value1
+                nested2[field] = value2
+            elif type(value1) is not type(value2):
+                differences["type_changes"].append((field, value1, value2))
+            elif isinstance(value1, list):
+                items1 = dict.fromkeys(value1)
+                items2 = dict.fromkeys(value2)
+                for item in items2:
+                    if item not in items1:
+                        differences["iterable_item_added"].append((field, None, item))
+                for item in items1:
+                    if item not in items2:
+                        differences["iterable_item_removed"].append((field, item, None))
+            elif value1 != value2:
+                differences["values_changed"].append((field, value1, value2))
+
+        if nested1:
+            for change_type, changes in self.get_nested_differences(
+                nested1, nested2
+            ).items():
+                differences.setdefault(change_type, []).extend(changes)
+        return {
+            change_type: changes
+            for change_type, changes in differences.items()
+            if changes
+        }
+
+    def get_nested_differences(self, data1, data2):
+        """
+        Purpose:    Compare nested yml values with DeepDiff, reporting each change under its top-level field
+        Modifies:   Nothing
+        Returns:    Dictionary of change types to lists of (field, value in file 1, value in file 2) tuples
+        """
+        from deepdiff import DeepDiff
+
+        tree = DeepDiff(data1, data2, ignore_order=True, view="tree")
+        differences = {
+            change_type: []
+            for change_type in list(self.output_mappings) + list(tree)
+            if change_type in tree
+        }
+        for change_type in differences:
+            for level in tree[change_type]:
+                path = level.path(output_format="list")
+                field = path[0] if path else ""
+                if change_type == "dictionary_item_added":
+                    values = (None, data2[field])
+                elif change_type == "dictionary_item_removed":
+                    values = (data1[field], None)
+                elif change_type.endswith("_added"):
+                    values = (None, level.t2)
+                elif change_type.endswith("_removed"):
+                    values = (level.t1, None)
+                else:
+                    values = (level.t1, level.t2)
+                differences[change_type].append((field,) + values)
+        return differences
+
+    @staticmethod
+    def format_change(change_type, field, value1, value2):
+        """
+        Purpose:    Format a single yml difference for the generated report
+        Modifies:   Nothing
+        Returns:    String of the formatted difference
+        """
+        if change_type in ["dictionary_item_added", "dictionary_item_removed"]:
+            return f"{field}"
+        if change_type == "values_changed":
+            return f"{field}: {value1} -> {value2}"
+        if change_type == "type_changes":
+            return f"{field}: {type(value1)} -> {type(value2)}"
+        if change_type.endswith("_added"):
+            return f"{field}: {value2}"
+        return f"{field}: {value1}"
+
     def interpret_diff(self):
         """
         Purpose:    Write all of the input yml differences found to the generated report
         Modifies:   Nothing
         Returns:    None
         """
-        with open(self.output_path, "a") as f:
+        with append_to_report(self.output_path) as f:
             f.write(
                 "\n============================== INPUT YML COMPARISON ==============================\n\n\n"
             )
             f.write(f"File 1: {self.input_file1}\n")
             f.write(f"File 2: {self.input_file2}\n\n")
             for change_type, changes in self.differences.items():
-                f.write(f"=== {self.output_mappings[change_type]} ===\n")
-                pattern = r"root\['(.*?)'\]"
-                if isinstance(changes, dict):
-                    for change, details in changes.items():
-                        formatted_output = re.match(pattern, change)[1]
-                        if change_type == "values_changed":
-                            f.write(
-                                f"\t{formatted_output}: {details['old_value']} -> {details['new_value']}\n"
-                            )
-                        elif change_type in [
-                            "dictionary_item_added",
-                            "dictionary_item_removed",
-                        ]:
-                            f.write(f"\t{formatted_output}: {details}\n")
-                        elif change_type == "type_changes":
-                            f.write(
-                                f"\t{formatted_output}: {details['old_type']} -> {details['new_type']}\n"
-                            )
-                        elif change_type in [
-                            "iterable_item_added",
-                            "iterable_item_removed",
-                        ]:
-                            f.write(f"\t{formatted_output}: {details}\n")
-                else:
-                    changes = str(changes)
-                    matches = re.findall(pattern, changes)
-                    formatted_output = "\n\t".join(matches)
-                    f.write(f"\t{formatted_output}\n")
+                f.write(
+                    f"=== {self.output_mappings.get(change_type, change_type)} ===\n"
+                )
+                for change in changes:
+                    f.write(f"\t{self.format_change(change_type, *change)}\n")
                 f.write("\n")
+
+    def get_structured_tables(self):
+        """
+        Purpose:    Build the summary and structured output table of the input yml differences
+        Modifies:   Nothing
+        Returns:    Dictionary of table names to dataframes
+        """
+        records = []
+        for change_type, changes in self.differences.items():
+            name = self.output_mappings.get(change_type, change_type)
+            for field, value1, value2 in changes:
+                if change_type == "type_changes":
+                    values = [str(type(value1)), str(type(value2))]
+                elif change_type == "dictionary_item_added":
+                    values = [None, str(value2)]
+                elif change_type == "dictionary_item_removed":
+                    values = [str(value1), None]
+                else:
+                    values = [
+                        None if value is None else str(value)
+                        for value in (value1, value2)
+                    ]
+                records.append([name, str(field)] + values)
+        return {
+            "summary": get_summary_table(
+                "Input YML", self.input_file1, self.input_file2, len(records)
+            ),
+            "differences": get_change_table(records),
+        }
@@ -0,0 +1,149 @@
+from arrow_files import check_arrow_file, get_arrow_path, write_arrow_file
+from compare_tools.comparison_router import get_tsv_files
+from concurrent.futures import ProcessPoolExecutor
+from run import positive_int
+from run_utils import get_column_renames, load_tsv_file, prepare_dataframe
+import argparse
+import glob
+import importlib.util
+import logging
+import os
+import pandas as pd
+
+logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+
+# The comparisons whose tsv files can be converted
+TSV_COMPARISONS = ["aggregated", "unaggregated", "reference_matches"]
+
+
+def define_parser():
+    """
+    Purpose:    Define arguments for the parser that the user can use
+    Modifies:   Nothing
+    Returns:    The parser
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Convert the TSV files of results folders into Arrow files that later comparisons load without parsing",
+    )
+    parser.add_argument(
+        "results_folders", nargs="+", help="Paths to the results folders to convert"
+    )
+    parser.add_argument(
+        "--comparisons",
+        type=lambda s: [a for a in s.split(",")],
+        default=TSV_COMPARISONS,
+        help=f"Comma-separated comparisons whose TSV files are converted, choices: {', '.join(TSV_COMPARISONS)}",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Convert files that already have an up to date Arrow file again",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of files to convert concurrently in separate processes",
+    )
+    return parser
+
+
+def find_tsv_files(results_folders, comparisons):
+    """
+    Purpose:    Find the tsv files of the selected comparisons anywhere in the results folders
+    Modifies:   Nothing
+    Returns:    List of (tsv file, ID columns) tuples
+    """
+    tsv_files = []
+    for results_folder in results_folders:
+        for _, pattern, comparer in get_tsv_files(comparisons):
+            _, id_columns = comparer.get_load_arguments([])
+            for input_file in sorted(
+                glob.glob(os.path.join(results_folder, "**", pattern), recursive=True)
+            ):
+                tsv_files.append((input_file, id_columns))
+    return tsv_files
+
+
+def convert_tsv_file(input_file, id_columns=None):
+    """
+    Purpose:    Parse every column of a tsv file, prepare it the way the comparisons do and write it as an Arrow file,
+                so comparisons of any set of columns can load it without parsing the tsv file again
+    Modifies:   The Arrow file of input_file
+    Returns:    String of the Arrow file path
+    """
+    header = pd.read_csv(input_file, sep="\t", nrows=0).columns
+    renames = get_column_renames(header)
+    df = load_tsv_file(input_file, [renames.get(col, col) for col in header])
+    prepare_dataframe(df, id_columns)
+    return write_arrow_file(df, input_file, id_columns, renames)
+
+
+def call_converting(input_file, id_columns=None):
+    """
+    Purpose:    Convert a tsv file, catching the error so the other files are still converted
+    Modifies:   The Arrow file of input_file
+    Returns:    String of the error, or None if the file was converted
+    """
+    try:
+        convert_tsv_file(input_file, id_columns)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def convert_results_folders(results_folders, comparisons=None, force=False, jobs=1):
+    """
+    Purpose:    Convert the tsv files of the selected comparisons in every results folder, skipping those that already
+                have an up to date Arrow file unless force is True
+    Modifies:   The Arrow files next to the tsv files
+    Returns:    List of the converted tsv files
+    """
+    tsv_files = []
+    for input_file, id_columns in find_tsv_files(results_folders, comparisons):
+        if not force and check_arrow_file(input_file, id_columns):
+            logging.info("\u2022 %s is already converted", input_file)
+        else:
+            tsv_files.append((input_file, id_columns))
+
+    if jobs <= 1 or not tsv_files:
+        results = [call_converting(*tsv_file) for tsv_file in tsv_files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(call_converting, *zip(*tsv_files)))
+
+    converted = []
+    for (input_file, _), error in zip(tsv_files, results):
+        if error:
+            logging.error("\u2716 Could not convert %s: %s", input_file, error)
+        else:
+            logging.info(
+                "\u2713 Converted %s to %s", input_file, get_arrow_path(input_file)
+            )
+            converted.append(input_file)
+    return converted
+
+
+def main():
+    """
+    Purpose:    Control function for converting the tsv files of results folders to Arrow files
+    Modifies:   Nothing
+    Returns:    None
+    """
+    parser = define_parser()
+    args = parser.parse_args()
+    if importlib.util.find_spec("pyarrow") is None:
+        parser.error("pyarrow needs to be installed to convert the TSV files")
+    for comparison in args.comparisons:
+        if comparison not in TSV_COMPARISONS:
+            parser.error(
+                f"Invalid comparison '{comparison}', choices: {', '.join(TSV_COMPARISONS)}"
+            )
+    convert_results_folders(
+        args.results_folders, args.comparisons, args.force, args.jobs
+    )
+
+
+if __name__ == "__main__":
+    main()
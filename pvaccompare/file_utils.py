@@ -0,0 +1,40 @@
+import functools
+import hashlib
+import os
+
+
+def get_file_digest(path):
+    """
+    Purpose:    Get a digest of the file contents, reusing it while the file's size and modification time are unchanged
+    Modifies:   Nothing
+    Returns:    String of the hexadecimal digest
+    """
+    stat = os.stat(path)
+    return hash_file_contents(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=None)
+def hash_file_contents(path, size, mtime_ns, block_size=1 << 20):
+    """
+    Purpose:    Stream the file through a blake2b digest, size and mtime_ns are only used as part of the cache key
+    Modifies:   Nothing
+    Returns:    String of the hexadecimal digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_identical_files(path1, path2):
+    """
+    Purpose:    Check if two files have byte-identical contents, comparing their sizes before hashing them
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    if os.path.samefile(path1, path2):
+        return True
+    if os.path.getsize(path1) != os.path.getsize(path2):
+        return False
+    return get_file_digest(path1) == get_file_digest(path2)
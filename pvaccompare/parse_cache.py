@@ -0,0 +1,176 @@
+from file_utils import get_file_digest
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+# Increase whenever the way files are parsed or prepared changes so stale entries are not reused
+CACHE_VERSION = 3
+
+# Prepared dataframes kept in memory by MemoryFileCache, inherited by forked worker processes
+memory_cache_entries = {}
+
+
+def get_cache_key(input_file, *options):
+    """
+    Purpose:    Build the cache key from the file contents, the cache version and the parsing options
+    Modifies:   Nothing
+    Returns:    String of the cache key
+    """
+    import pandas as pd
+
+    key = hashlib.blake2b(digest_size=16)
+    key.update(get_file_digest(input_file).encode())
+    key.update(f"{CACHE_VERSION}:{pd.__version__}".encode())
+    for option in options:
+        key.update(repr(option).encode())
+    return key.hexdigest()
+
+
+class ParsedFileCache:
+    def __init__(self, cache_dir, max_size=10 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, input_file, *options):
+        """
+        Purpose:    Build the cache key of a file loaded with the given options
+        Modifies:   Nothing
+        Returns:    String of the cache key
+        """
+        return get_cache_key(input_file, *options)
+
+    def get_path(self, key):
+        """
+        Purpose:    Get the location of a cache entry
+        Modifies:   Nothing
+        Returns:    String of the cache entry path
+        """
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def load(self, key):
+        """
+        Purpose:    Load a cache entry, marking it as recently used
+        Modifies:   The modification time of the cache entry
+        Returns:    The cached object, or None if there is no usable entry
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.debug("Ignoring unreadable cache entry %s: %s", path, e)
+            return None
+        return value
+
+    def store(self, key, value):
+        """
+        Purpose:    Write a cache entry, then evict the least recently used entries if the cache is too large
+        Modifies:   The cache directory
+        Returns:    None
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.get_path(key))
+        except Exception as e:
+            logging.debug("Could not write cache entry %s: %s", key, e)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Purpose:    Remove the least recently used cache entries until the cache fits in max_size bytes
+        Modifies:   The cache directory
+        Returns:    None
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+def share_cache_entry(value):
+    """
+    Purpose:    Give a (dataframe, column renames) cache entry a new dataframe object that shares the column data of the
+                original. Comparisons only replace or drop whole columns of the loaded dataframes, which does not write
+                to the shared data, so the entry kept in memory is unchanged and forked processes keep sharing its pages.
+    Modifies:   Nothing
+    Returns:    Tuple of the shallow copy of the dataframe and a copy of the column renames
+    """
+    df, renames = value
+    return df.copy(deep=False), dict(renames)
+
+
+# Keeps the prepared dataframes of the files in one results folder, such as a baseline compared against many
+# other folders, in memory and puts an optional on-disk cache in front of the other files
+class MemoryFileCache:
+    def __init__(self, results_folder, disk_cache=None):
+        self.results_folder = os.path.abspath(results_folder)
+        self.disk_cache = disk_cache
+        self.memory_keys = set()
+
+    def get_key(self, input_file, *options):
+        """
+        Purpose:    Build the cache key of a file loaded with the given options, remembering keys of files in the results folder
+        Modifies:   self.memory_keys
+        Returns:    String of the cache key, or None if the file is not cached at all
+        """
+        path = os.path.abspath(input_file)
+        in_folder = (
+            os.path.commonpath([path, self.results_folder]) == self.results_folder
+        )
+        if not in_folder and self.disk_cache is None:
+            return None
+        key = get_cache_key(input_file, *options)
+        if in_folder:
+            self.memory_keys.add(key)
+        return key
+
+    def load(self, key):
+        """
+        Purpose:    Load a shallow copy of a cache entry from memory, falling back to the on-disk cache
+        Modifies:   memory_cache_entries
+        Returns:    The cached object, or None if there is no usable entry
+        """
+        if key is None:
+            return None
+        if key in memory_cache_entries:
+            return share_cache_entry(memory_cache_entries[key])
+        if self.disk_cache is None:
+            return None
+        value = self.disk_cache.load(key)
+        if value is not None and key in self.memory_keys:
+            memory_cache_entries[key] = share_cache_entry(value)
+        return value
+
+    def store(self, key, value):
+        """
+        Purpose:    Keep a copy of the entry in memory if the file is in the results folder and write it to the on-disk cache
+        Modifies:   memory_cache_entries and the on-disk cache
+        Returns:    None
+        """
+        if key is None:
+            return
+        if key in self.memory_keys:
+            memory_cache_entries[key] = share_cache_entry(value)
+        if self.disk_cache is not None:
+            self.disk_cache.store(key, value)
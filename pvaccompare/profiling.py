@@ -0,0 +1,157 @@
+import contextlib
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+# Stages recorded while profiling is enabled by record_stages, None when it is disabled
+recorded_stages = None
+
+# Names of the stages currently running, outermost first
+running_stages = []
+
+
+def get_peak_rss_mb():
+    """
+    Purpose:    Get the peak resident memory of the process so far, read from VmHWM where /proc is available since
+                ru_maxrss also counts the peak of the process it was forked or executed from
+    Modifies:   Nothing
+    Returns:    Float of the peak resident memory in megabytes
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return max_rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+@contextlib.contextmanager
+def record_stages(enabled=True):
+    """
+    Purpose:    Record the stages run while in the context, if enabled
+    Modifies:   recorded_stages
+    Returns:    Generator yielding the list the stages are recorded in, which stays empty if profiling is disabled
+    """
+    global recorded_stages
+    if not enabled:
+        yield []
+        return
+
+    previous_stages = recorded_stages
+    recorded_stages = []
+    try:
+        yield recorded_stages
+    finally:
+        stages = recorded_stages
+        recorded_stages = previous_stages
+        if previous_stages is not None:
+            previous_stages.extend(stages)
+
+
+def is_profiling():
+    """
+    Purpose:    Check if the stages being run are recorded
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    return recorded_stages is not None
+
+
+def add_stages(stages):
+    """
+    Purpose:    Add the stages recorded in another process, such as a worker running a comparison
+    Modifies:   recorded_stages
+    Returns:    None
+    """
+    if recorded_stages is not None:
+        recorded_stages.extend(stages)
+
+
+def call_recording_stages(profile, stage_name, function, *args):
+    """
+    Purpose:    Call a function as a stage in a worker process, recording its stages if profile is True so they can be
+                passed back to the parent process with add_stages
+    Modifies:   Nothing
+    Returns:    Tuple of the function's return value and the list of recorded stages
+    """
+    with record_stages(profile) as stages, stage(stage_name):
+        result = function(*args)
+    return result, stages
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """
+    Purpose:    Measure the wall time, CPU time and peak resident memory of the code run in the context, if profiling
+                is enabled. The number of rows processed can be given up front or set on the yielded record.
+    Modifies:   recorded_stages, running_stages
+    Returns:    Generator yielding the stage record
+    """
+    if recorded_stages is None:
+        yield {}
+        return
+
+    record = {
+        "stage": name,
+        "parent": running_stages[-1] if running_stages else None,
+        "depth": len(running_stages),
+        "pid": os.getpid(),
+        "rows": rows,
+    }
+    # Stages are recorded in the order they start, so nested stages follow their parent
+    recorded_stages.append(record)
+    running_stages.append(name)
+    start_rss = get_peak_rss_mb()
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["wall_seconds"] = time.perf_counter() - start
+        record["cpu_seconds"] = time.process_time() - start_cpu
+        record["peak_rss_mb"] = get_peak_rss_mb()
+        record["peak_rss_growth_mb"] = record["peak_rss_mb"] - start_rss
+        running_stages.pop()
+
+
+def format_stage_table(stages):
+    """
+    Purpose:    Format the recorded stages as a table, indenting nested stages under their parent
+    Modifies:   Nothing
+    Returns:    String of the table
+    """
+    names = ["  " * record["depth"] + record["stage"] for record in stages]
+    width = max([len("Stage")] + [len(name) for name in names])
+    lines = [
+        f"{'Stage':<{width}}  {'Wall (s)':>9}  {'CPU (s)':>9}  {'Peak RSS (MB)':>13}  {'RSS Growth (MB)':>15}  {'Rows':>10}"
+    ]
+    for name, record in zip(names, stages):
+        rows = "" if record["rows"] is None else record["rows"]
+        lines.append(
+            f"{name:<{width}}  {record['wall_seconds']:>9.3f}  {record['cpu_seconds']:>9.3f}  "
+            f"{record['peak_rss_mb']:>13.1f}  {record['peak_rss_growth_mb']:>15.1f}  {rows:>10}"
+        )
+    return "\n".join(lines)
+
+
+def report_stages(stages, show_table=False, json_path=None):
+    """
+    Purpose:    Log the recorded stages as a table and/or write them to a JSON file
+    Modifies:   The JSON file if json_path is given
+    Returns:    None
+    """
+    if show_table and stages:
+        logging.info("\n%s", format_stage_table(stages))
+    if json_path:
+        try:
+            with open(json_path, "w") as f:
+                json.dump({"stages": stages}, f, indent=4)
+        except Exception as e:
+            raise Exception(f"Error writing profile to {json_path}: {e}")
@@ -0,0 +1,107 @@
+import contextlib
+import os
+
+# Reports currently held open by open_report, keyed by their absolute path
+open_reports = {}
+
+
+@contextlib.contextmanager
+def open_report(output_path, buffer_size=1 << 20):
+    """
+    Purpose:    Keep a single buffered handle open for the report while the comparisons append to it,
+                reusing the handle if the report is already open
+    Modifies:   open_reports
+    Returns:    Generator yielding the open file handle
+    """
+    path = os.path.abspath(output_path)
+    if path in open_reports:
+        yield open_reports[path]
+        return
+
+    with open(output_path, "a", buffering=buffer_size) as f:
+        open_reports[path] = f
+        try:
+            yield f
+        finally:
+            del open_reports[path]
+
+
+@contextlib.contextmanager
+def append_to_report(output_path):
+    """
+    Purpose:    Get the handle to append to the report with, opening the file if it is not held open by open_report
+    Modifies:   Nothing
+    Returns:    Generator yielding the file handle
+    """
+    f = open_reports.get(os.path.abspath(output_path))
+    if f is not None:
+        yield f
+    else:
+        with open(output_path, "a") as f:
+            yield f
+
+
+def to_report_strings(series):
+    """
+    Purpose:    Convert the values of a column to strings in bulk, matching how Python formats each value
+    Modifies:   Nothing
+    Returns:    Series of strings
+    """
+    import numpy as np
+
+    values = series.reset_index(drop=True)
+    if values.dtype.kind == "f" and values.dtype.itemsize < 8:
+        # Python floats are 64-bit, so narrower floats are widened before formatting
+        values = values.astype(np.float64)
+    return values.astype(object).astype(str)
+
+
+def format_differences(diffs, col):
+    """
+    Purpose:    Format the difference records of a column as report lines
+    Modifies:   Nothing
+    Returns:    String of the report lines
+    """
+    if diffs.empty:
+        return ""
+    lines = (
+        to_report_strings(diffs["ID"])
+        + ":\t"
+        + to_report_strings(diffs[f"{col}_file1"])
+        + "\t->\t"
+        + to_report_strings(diffs[f"{col}_file2"])
+        + "\t("
+        + to_report_strings(diffs["line_file1"])
+        + ", "
+        + to_report_strings(diffs["line_file2"])
+        + ")\n"
+    )
+    return "".join(lines.tolist())
+
+
+def format_unique_variants(unique_variants):
+    """
+    Purpose:    Format the unique variant records as report lines, starting each file's list at its first variant
+    Modifies:   Nothing
+    Returns:    String of the report lines
+    """
+    import numpy as np
+    import pandas as pd
+
+    in_file1 = (unique_variants["File 2"] == "").to_numpy(dtype=bool)
+    variants = pd.Series(
+        np.where(in_file1, unique_variants["File 1"], unique_variants["File 2"]),
+        dtype=object,
+    )
+    lines = ("\t" + to_report_strings(variants) + "\n").tolist()
+
+    if in_file1.any():
+        first_file1 = int(np.argmax(in_file1))
+        lines[first_file1] = "Variants Unique to File 1:\n" + lines[first_file1]
+    if not in_file1.all():
+        first_file2 = int(np.argmin(in_file1))
+        header = "Variants Unique to File 2:\n"
+        if in_file1[:first_file2].any():
+            header = "\n" + header
+        lines[first_file2] = header + lines[first_file2]
+    return "".join(lines)
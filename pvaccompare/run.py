@@ -1,15 +1,34 @@
 from compare_tools import *
+from parse_cache import ParsedFileCache
+from profiling import record_stages, report_stages
+from structured_output import get_structured_format
+from tolerances import get_column_tolerances, parse_tolerance_argument
 import argparse
 import logging
 
 logging.basicConfig(level=logging.DEBUG, format="%(message)s")
 
 
-def define_parser():
+def positive_int(value):
     """
-    Purpose:    Define arguments for the parser that the user can use
+    Purpose:    Parse an argument that must be a positive integer, such as a number of rows or buckets
     Modifies:   Nothing
-    Returns:    The parser
+    Returns:    The integer
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not an integer")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"'{value}' must be a positive integer")
+    return number
+
+
+def add_comparison_arguments(parser):
+    """
+    Purpose:    Define the options shared by every entry point that runs comparisons
+    Modifies:   parser
+    Returns:    None
     """
     valid_aggregated_columns = [
         "Gene",
@@ -115,16 +134,23 @@ def define_parser():
         "Gene Expression",
     ]
     default_reference_match_columns = ["Peptide", "Match Window"]
+    valid_comparisons = [
+        "yml",
+        "json",
+        "aggregated",
+        "unaggregated",
+        "reference_matches",
+    ]
 
-    parser = argparse.ArgumentParser(
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter
-    )
-    parser.add_argument("results_folder1", help="Path to first results input folder")
-    parser.add_argument("results_folder2", help="Path to second results input folder")
-    parser.add_argument("output_file", help="Name for generated report")
     parser.add_argument(
         "--mhc_class", choices=["1", "2"], help="Specify MHC class 1 or class 2"
     )
+    parser.add_argument(
+        "--comparisons",
+        type=lambda s: [a for a in s.split(",")],
+        default=valid_comparisons,
+        help=f"Comma-separated comparisons to run, the files of the others are not located or parsed, choices: {', '.join(valid_comparisons)}",
+    )
     parser.add_argument(
         "--aggregated_columns",
         type=lambda s: [a for a in s.split(",")],
@@ -144,6 +170,79 @@ def define_parser():
         help=f"Comma-separated columns to include in the reference match TSV comparison, choices: {', '.join(valid_reference_match_columns)}",
     )
 
+    parser.add_argument(
+        "--tolerance",
+        type=parse_tolerance_argument,
+        action="append",
+        metavar="COLUMN=ABSOLUTE[:RELATIVE]",
+        help="Tolerances of a numeric column, or of every column matching a glob pattern such as '*IC50 Score': values are reported as different when they differ by more than ABSOLUTE + RELATIVE * the larger absolute value. Can be given more than once, exact column names take precedence over patterns and longer patterns over shorter ones. Unmatched columns use an absolute tolerance of 0.1",
+    )
+    parser.add_argument(
+        "--tolerance_file",
+        help="YAML or JSON file mapping columns or patterns to an absolute tolerance, or to 'absolute' and 'relative' tolerances, overridden by --tolerance",
+    )
+    parser.add_argument(
+        "--group_reference_matches",
+        action="store_true",
+        help="Compare the reference matches of records with several hits by the values of all of their hits, instead of only writing the number of hits of every record. The values are compared exactly, without tolerances",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Compare the unaggregated TSV files in chunks, using on-disk buckets to limit memory usage",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=positive_int,
+        default=100000,
+        help="Number of rows read at a time when using --streaming",
+    )
+    parser.add_argument(
+        "--num_buckets",
+        type=positive_int,
+        default=64,
+        help="Number of on-disk buckets the rows are partitioned into when using --streaming",
+    )
+    parser.add_argument(
+        "--float32_scores",
+        action="store_true",
+        help="Load score and percentile columns as 32-bit floats to reduce memory usage, at the cost of reported precision",
+    )
+    parser.add_argument(
+        "--parser_engine",
+        choices=["pandas", "pyarrow", "polars"],
+        default="pandas",
+        help="Parser used to load the TSV files, pyarrow and polars are multi-threaded and fall back to pandas if they are not installed. TSV files with an up to date Arrow file from convert.py are loaded from it instead",
+    )
+    parser.add_argument(
+        "--structured_output",
+        choices=["parquet", "jsonl"],
+        help="Also write the differences, unique variants and summary counts of each comparison as parquet or jsonl files next to the report",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        help="Directory to cache the parsed TSV files in, so unchanged files such as a shared baseline are not re-parsed",
+    )
+    parser.add_argument(
+        "--cache_max_gb",
+        type=float,
+        default=10,
+        help="Maximum size of the --cache_dir cache in gigabytes, least recently used files are evicted first",
+    )
+    parser.add_argument(
+        "--snapshot_dir",
+        help="Directory to store snapshots of the row hashes of file 1 in, so later comparisons against the same file only compare the variants that changed, were added or were removed since the snapshot. Not used with --streaming",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the wall time, CPU time, peak memory and row count of every comparison stage as a table at the end",
+    )
+    parser.add_argument(
+        "--profile_json",
+        help="Also write the recorded stages of --profile to this JSON file, profiling the run even without --profile",
+    )
+
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument(
         "--immuno_release",
@@ -156,24 +255,50 @@ def define_parser():
         help="Use this flag if you are comparing results from pvactools releases.",
     )
 
+
+def define_parser():
+    """
+    Purpose:    Define arguments for the parser that the user can use
+    Modifies:   Nothing
+    Returns:    The parser
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("results_folder1", help="Path to first results input folder")
+    parser.add_argument("results_folder2", help="Path to second results input folder")
+    parser.add_argument("output_file", help="Name for generated report")
+    add_comparison_arguments(parser)
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of comparisons to run concurrently in separate processes",
+    )
     return parser
 
 
-def main():
+def validate_columns(args, parser):
     """
-    Purpose:    Control function for the whole tool, calls run_comparison which calls all of the comparisons
+    Purpose:    Check that the comparisons and the columns given for each comparison are valid
     Modifies:   Nothing
     Returns:    None
     """
-    parser = define_parser()
-    args = parser.parse_args()
-
+    validate_comparisons(args.comparisons, parser)
     validate_aggregated_columns(args.aggregated_columns, parser)
     validate_unaggregated_columns(args.unaggregated_columns, parser)
     validate_reference_match_columns(args.reference_match_columns, parser)
 
+
+def get_prefixes(args):
+    """
+    Purpose:    Get the results subfolder of each MHC class to compare
+    Modifies:   Nothing
+    Returns:    List of the subfolder prefixes
+    """
     classes_to_run = [args.mhc_class] if args.mhc_class else ["1", "2"]
 
+    prefixes = []
     for class_type in classes_to_run:
         if args.pvactools_release:
             if class_type == "1":
@@ -185,15 +310,90 @@ def main():
                 prefix = "pVACseq/mhc_i"
             elif class_type == "2":
                 prefix = "pVACseq/mhc_ii"
-        run_comparison(
-            prefix,
+        prefixes.append(prefix)
+    return prefixes
+
+
+def get_disk_cache(args):
+    """
+    Purpose:    Create the on-disk parsed file cache if --cache_dir is given
+    Modifies:   Nothing
+    Returns:    The ParsedFileCache, or None
+    """
+    if not args.cache_dir:
+        return None
+    return ParsedFileCache(args.cache_dir, int(args.cache_max_gb * 1024**3))
+
+
+def get_snapshot_store(args):
+    """
+    Purpose:    Create the on-disk store of the row hash snapshots if --snapshot_dir is given
+    Modifies:   Nothing
+    Returns:    The ParsedFileCache holding the snapshots, or None
+    """
+    if not args.snapshot_dir:
+        return None
+    return ParsedFileCache(args.snapshot_dir)
+
+
+def is_profiled(args):
+    """
+    Purpose:    Check if the stages of the comparisons should be recorded
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    return args.profile or bool(args.profile_json)
+
+
+def get_comparison_options(args, cache):
+    """
+    Purpose:    Collect the options passed through to run_comparisons after the column lists
+    Modifies:   Nothing
+    Returns:    Dictionary of keyword arguments for run_comparisons
+    """
+    return {
+        "chunksize": args.chunksize if args.streaming else None,
+        "num_buckets": args.num_buckets,
+        "load_options": {
+            "cache": cache,
+            "float32_scores": args.float32_scores,
+            "engine": args.parser_engine,
+        },
+        "structured_format": (
+            get_structured_format(args.structured_output)
+            if args.structured_output
+            else None
+        ),
+        "comparisons": args.comparisons,
+        "tolerances": get_column_tolerances(args.tolerance_file, args.tolerance),
+        "group_reference_matches": args.group_reference_matches,
+        "snapshot_store": get_snapshot_store(args),
+    }
+
+
+def main():
+    """
+    Purpose:    Control function for the whole tool, calls run_comparison which calls all of the comparisons
+    Modifies:   Nothing
+    Returns:    None
+    """
+    parser = define_parser()
+    args = parser.parse_args()
+    validate_columns(args, parser)
+
+    with record_stages(is_profiled(args)) as stages:
+        run_comparisons(
+            get_prefixes(args),
             args.results_folder1,
             args.results_folder2,
             args.output_file,
             args.aggregated_columns,
             args.unaggregated_columns,
             args.reference_match_columns,
+            jobs=args.jobs,
+            **get_comparison_options(args, get_disk_cache(args)),
         )
+    report_stages(stages, args.profile, args.profile_json)
 
 
 if __name__ == "__main__":
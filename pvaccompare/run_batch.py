@@ -0,0 +1,283 @@
+from compare_tools import *
+from compare_tools.comparison_router import find_file, get_tsv_files
+from comparisons import (
+    CompareAggregatedTSV,
+    CompareReferenceMatchesTSV,
+    CompareUnaggregatedTSV,
+)
+from concurrent.futures import ProcessPoolExecutor
+from parse_cache import MemoryFileCache
+from profiling import (
+    add_stages,
+    call_recording_stages,
+    is_profiling,
+    record_stages,
+    report_stages,
+    stage,
+)
+from run import (
+    add_comparison_arguments,
+    get_comparison_options,
+    get_disk_cache,
+    get_prefixes,
+    is_profiled,
+    positive_int,
+    validate_columns,
+)
+from run_utils import load_prepared_tsv_file
+import argparse
+import logging
+import multiprocessing
+import os
+
+
+def define_parser():
+    """
+    Purpose:    Define arguments for the parser that the user can use
+    Modifies:   Nothing
+    Returns:    The parser
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Compare one baseline results folder against many candidate results folders in a single process",
+    )
+    parser.add_argument("baseline_folder", help="Path to the baseline results folder")
+    parser.add_argument(
+        "output_dir", help="Directory the report of each candidate is written to"
+    )
+    parser.add_argument(
+        "candidate_folders",
+        nargs="*",
+        help="Paths to the candidate results folders compared against the baseline",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="File listing candidate results folders, one per line, in addition to any given as arguments",
+    )
+    add_comparison_arguments(parser)
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help="Number of candidate folders to compare concurrently in separate processes",
+    )
+    return parser
+
+
+def read_manifest(manifest):
+    """
+    Purpose:    Read the candidate results folders listed in a manifest file, skipping blank lines and # comments
+    Modifies:   Nothing
+    Returns:    List of candidate results folder paths
+    """
+    with open(manifest, "r") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def get_candidate_output_files(candidate_folders, output_dir):
+    """
+    Purpose:    Name the report of each candidate after its folder, numbering folders that share a name
+    Modifies:   Nothing
+    Returns:    List of output file names, one per candidate
+    """
+    output_files = []
+    name_counts = {}
+    for candidate_folder in candidate_folders:
+        name = os.path.basename(os.path.normpath(candidate_folder))
+        name_counts[name] = name_counts.get(name, 0) + 1
+        if name_counts[name] > 1:
+            name = f"{name}_{name_counts[name]}"
+        output_files.append(os.path.join(output_dir, name))
+    return output_files
+
+
+def preload_baseline(
+    prefixes,
+    baseline_folder,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    chunksize=None,
+    load_options=None,
+    comparisons=None,
+):
+    """
+    Purpose:    Load the baseline tsv files of the selected comparisons into the cache given in load_options, so each
+                is only parsed once
+    Modifies:   The cache in load_options
+    Returns:    None
+    """
+    columns = {
+        CompareAggregatedTSV: aggregated_columns,
+        CompareUnaggregatedTSV: unaggregated_columns,
+        CompareReferenceMatchesTSV: reference_match_columns,
+    }
+    for prefix in prefixes:
+        for file_type, pattern, comparer in get_tsv_files(comparisons):
+            # The streaming comparison reads the unaggregated files in chunks instead
+            if chunksize and comparer is CompareUnaggregatedTSV:
+                continue
+            path = find_file(baseline_folder, prefix + "/", pattern)
+            if path is None:
+                continue
+            logging.info("Loading the baseline %s file for %s...", file_type, prefix)
+            load_prepared_tsv_file(
+                path,
+                1,
+                *comparer.get_load_arguments(columns[comparer]),
+                **(load_options or {}),
+            )
+
+
+def compare_candidate(
+    prefixes,
+    baseline_folder,
+    candidate_folder,
+    output_file,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    comparison_options,
+):
+    """
+    Purpose:    Compare a candidate results folder against the baseline
+    Modifies:   Nothing
+    Returns:    The candidate results folder
+    """
+    run_comparisons(
+        prefixes,
+        baseline_folder,
+        candidate_folder,
+        output_file,
+        aggregated_columns,
+        unaggregated_columns,
+        reference_match_columns,
+        **comparison_options,
+    )
+    return candidate_folder
+
+
+def run_batch(
+    prefixes,
+    baseline_folder,
+    candidate_folders,
+    output_dir,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    chunksize=None,
+    num_buckets=64,
+    load_options=None,
+    structured_format=None,
+    jobs=1,
+    comparisons=None,
+    tolerances=None,
+    group_reference_matches=False,
+    snapshot_store=None,
+):
+    """
+    Purpose:    Compare the baseline against every candidate, loading the baseline tsv files once and keeping them
+                in memory. With jobs > 1 the candidates are spread across forked processes, which share the
+                loaded baseline.
+    Modifies:   Nothing
+    Returns:    List of the output file names, one per candidate
+    """
+    load_options = dict(load_options or {})
+    load_options["cache"] = MemoryFileCache(baseline_folder, load_options.get("cache"))
+    os.makedirs(output_dir, exist_ok=True)
+    output_files = get_candidate_output_files(candidate_folders, output_dir)
+
+    with stage("preload_baseline"):
+        preload_baseline(
+            prefixes,
+            baseline_folder,
+            aggregated_columns,
+            unaggregated_columns,
+            reference_match_columns,
+            chunksize,
+            load_options,
+            comparisons,
+        )
+
+    comparison_options = {
+        "chunksize": chunksize,
+        "num_buckets": num_buckets,
+        "load_options": load_options,
+        "structured_format": structured_format,
+        "comparisons": comparisons,
+        "tolerances": tolerances,
+        "group_reference_matches": group_reference_matches,
+        "snapshot_store": snapshot_store,
+    }
+    candidate_jobs = [
+        (
+            prefixes,
+            baseline_folder,
+            candidate_folder,
+            output_file,
+            aggregated_columns,
+            unaggregated_columns,
+            reference_match_columns,
+            comparison_options,
+        )
+        for candidate_folder, output_file in zip(candidate_folders, output_files)
+    ]
+
+    if jobs <= 1:
+        for job in candidate_jobs:
+            logging.info("\nComparing %s against the baseline...", job[2])
+            with stage(job[2]):
+                compare_candidate(*job)
+        return output_files
+
+    # Forked workers inherit the baseline dataframes loaded above instead of parsing them again
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("fork")
+    ) as executor:
+        futures = [
+            executor.submit(
+                call_recording_stages, is_profiling(), job[2], compare_candidate, *job
+            )
+            for job in candidate_jobs
+        ]
+        for future in futures:
+            candidate_folder, stages = future.result()
+            add_stages(stages)
+            logging.info("\u2713 Generated the reports for %s.", candidate_folder)
+    return output_files
+
+
+def main():
+    """
+    Purpose:    Control function for the batch comparison of a baseline against many candidate results folders
+    Modifies:   Nothing
+    Returns:    None
+    """
+    parser = define_parser()
+    args = parser.parse_args()
+    validate_columns(args, parser)
+
+    candidate_folders = list(args.candidate_folders)
+    if args.manifest:
+        candidate_folders += read_manifest(args.manifest)
+    if not candidate_folders:
+        parser.error("No candidate results folders were given")
+
+    with record_stages(is_profiled(args)) as stages:
+        run_batch(
+            get_prefixes(args),
+            args.baseline_folder,
+            candidate_folders,
+            args.output_dir,
+            args.aggregated_columns,
+            args.unaggregated_columns,
+            args.reference_match_columns,
+            jobs=args.jobs,
+            **get_comparison_options(args, get_disk_cache(args)),
+        )
+    report_stages(stages, args.profile, args.profile_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+from cohort_utils import run_cohort_comparison
+from compare_tools.comparison_router import (
+    find_file,
+    get_report_path,
+    get_structured_output,
+    get_tsv_files,
+    log_report_completion,
+    write_header,
+)
+from comparisons import (
+    CompareAggregatedTSV,
+    CompareReferenceMatchesTSV,
+    CompareUnaggregatedTSV,
+)
+from profiling import record_stages, report_stages, stage
+from report_writer import open_report
+from run import (
+    add_comparison_arguments,
+    get_comparison_options,
+    get_disk_cache,
+    get_prefixes,
+    is_profiled,
+    validate_columns,
+)
+from structured_output import record_structured_output
+import argparse
+import logging
+
+# The comparisons run by the cohort comparison, the yml and json comparisons only compare pairs of files
+TSV_COMPARISONS = ["aggregated", "unaggregated", "reference_matches"]
+
+# The report and structured output names of the cohort comparison of each tsv file
+COHORT_COMPARISONS = {
+    CompareAggregatedTSV: ("Aggregated TSV", "aggregated_tsv"),
+    CompareUnaggregatedTSV: ("Unaggregated TSV", "unaggregated_tsv"),
+    CompareReferenceMatchesTSV: ("Reference Matches TSV", "reference_match_tsv"),
+}
+
+
+def define_parser():
+    """
+    Purpose:    Define arguments for the parser that the user can use
+    Modifies:   Nothing
+    Returns:    The parser
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Compare the results of the same sample from several pVACtools versions at once",
+    )
+    parser.add_argument(
+        "results_folders",
+        nargs="+",
+        help="Paths to the results folders of each version, in version order",
+    )
+    parser.add_argument("output_file", help="Name for generated report")
+    add_comparison_arguments(parser)
+    return parser
+
+
+def locate_cohort_files(results_folders, pattern, file_type, prefix):
+    """
+    Purpose:    Locates the file for a comparison in every results folder, logging the versions it is missing from
+    Modifies:   Nothing
+    Returns:    A list of the file paths, or None if the comparison should be skipped
+    """
+    paths = [find_file(folder, prefix + "/", pattern) for folder in results_folders]
+    missing_versions = [
+        str(version) for version, path in enumerate(paths, start=1) if path is None
+    ]
+    if not missing_versions:
+        return paths
+
+    logging.error(
+        "ERROR: Could not locate the %s file in version %s for %s.",
+        file_type,
+        ", ".join(missing_versions),
+        prefix,
+    )
+    logging.info("\u2716 Comparison skipped.")
+    return None
+
+
+def run_cohort(
+    prefixes,
+    results_folders,
+    output_file,
+    aggregated_columns,
+    unaggregated_columns,
+    reference_match_columns,
+    load_options=None,
+    structured_format=None,
+    comparisons=None,
+    tolerances=None,
+):
+    """
+    Purpose:    Runs the cohort comparison of every selected tsv file for each prefix, joining the files of all versions
+                once instead of comparing each pair of versions separately
+    Modifies:   Nothing
+    Returns:    None
+    """
+    columns = {
+        CompareAggregatedTSV: aggregated_columns,
+        CompareUnaggregatedTSV: unaggregated_columns,
+        CompareReferenceMatchesTSV: reference_match_columns,
+    }
+    tsv_files = get_tsv_files(comparisons)
+    comparisons = [
+        comparison
+        for comparison in TSV_COMPARISONS
+        if comparisons is None or comparison in comparisons
+    ]
+    for prefix in prefixes:
+        report_path = get_report_path(output_file, prefix)
+        write_header(
+            report_path,
+            aggregated_columns,
+            unaggregated_columns,
+            reference_match_columns,
+            comparisons,
+            tolerances,
+        )
+        with open_report(report_path), record_structured_output(
+            report_path, get_structured_output(report_path, structured_format)
+        ):
+            for file_type, pattern, comparer in tsv_files:
+                paths = locate_cohort_files(results_folders, pattern, file_type, prefix)
+                if paths is None:
+                    continue
+                logging.info("\nRunning the %s cohort comparison tool...", file_type)
+                tool, comparison = COHORT_COMPARISONS[comparer]
+                with stage(f"{prefix} {file_type} cohort"):
+                    run_cohort_comparison(
+                        tool,
+                        comparison,
+                        comparer,
+                        paths,
+                        report_path,
+                        columns[comparer],
+                        load_options,
+                        tolerances,
+                    )
+                logging.info("\u2713 Comparison completed successfully.")
+        log_report_completion(prefix)
+
+
+def main():
+    """
+    Purpose:    Control function for the cohort comparison of several versions
+    Modifies:   Nothing
+    Returns:    None
+    """
+    parser = define_parser()
+    args = parser.parse_args()
+    validate_columns(args, parser)
+    if len(args.results_folders) < 2:
+        parser.error("At least two results folders are needed for a comparison")
+    if args.streaming:
+        logging.warning("--streaming is not supported by the cohort comparison")
+    if args.group_reference_matches:
+        logging.warning(
+            "--group_reference_matches is not supported by the cohort comparison"
+        )
+    if args.snapshot_dir:
+        logging.warning("--snapshot_dir is not supported by the cohort comparison")
+
+    comparison_options = get_comparison_options(args, get_disk_cache(args))
+    with record_stages(is_profiled(args)) as stages:
+        run_cohort(
+            get_prefixes(args),
+            args.results_folders,
+            args.output_file,
+            args.aggregated_columns,
+            args.unaggregated_columns,
+            args.reference_match_columns,
+            comparison_options["load_options"],
+            comparison_options["structured_format"],
+            comparison_options["comparisons"],
+            comparison_options["tolerances"],
+        )
+    report_stages(stages, args.profile, args.profile_json)
+
+
+if __name__ == "__main__":
+    main()
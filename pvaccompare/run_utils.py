@@ -1,19 +1,64 @@
 import pandas as pd
 import numpy as np
+import importlib.util
+import functools
 import re
 import logging
+import os
+from arrow_files import get_arrow_path, load_arrow_file
+from profiling import stage
+from report_writer import (
+    append_to_report,
+    format_differences,
+    format_unique_variants,
+    to_report_strings,
+)
+from tolerances import ColumnTolerances
 
+# Number of joined rows whose numeric columns are compared at a time by get_numeric_differences
+NUMERIC_BLOCK_ROWS = 65536
 
-def add_line_numbers(df1, df2):
-    df1['line'] = range(2, len(df1) + 2)
-    df2['line'] = range(2, len(df2) + 2)
+# Prefix of the columns holding the typed values of the ID columns, which stand in for a joined ID string
+ID_PART_PREFIX = "id_"
+# Separator of the ID parts in the ID strings written to the report
+ID_SEPARATOR = "-"
+# Bound on the range of the integer keys the ID parts are combined into, below the int64 limit
+ID_KEY_LIMIT = 1 << 62
 
+# Columns holding the typed chromosome rank, start and stop used to sort IDs by genomic position
+SORT_KEY_COLUMNS = ["sort_chromosome", "sort_start", "sort_stop"]
+# Columns holding the gene and amino acid change used to sort replaced (Gene (AA_Change)) IDs
+REPLACED_ID_SORT_KEY_COLUMNS = ["sort_gene", "sort_aa_change"]
 
-def check_column_formatting(df1, df2):
+# Strings parsed as missing values by every parser engine, the default na_values documented for pandas.read_csv
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+def get_column_renames(columns):
     """
-    Purpose:    Rename columns based on the mappings dictionary to make column names the same
-    Modifies:   df1 and df2
-    Returns:    None
+    Purpose:    Map column names that use a different name/formatting between versions to their standard name
+    Modifies:   Nothing
+    Returns:    Dictionary of original column names to standard column names
     """
     column_mappings = {  # Fill in different names/formatting between versions
         "Best Peptide": ["best peptide", "best_peptide"],
@@ -24,22 +69,127 @@ def check_column_formatting(df1, df2):
         "Num Passing Peptides": ["Num_Peptides"],
     }
 
-    for col in df1.columns:
-        for key, value in column_mappings.items():
-            if col == key:
-                break
-            elif col in value:
-                logging.info("\u2022 Renamed '%s' to '%s' in file 1", col, key)
-                df1.rename(columns={col: key}, inplace=True)
-                break
-    for col in df2.columns:
+    renames = {}
+    for col in columns:
         for key, value in column_mappings.items():
             if col == key:
                 break
             elif col in value:
-                logging.info("\u2022 Renamed '%s' to '%s' in file 2", col, key)
-                df2.rename(columns={col: key}, inplace=True)
+                renames[col] = key
                 break
+    return renames
+
+
+def log_column_renames(renames, file_number):
+    """
+    Purpose:    Log the columns that were renamed to their standard name
+    Modifies:   Nothing
+    Returns:    None
+    """
+    for col, key in renames.items():
+        logging.info("\u2022 Renamed '%s' to '%s' in file %d", col, key, file_number)
+
+
+def prepare_dataframe(df, id_columns=None):
+    """
+    Purpose:    Add line numbers, rename columns based on the mappings dictionary and keep the ID columns as ID parts if
+                id_columns are given
+    Modifies:   df
+    Returns:    Dictionary of the columns that were renamed
+    """
+    df["line"] = range(2, len(df) + 2)
+    renames = get_column_renames(df.columns)
+    df.rename(columns=renames, inplace=True)
+    if id_columns is not None:
+        create_id_parts(df, id_columns)
+    return renames
+
+
+def get_id_part_name(col):
+    """
+    Purpose:    Get the name of the column holding the typed values of an ID column
+    Modifies:   Nothing
+    Returns:    String of the column name
+    """
+    return ID_PART_PREFIX + re.sub(r"\W+", "_", col).lower()
+
+
+def create_id_parts(df, id_columns):
+    """
+    Purpose:    Keep the typed values of the given columns as the parts of the ID, renamed so they are not compared, and
+                keep typed sort keys when the ID starts with the Chromosome, Start and Stop columns. Variants are matched
+                on integer keys built from the parts, so the ID strings are only built for the rows that are reported.
+    Modifies:   df
+    Returns:    None
+    """
+    if id_columns[:3] == ["Chromosome", "Start", "Stop"]:
+        df[SORT_KEY_COLUMNS[0]] = get_chromosome_ranks(df["Chromosome"])
+        df[SORT_KEY_COLUMNS[1]] = pd.to_numeric(df["Start"], errors="coerce")
+        df[SORT_KEY_COLUMNS[2]] = pd.to_numeric(df["Stop"], errors="coerce")
+    # The parts are moved to the end in the order of id_columns, which is the order they are joined in
+    for col in id_columns:
+        df[get_id_part_name(col)] = df.pop(col)
+
+
+def get_id_part_columns(df):
+    """
+    Purpose:    Get the columns of the ID parts in the order they are joined, or the ID column of files that have one
+    Modifies:   Nothing
+    Returns:    List of column names
+    """
+    if "ID" in df.columns:
+        return ["ID"]
+    parts = [col for col in df.columns if col.startswith(ID_PART_PREFIX)]
+    return parts or ["ID"]
+
+
+def has_id(df):
+    """
+    Purpose:    Check if a dataframe has an ID column or ID parts
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    return all(col in df.columns for col in get_id_part_columns(df))
+
+
+def is_integer_id_part(values):
+    """
+    Purpose:    Check if an ID part holds integers, whose values are written as distinct strings that do not depend on
+                their width, so the part can be encoded by the integers themselves
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    return (
+        isinstance(values.dtype, np.dtype)
+        and values.dtype.kind in "iu"
+        and np.can_cast(values.dtype, np.int64)
+    )
+
+
+def get_id_part_values(values):
+    """
+    Purpose:    Encode an ID part by its distinct values, keeping integers as int64 and converting anything else to the
+                strings its values are written as in the ID, so only the distinct values are converted
+    Modifies:   Nothing
+    Returns:    Tuple of a numpy array of each row's position among the distinct values and a numpy array of the values
+    """
+    if is_integer_id_part(values):
+        return pd.factorize(values.to_numpy(dtype=np.int64))
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes, pd.Series(uniques).astype(str).to_numpy(dtype=object)
+
+
+def get_ids(df, rows):
+    """
+    Purpose:    Build the ID strings of the rows at the given positions by joining their ID parts
+    Modifies:   Nothing
+    Returns:    Numpy object array of IDs
+    """
+    columns = get_id_part_columns(df)
+    if columns == ["ID"]:
+        return df["ID"].to_numpy()[rows]
+    parts = [df[col].iloc[rows].astype(str).to_numpy(dtype=object) for col in columns]
+    return np.array([ID_SEPARATOR.join(row) for row in zip(*parts)], dtype=object)
 
 
 def output_dropped_cols(df1, df2, original_columns):
@@ -70,26 +220,299 @@ def output_dropped_cols(df1, df2, original_columns):
     return columns_dropped_message
 
 
-def get_common_variants(df1, df2):
+def get_required_columns(input_file, required_columns):
     """
-    Purpose:    Find and store IDs shared between the two given dataframes
+    Purpose:    Find the columns of a tsv file that are needed for the comparison
     Modifies:   Nothing
-    Returns:    A set containing IDs that are common between the two dataframes
+    Returns:    List of the original column names to load and a dictionary of column renames
     """
-    return set(df1["ID"]).intersection(set(df2["ID"]))
+    header = pd.read_csv(input_file, sep="\t", nrows=0).columns
+    renames = get_column_renames(header)
+    usecols = [col for col in header if renames.get(col, col) in required_columns]
+    return usecols, renames
 
 
-def load_tsv_files(input_file1, input_file2):
+def get_column_dtypes(usecols, renames, float32_scores=False):
     """
-    Purpose:    Load the two input tsv files into dataframes
+    Purpose:    Pin the dtypes of known columns so they do not need to be inferred while parsing
     Modifies:   Nothing
-    Returns:    Two dataframes corresponding to the two input files
+    Returns:    Dictionary of original column names to dtypes
+    """
+    categorical_columns = ["Chromosome", "HLA Allele", "Biotype"]
+    position_columns = [
+        "Start",
+        "Stop",
+        "Sub-peptide Position",
+        "Match Start",
+        "Match Stop",
+    ]
+    score_keywords = ["Score", "Percentile", "IC50", "%ile"]
+
+    dtypes = {}
+    for col in usecols:
+        name = renames.get(col, col)
+        if name in categorical_columns:
+            dtypes[col] = "category"
+        elif name in position_columns:
+            dtypes[col] = "int32"
+        elif float32_scores and any(keyword in name for keyword in score_keywords):
+            dtypes[col] = "float32"
+    return dtypes
+
+
+def align_categories(df1, df2):
+    """
+    Purpose:    Give categorical columns shared by both dataframes the same categories so they can be compared
+    Modifies:   df1 and df2
+    Returns:    None
+    """
+    for col in df1.columns:
+        if (
+            col in df2.columns
+            and isinstance(df1[col].dtype, pd.CategoricalDtype)
+            and isinstance(df2[col].dtype, pd.CategoricalDtype)
+        ):
+            categories = df1[col].cat.categories.union(df2[col].cat.categories)
+            df1[col] = df1[col].cat.set_categories(categories)
+            df2[col] = df2[col].cat.set_categories(categories)
+
+
+@functools.lru_cache(maxsize=None)
+def get_available_engine(engine):
     """
+    Purpose:    Check that the packages needed by a tsv parser engine are installed, falling back to pandas if not
+    Modifies:   Nothing
+    Returns:    String of the engine to use
+    """
+    engine_requirements = {
+        "pandas": [],
+        "pyarrow": ["pyarrow"],
+        "polars": ["polars", "pyarrow"],
+    }
+    if engine not in engine_requirements:
+        raise ValueError(f"Unknown tsv parser engine '{engine}'")
+    for package in engine_requirements[engine]:
+        if importlib.util.find_spec(package) is None:
+            logging.warning(
+                "\u2022 %s is not installed, using the pandas parser instead of %s",
+                package,
+                engine,
+            )
+            return "pandas"
+    return engine
+
+
+def normalize_missing_values(df):
+    """
+    Purpose:    Make dataframes from other parser engines match pandas' handling of missing values and booleans,
+                treating any of the NA_VALUES strings left by the engine as missing
+    Modifies:   df
+    Returns:    None
+    """
+    boolean_values = {"True": True, "TRUE": True, "true": True}
+    boolean_values.update({"False": False, "FALSE": False, "false": False})
+    for col in df.select_dtypes(include="object").columns:
+        missing = df[col].isna() | df[col].isin(NA_VALUES)
+        if len(df) > 0 and missing.all():
+            df[col] = np.nan
+            continue
+        values = df[col][~missing].unique()
+        if len(values) > 0 and set(values).issubset(boolean_values):
+            df[col] = df[col].map(boolean_values)
+            if not missing.any():
+                df[col] = df[col].astype(bool)
+        if missing.any():
+            df[col] = df[col].where(~missing, np.nan)
+
+
+def read_tsv(input_file, usecols=None, dtypes=None, engine="pandas"):
+    """
+    Purpose:    Parse a tsv file with the given parser engine
+    Modifies:   Nothing
+    Returns:    Dataframe corresponding to the input file
+    """
+    engine = get_available_engine(engine)
+    if engine == "pandas":
+        return pd.read_csv(
+            input_file,
+            sep="\t",
+            usecols=usecols,
+            dtype=dtypes,
+            na_values=NA_VALUES,
+            keep_default_na=False,
+            low_memory=False,
+        )
+
+    if engine == "pyarrow":
+        df = pd.read_csv(
+            input_file,
+            sep="\t",
+            usecols=usecols,
+            na_values=NA_VALUES,
+            keep_default_na=False,
+            engine="pyarrow",
+        )
+    else:
+        import polars as pl
+
+        df = pl.read_csv(
+            input_file,
+            separator="\t",
+            columns=usecols,
+            null_values=NA_VALUES,
+            infer_schema_length=None,
+        ).to_pandas()
+    normalize_missing_values(df)
+    if dtypes:
+        df = df.astype(dtypes)
+    return df
+
+
+def load_tsv_file(
+    input_file, required_columns=None, float32_scores=False, engine="pandas"
+):
+    """
+    Purpose:    Load a tsv file into a dataframe, parsing only the required columns when they are given
+    Modifies:   Nothing
+    Returns:    Dataframe corresponding to the input file
+    """
+    if required_columns is None:
+        return read_tsv(input_file, engine=engine)
+
+    usecols, renames = get_required_columns(input_file, required_columns)
+    dtypes = get_column_dtypes(usecols, renames, float32_scores)
     try:
-        df1 = pd.read_csv(input_file1, sep="\t", low_memory=False)
-        df2 = pd.read_csv(input_file2, sep="\t", low_memory=False)
-    except Exception as e:
-        raise Exception(f"Error loading files: {e}")
+        return read_tsv(input_file, usecols, dtypes, engine)
+    except (ValueError, TypeError) as e:
+        logging.debug(
+            "Could not apply pinned dtypes to %s, inferring them instead: %s",
+            input_file,
+            e,
+        )
+        return read_tsv(input_file, usecols, engine=engine)
+
+
+def load_converted_tsv_file(
+    input_file,
+    file_number,
+    required_columns=None,
+    id_columns=None,
+    float32_scores=False,
+):
+    """
+    Purpose:    Load the prepared dataframe of a tsv file from its converted Arrow file, reading only the required
+                columns along with the line numbers, ID and sort keys
+    Modifies:   Nothing
+    Returns:    Prepared dataframe corresponding to the input file, or None if it has no up to date converted file
+    """
+    columns = None
+    if required_columns is not None:
+        columns = list(required_columns) + ["line", "ID"] + SORT_KEY_COLUMNS
+        columns += [get_id_part_name(col) for col in id_columns or []]
+    with stage("load_arrow_file") as record:
+        converted = load_arrow_file(input_file, id_columns, columns)
+        if converted is None:
+            return None
+        df, renames = converted
+        record["rows"] = len(df)
+    dtypes = get_column_dtypes(df.columns, {}, float32_scores)
+    float32_columns = [col for col, dtype in dtypes.items() if dtype == "float32"]
+    if float32_columns:
+        df = df.astype({col: "float32" for col in float32_columns})
+    log_column_renames(renames, file_number)
+    return df
+
+
+def load_prepared_tsv_file(
+    input_file,
+    file_number,
+    required_columns=None,
+    id_columns=None,
+    cache=None,
+    float32_scores=False,
+    engine="pandas",
+):
+    """
+    Purpose:    Load a tsv file and prepare it for comparison, using its converted Arrow file if it has an up to date
+                one whatever the parser engine, or reusing the prepared dataframe from the cache when the file has been
+                loaded with the same options before
+    Modifies:   The cache directory if cache is given
+    Returns:    Prepared dataframe corresponding to the input file
+    """
+    if os.path.exists(get_arrow_path(input_file)):
+        df = load_converted_tsv_file(
+            input_file, file_number, required_columns, id_columns, float32_scores
+        )
+        if df is not None:
+            return df
+
+    if cache is not None:
+        key = cache.get_key(
+            input_file,
+            sorted(required_columns) if required_columns is not None else None,
+            id_columns,
+            float32_scores,
+            engine,
+        )
+        with stage("load_cached_file") as record:
+            cached = cache.load(key)
+            if cached is not None:
+                record["rows"] = len(cached[0])
+        if cached is not None:
+            df, renames = cached
+            log_column_renames(renames, file_number)
+            return df
+
+    with stage("load_tsv_file") as record:
+        df = load_tsv_file(input_file, required_columns, float32_scores, engine)
+        record["rows"] = len(df)
+    with stage("create_id_parts", len(df)):
+        renames = prepare_dataframe(df, id_columns)
+    log_column_renames(renames, file_number)
+    if cache is not None:
+        cache.store(key, (df, renames))
+    return df
+
+
+def load_tsv_files(
+    input_file1,
+    input_file2,
+    required_columns=None,
+    id_columns=None,
+    cache=None,
+    float32_scores=False,
+    engine="pandas",
+):
+    """
+    Purpose:    Load the two input tsv files into dataframes with line numbers, standard column names and an ID column
+                if id_columns are given
+    Modifies:   The cache directory if cache is given
+    Returns:    Two dataframes corresponding to the two input files
+    """
+    with stage("load_tsv_files") as record:
+        try:
+            df1 = load_prepared_tsv_file(
+                input_file1,
+                1,
+                required_columns,
+                id_columns,
+                cache,
+                float32_scores,
+                engine,
+            )
+            df2 = load_prepared_tsv_file(
+                input_file2,
+                2,
+                required_columns,
+                id_columns,
+                cache,
+                float32_scores,
+                engine,
+            )
+        except Exception as e:
+            raise Exception(f"Error loading files: {e}")
+        align_categories(df1, df2)
+        record["rows"] = len(df1) + len(df2)
     return df1, df2
 
 
@@ -106,142 +529,518 @@ def check_columns_to_compare(df1, df2, columns_to_compare):
     return columns_to_keep
 
 
-def get_unique_variants(df1, df2, common_variants):
+def get_chromosome_rank(chromosome):
     """
-    Purpose:    Find and store unique variants to each dataframe
+    Purpose:    Rank a chromosome for sorting, numbered chromosomes by their number and all others after them
     Modifies:   Nothing
-    Returns:    Two sets containing IDs unique to the corresponding dataframes
+    Returns:    Float of the rank, NaN if the name does not start with chr
     """
-    unique_variants_file1 = set(df1["ID"]).difference(common_variants)
-    unique_variants_file2 = set(df2["ID"]).difference(common_variants)
-    return unique_variants_file1, unique_variants_file2
+    match = re.fullmatch(r"chr(\w+)", chromosome)
+    if not match:
+        return np.nan
+    number = match.group(1)
+    return float(number) if number.isdigit() else np.inf
 
 
-def extract_id_parts(id_str):
+def get_chromosome_ranks(chromosomes):
     """
-    Purpose:    Extract parts of the ID to use in sorting
+    Purpose:    Rank each chromosome for sorting, ranking every distinct name only once
     Modifies:   Nothing
-    Returns:    A tuple of the different sections for sorting
+    Returns:    Numpy array of float ranks
     """
-    match = re.match(r"chr(\w+)-(\d+)-(\d+)-", id_str)
-    if match:
-        chr_part = match.group(1)
-        if chr_part.isdigit():
-            chr_part = int(chr_part)
-        else:
-            chr_part = float("inf")
-        return chr_part, int(match.group(2)), int(match.group(3))
-    return None, None, None
+    codes, names = pd.factorize(chromosomes)
+    # Missing chromosomes have a code of -1, which picks the trailing NaN
+    ranks = np.array([get_chromosome_rank(str(name)) for name in names] + [np.nan])
+    return ranks[codes]
 
 
-def split_replaced_id(id_str):
+def get_id_sort_keys(ids):
     """
-    Purpose:    Extract parts of the replaced ID (Gene-AA change) to use in sorting
+    Purpose:    Parse the chromosome rank, start and stop used for sorting from IDs of the form chr-start-stop-...
     Modifies:   Nothing
-    Returns:    Two strings corresponding to the split sections
+    Returns:    Dataframe of the sort key columns, NaN where an ID does not match the format
     """
-    try:
-        grp1, rest = id_str.split(" (")
-        grp2 = rest.split("-")[0].rstrip(")")
-        return grp1, grp2
-    except Exception as e:
-        logging.error(f"Error splitting replaced ID: {id_str}, {e}")
-        return "", ""
+    parts = pd.Series(ids, dtype=object).str.extract(r"^chr(\w+)-(\d+)-(\d+)-")
+    return pd.DataFrame(
+        {
+            SORT_KEY_COLUMNS[0]: get_chromosome_ranks("chr" + parts[0]),
+            SORT_KEY_COLUMNS[1]: pd.to_numeric(parts[1]).to_numpy(dtype=float),
+            SORT_KEY_COLUMNS[2]: pd.to_numeric(parts[2]).to_numpy(dtype=float),
+        }
+    )
+
+
+def get_replaced_id_sort_keys(ids):
+    """
+    Purpose:    Split replaced IDs (Gene (AA_Change)) into the gene and amino acid change used for sorting
+    Modifies:   Nothing
+    Returns:    Dataframe of the sort key columns, empty strings where an ID cannot be split
+    """
+    ids = pd.Series(ids, dtype=object).reset_index(drop=True)
+    parts = ids.str.split(" (", regex=False)
+    valid = (parts.str.len() == 2).to_numpy(dtype=bool)
+    for id_str in ids[~valid]:
+        logging.error(f"Error splitting replaced ID: {id_str}")
+    return pd.DataFrame(
+        {
+            REPLACED_ID_SORT_KEY_COLUMNS[0]: np.where(valid, parts.str[0], ""),
+            REPLACED_ID_SORT_KEY_COLUMNS[1]: np.where(
+                valid, parts.str[1].str.split("-").str[0].str.rstrip(")"), ""
+            ),
+        }
+    )
+
+
+def get_sort_keys(df, rows, contains_id=True):
+    """
+    Purpose:    Get the sort keys of the IDs at the given row positions, using the typed columns kept by create_id_parts if present
+    Modifies:   Nothing
+    Returns:    Dataframe of the sort key columns
+    """
+    if contains_id and all(col in df.columns for col in SORT_KEY_COLUMNS):
+        return df[SORT_KEY_COLUMNS].iloc[rows].reset_index(drop=True)
+    ids = get_ids(df, rows)
+    return get_id_sort_keys(ids) if contains_id else get_replaced_id_sort_keys(ids)
+
+
+def get_sort_key_columns(contains_id=True):
+    """
+    Purpose:    Get the names of the sort key columns for the ID format
+    Modifies:   Nothing
+    Returns:    List of column names
+    """
+    return SORT_KEY_COLUMNS if contains_id else REPLACED_ID_SORT_KEY_COLUMNS
+
+
+def sort_by_columns(df, columns):
+    """
+    Purpose:    Sort the dataframe by the given columns with a stable lexsort, the first column being the primary key
+    Modifies:   Nothing
+    Returns:    Sorted dataframe
+    """
+    order = np.lexsort([df[col].to_numpy() for col in reversed(columns)])
+    return df.iloc[order].reset_index(drop=True)
+
+
+def sort_ids(ids):
+    """
+    Purpose:    Sort IDs of the form chr-start-stop-... by genomic position, keeping the given order for IDs sharing a position
+    Modifies:   Nothing
+    Returns:    List of sorted IDs
+    """
+    ids = list(ids)
+    keys = get_id_sort_keys(ids)
+    keys["ID"] = ids
+    return sort_by_columns(keys, SORT_KEY_COLUMNS)["ID"].tolist()
+
+
+def is_numeric_column(series):
+    """
+    Purpose:    Check if a column holds numbers, excluding booleans and extension types such as categoricals
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    return isinstance(series.dtype, np.dtype) and np.issubdtype(series.dtype, np.number)
+
+
+def get_variant_codes(*dfs):
+    """
+    Purpose:    Encode the IDs of the dataframes as integer codes shared between them, so the joins, set operations and
+                duplicate checks of the comparison work on integers. Each ID part is encoded by its distinct values, as
+                strings unless the part holds integers in every dataframe, and the parts are combined one at a time into
+                a single code, so rows get the same code exactly when their ID parts are written the same without
+                building the ID strings.
+    Modifies:   Nothing
+    Returns:    Tuple of the codes of each dataframe followed by the number of distinct IDs
+    """
+    keys = np.zeros(sum(len(df) for df in dfs), dtype=np.int64)
+    num_keys = 1
+    for col in get_id_part_columns(dfs[0]):
+        codes, values = zip(*[get_id_part_values(df[col]) for df in dfs])
+        if len({df_values.dtype for df_values in values}) > 1:
+            values = [df_values.astype(str).astype(object) for df_values in values]
+        offsets = np.cumsum([0] + [len(df_values) for df_values in values[:-1]])
+        value_codes, distinct_values = pd.factorize(np.concatenate(values))
+        part_codes = value_codes[
+            np.concatenate(
+                [df_codes + offset for df_codes, offset in zip(codes, offsets)]
+            )
+        ]
+        # Renumber the combined keys from 0 whenever appending the part could overflow them
+        if num_keys * len(distinct_values) >= ID_KEY_LIMIT:
+            keys, distinct_keys = pd.factorize(keys)
+            num_keys = len(distinct_keys)
+        keys = keys * len(distinct_values) + part_codes
+        num_keys *= max(len(distinct_values), 1)
+    keys, distinct_keys = pd.factorize(keys)
+    num_codes = len(distinct_keys)
+    splits = np.cumsum([len(df) for df in dfs])[:-1]
+    return (*np.split(keys, splits), num_codes)
+
+
+def get_variant_hashes(df):
+    """
+    Purpose:    Hash the ID of each row from the distinct values of its ID parts, without building the ID strings. Integer
+                parts are hashed by their values, so an ID hashes the same in two files only if each of its parts holds
+                integers in both or in neither.
+    Modifies:   Nothing
+    Returns:    Numpy array of a uint64 hash per row
+    """
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col in get_id_part_columns(df):
+        codes, values = get_id_part_values(df[col])
+        hashes = hashes * np.uint64(1000003) ^ pd.util.hash_array(values)[codes]
+    return hashes
+
+
+def drop_duplicate_ids(df):
+    """
+    Purpose:    Keep the first row of each ID
+    Modifies:   Nothing
+    Returns:    Dataframe of the first rows
+    """
+    codes, _ = get_variant_codes(df)
+    _, first_rows = np.unique(codes, return_index=True)
+    return df.iloc[np.sort(first_rows)]
+
+
+def join_variant_codes(codes1, codes2, num_codes):
+    """
+    Purpose:    Inner join the rows of the two files on their variant codes, pairing every row of file 1 with every
+                row of file 2 sharing its code, by counting and sorting the codes instead of merging on the IDs
+    Modifies:   Nothing
+    Returns:    Tuple of numpy arrays of the paired row positions in each file, ordered by file 1 row then file 2 row
+    """
+    counts2 = np.bincount(codes2, minlength=num_codes)
+    order2 = np.argsort(codes2, kind="stable")
+    starts2 = np.cumsum(counts2) - counts2
+    matches = counts2[codes1]
+    rows1 = np.repeat(np.arange(len(codes1)), matches)
+    # Position of each pair among the rows of file 2 with the same code
+    offsets = np.arange(len(rows1)) - np.repeat(np.cumsum(matches) - matches, matches)
+    rows2 = order2[starts2[codes1[rows1]] + offsets]
+    return rows1, rows2
+
+
+def get_difference_mask(values1, values2, tolerance=0.1, relative_tolerance=0.0):
+    """
+    Purpose:    Find the positions where two aligned columns differ, numeric values only differ by more than the tolerance
+                plus the relative tolerance of the larger absolute value
+    Modifies:   Nothing
+    Returns:    Boolean numpy array
+    """
+    if is_numeric_column(values1) and is_numeric_column(values2):
+        if relative_tolerance:
+            tolerance = tolerance + relative_tolerance * np.maximum(
+                np.abs(values1), np.abs(values2)
+            )
+        # Mask for numeric differences greater than tolerance
+        tolerance_mask = np.abs(values1 - values2) > tolerance
+
+        # Mask for rows where one value is NaN and the other is not
+        nan_mask = values1.isna() != values2.isna()
+
+        # Final mask includes rows with significant numeric differences or NaN-regular number comparisons
+        mask = tolerance_mask | nan_mask
+    else:
+        mask = (values1 != values2) & ~(values1.isna() & values2.isna())
+    return mask.to_numpy(dtype=bool)
+
+
+def get_numeric_differences(df1, df2, rows1, rows2, columns, tolerances=None):
+    """
+    Purpose:    Compare the numeric columns of the joined rows together as a 2D block, one slice of rows at a time
+                with reused buffers and in-place operations, so no series or masks are built for each column. Values
+                differ when only one is missing or by more than the column's absolute tolerance plus its relative
+                tolerance of the larger absolute value.
+    Modifies:   Nothing
+    Returns:    Dictionary of each column to a numpy array of the positions of the differing joined rows
+    """
+    if tolerances is None:
+        tolerances = ColumnTolerances()
+    column_tolerances = np.array(
+        [tolerances.get(col) for col in columns], dtype=np.float64
+    ).reshape(len(columns), 2)
+    # Column vectors broadcast across the rows of the block
+    absolute_tolerances = column_tolerances[:, :1]
+    relative_tolerances = column_tolerances[:, 1:]
+    use_relative_tolerances = relative_tolerances.any()
+
+    values1 = [df1[col].to_numpy() for col in columns]
+    values2 = [df2[col].to_numpy() for col in columns]
+    block_rows = max(min(NUMERIC_BLOCK_ROWS, len(rows1)), 1)
+    # One row per column, so each column's values are contiguous
+    block1 = np.empty((len(columns), block_rows))
+    block2 = np.empty((len(columns), block_rows))
+    missing1 = np.empty((len(columns), block_rows), dtype=bool)
+    missing2 = np.empty((len(columns), block_rows), dtype=bool)
+    if use_relative_tolerances:
+        threshold_block = np.empty((len(columns), block_rows))
+
+    positions = [[] for _ in columns]
+    for start in range(0, len(rows1), block_rows):
+        stop = min(start + block_rows, len(rows1))
+        size = stop - start
+        values1_block, values2_block = block1[:, :size], block2[:, :size]
+        mask, differs = missing1[:, :size], missing2[:, :size]
+        for i in range(len(columns)):
+            values1_block[i] = values1[i][rows1[start:stop]]
+            values2_block[i] = values2[i][rows2[start:stop]]
+
+        np.isnan(values1_block, out=mask)
+        np.isnan(values2_block, out=differs)
+        np.not_equal(mask, differs, out=mask)
+        with np.errstate(invalid="ignore"):
+            if use_relative_tolerances:
+                thresholds = threshold_block[:, :size]
+                np.abs(values1_block, out=thresholds)
+                np.subtract(values1_block, values2_block, out=values1_block)
+                np.abs(values2_block, out=values2_block)
+                np.maximum(thresholds, values2_block, out=thresholds)
+                np.multiply(thresholds, relative_tolerances, out=thresholds)
+                np.add(thresholds, absolute_tolerances, out=thresholds)
+            else:
+                thresholds = absolute_tolerances
+                np.subtract(values1_block, values2_block, out=values1_block)
+            np.abs(values1_block, out=values1_block)
+            np.greater(values1_block, thresholds, out=differs)
+        np.logical_or(mask, differs, out=mask)
+
+        # The nonzero positions are ordered by column, then by row
+        column_positions, row_positions = np.nonzero(mask)
+        counts = np.bincount(column_positions, minlength=len(columns))
+        for i, rows in enumerate(np.split(row_positions, np.cumsum(counts)[:-1])):
+            if len(rows):
+                positions[i].append(rows + start)
+
+    return {
+        col: np.concatenate(col_positions) if col_positions else np.zeros(0, np.int64)
+        for col, col_positions in zip(columns, positions)
+    }
+
+
+def get_unique_rows(df, rows, codes, contains_id=True):
+    """
+    Purpose:    Get the ID, line and sort keys of each variant at the given row positions, keeping the first row of repeated IDs
+    Modifies:   Nothing
+    Returns:    Dataframe of unique variants in file order
+    """
+    rows = np.sort(rows)
+    _, first_rows = np.unique(codes[rows], return_index=True)
+    rows = rows[np.sort(first_rows)]
+    return pd.concat(
+        [
+            pd.DataFrame(
+                {"ID": get_ids(df, rows), "line": df["line"].to_numpy()[rows]}
+            ),
+            get_sort_keys(df, rows, contains_id),
+        ],
+        axis=1,
+    )
 
 
 def get_file_differences(
     df1,
     df2,
     columns_to_compare,
-    unique_variants_file1,
-    unique_variants_file2,
     contains_id=True,
-    tolerance=0.1,
+    tolerances=None,
+    sort=True,
 ):
     """
-    Purpose:    Find and store differences found between the two dataframes
+    Purpose:    Find the common variants, unique variants and column differences of the two dataframes with a
+                single join on their shared variant codes. Numeric columns are compared with the given
+                ColumnTolerances, or an absolute tolerance of 0.1 if tolerances is None.
     Modifies:   Nothing
-    Returns:    Dictionary of differences and a dictionary of unique variants
+    Returns:    Dictionary of the comparison results, differences hold a dataframe per column
     """
-    df1_selected = df1[["ID", "line"] + columns_to_compare]
-    df2_selected = df2[["ID", "line"] + columns_to_compare]
-
-    merged_df = pd.merge(
-        df1_selected, df2_selected, on="ID", suffixes=("_file1", "_file2")
-    )
+    with stage("get_file_differences", len(df1) + len(df2)):
+        codes1, codes2, num_codes = get_variant_codes(df1, df2)
+        rows1, rows2 = join_variant_codes(codes1, codes2, num_codes)
+        counts1 = np.bincount(codes1, minlength=num_codes)
+        counts2 = np.bincount(codes2, minlength=num_codes)
+        lines1 = df1["line"].to_numpy()[rows1]
+        lines2 = df2["line"].to_numpy()[rows2]
 
-    differences = {}
-    for col in columns_to_compare:
-        col_file1 = f"{col}_file1"
-        col_file2 = f"{col}_file2"
-
-        # Determine if columns are numeric
-        is_numeric_col1 = np.issubdtype(merged_df[col_file1].dtype, np.number)
-        is_numeric_col2 = np.issubdtype(merged_df[col_file2].dtype, np.number)
-
-        if is_numeric_col1 and is_numeric_col2:
-            # Convert to numeric values to ensure uniformity and handle missing/invalid values
-            merged_df[col_file1] = pd.to_numeric(merged_df[col_file1], errors="coerce")
-            merged_df[col_file2] = pd.to_numeric(merged_df[col_file2], errors="coerce")
+        numeric_differences = get_numeric_differences(
+            df1,
+            df2,
+            rows1,
+            rows2,
+            [
+                col
+                for col in columns_to_compare
+                if is_numeric_column(df1[col]) and is_numeric_column(df2[col])
+            ],
+            tolerances,
+        )
+        differences = {}
+        for col in columns_to_compare:
+            if col in numeric_differences:
+                positions = numeric_differences[col]
+            else:
+                positions = np.flatnonzero(
+                    get_difference_mask(
+                        df1[col].iloc[rows1].reset_index(drop=True),
+                        df2[col].iloc[rows2].reset_index(drop=True),
+                    )
+                )
+            if len(positions):
+                diffs = pd.DataFrame(
+                    {
+                        "ID": get_ids(df1, rows1[positions]),
+                        f"{col}_file1": df1[col].array.take(rows1[positions]),
+                        f"{col}_file2": df2[col].array.take(rows2[positions]),
+                        "line_file1": lines1[positions],
+                        "line_file2": lines2[positions],
+                    }
+                )
+                differences[col] = pd.concat(
+                    [diffs, get_sort_keys(df1, rows1[positions], contains_id)],
+                    axis=1,
+                )
 
-            # Mask for numeric differences greater than tolerance
-            tolerance_mask = (
-                np.abs(merged_df[col_file1] - merged_df[col_file2]) > tolerance
+        results = {
+            "num_common_variants": int(np.count_nonzero((counts1 > 0) & (counts2 > 0))),
+            "unique_variants_file1": get_unique_rows(
+                df1, np.flatnonzero(counts2[codes1] == 0), codes1, contains_id
+            ),
+            "unique_variants_file2": get_unique_rows(
+                df2, np.flatnonzero(counts1[codes2] == 0), codes2, contains_id
+            ),
+            "differences": differences,
+        }
+        if sort:
+            sort_differences(differences, contains_id)
+            results["unique_variants"] = get_unique_variant_records(
+                results["unique_variants_file1"],
+                results["unique_variants_file2"],
+                contains_id,
             )
+        return results
 
-            # Mask for rows where one value is NaN and the other is not
-            nan_mask = (merged_df[col_file1].isna() & ~merged_df[col_file2].isna()) | (
-                ~merged_df[col_file1].isna() & merged_df[col_file2].isna()
-            )
 
-            # Final mask includes rows with significant numeric differences or NaN-regular number comparisons
-            mask = tolerance_mask | nan_mask
-        else:
-            mask = (merged_df[col_file1] != merged_df[col_file2]) & ~(
-                merged_df[col_file1].isna() & merged_df[col_file2].isna()
-            )
+def get_grouped_values(df, col, codes, rows):
+    """
+    Purpose:    Join the sorted values each ID has in a column into one string, for the given rows of the dataframe
+    Modifies:   Nothing
+    Returns:    Dataframe of the ID code, the joined values, the first line and the first row position of each ID
+    """
+    values = pd.DataFrame(
+        {
+            "code": codes,
+            "value": to_report_strings(df[col].iloc[rows]).to_numpy(),
+            "line": df["line"].to_numpy()[rows],
+            "row": rows,
+        }
+    ).sort_values(["code", "value"], kind="stable")
+    return values.groupby("code", sort=True).agg(
+        value=("value", ", ".join), line=("line", "min"), row=("row", "min")
+    )
 
-        diff = merged_df[mask][["ID", col_file1, col_file2, "line_file1", "line_file2"]]
-        if not diff.empty:
-            differences[col] = diff.to_dict("records")
 
-    for col in differences:
-        if contains_id:
-            differences[col] = sorted(
-                differences[col], key=lambda x: extract_id_parts(x["ID"])
-            )
-        else:
-            differences[col] = sorted(
-                differences[col], key=lambda x: split_replaced_id(x["ID"])
-            )
+def get_grouped_differences(df1, df2, columns_to_compare, contains_id=True):
+    """
+    Purpose:    Compare the multiset of values each common ID has in every column, for files where IDs repeat. IDs are
+                encoded as shared variant codes once, and the (code, value hash) pairs of both files are counted with a
+                single groupby per column, so an ID differs in a column when any of its counts differ. Values are
+                compared by their hashes, so column tolerances do not apply.
+    Modifies:   Nothing
+    Returns:    Dictionary of each column to a dataframe of the differing IDs and their joined values, in the format of
+                the differences of get_file_differences
+    """
+    codes1, codes2, num_codes = get_variant_codes(df1, df2)
+    rows1 = np.flatnonzero(np.bincount(codes2, minlength=num_codes)[codes1])
+    rows2 = np.flatnonzero(np.bincount(codes1, minlength=num_codes)[codes2])
+    codes1, codes2 = codes1[rows1], codes2[rows2]
+    codes = np.concatenate([codes1, codes2])
+    counts = np.concatenate(
+        [np.ones(len(rows1), dtype=np.int64), -np.ones(len(rows2), dtype=np.int64)]
+    )
 
-    unique_variants = []
-    # Include unique variants
-    if unique_variants_file1 or unique_variants_file2:
-        for variant in unique_variants_file1:
-            unique_variants.append({"File 1": variant, "File 2": ""})
-        for variant in unique_variants_file2:
-            unique_variants.append({"File 1": "", "File 2": variant})
-
-    # Sort unique variants
-    if contains_id:
-        unique_variants = sorted(
-            unique_variants,
-            key=lambda x: extract_id_parts(x["File 1"] if x["File 1"] else x["File 2"]),
+    differences = {}
+    for col in columns_to_compare:
+        hashes = np.concatenate(
+            [
+                get_row_hashes(df1, [col])[rows1],
+                get_row_hashes(df2, [col])[rows2],
+            ]
         )
-    else:
-        unique_variants = sorted(
-            unique_variants,
-            key=lambda x: split_replaced_id(
-                x["File 1"] if x["File 1"] else x["File 2"]
-            ),
+        net_counts = (
+            pd.DataFrame({"code": codes, "hash": hashes, "count": counts})
+            .groupby(["code", "hash"], sort=False)["count"]
+            .sum()
         )
+        differing = np.unique(
+            net_counts.index.get_level_values("code")[net_counts.to_numpy() != 0]
+        )
+        if len(differing) == 0:
+            continue
+
+        in_differing1 = np.isin(codes1, differing)
+        in_differing2 = np.isin(codes2, differing)
+        values1 = get_grouped_values(
+            df1, col, codes1[in_differing1], rows1[in_differing1]
+        )
+        values2 = get_grouped_values(
+            df2, col, codes2[in_differing2], rows2[in_differing2]
+        )
+        diffs = pd.DataFrame(
+            {
+                "ID": get_ids(df1, values1["row"].to_numpy()),
+                f"{col}_file1": values1["value"].to_numpy(),
+                f"{col}_file2": values2["value"].to_numpy(),
+                "line_file1": values1["line"].to_numpy(),
+                "line_file2": values2["line"].to_numpy(),
+            }
+        )
+        differences[col] = pd.concat(
+            [diffs, get_sort_keys(df1, values1["row"].to_numpy(), contains_id)],
+            axis=1,
+        )
+    sort_differences(differences, contains_id)
+    return differences
+
+
+def sort_differences(differences, contains_id=True):
+    """
+    Purpose:    Sort the differences of each column by their ID, keeping file 1 order for records sharing a position
+    Modifies:   differences
+    Returns:    None
+    """
+    columns = get_sort_key_columns(contains_id) + ["line_file1", "line_file2"]
+    for col, diffs in differences.items():
+        differences[col] = sort_by_columns(diffs, columns)
 
-    return differences, unique_variants
+
+def get_unique_variant_records(
+    unique_variants_file1, unique_variants_file2, contains_id=True
+):
+    """
+    Purpose:    Create the sorted unique variant records used in the generated report, file 1 variants first
+                and in file order for variants sharing a position
+    Modifies:   Nothing
+    Returns:    Dataframe of unique variants with File 1 and File 2 columns
+    """
+    unique_variants = pd.concat(
+        [
+            unique_variants_file1.assign(
+                **{"File 1": unique_variants_file1["ID"], "File 2": "", "file": 1}
+            ),
+            unique_variants_file2.assign(
+                **{"File 1": "", "File 2": unique_variants_file2["ID"], "file": 2}
+            ),
+        ],
+        ignore_index=True,
+    )
+    unique_variants = sort_by_columns(
+        unique_variants, get_sort_key_columns(contains_id) + ["file", "line"]
+    )
+    return unique_variants[["File 1", "File 2"]]
 
 
 def get_total_number_variants(
-    common_variants, unique_variants_file1, unique_variants_file2
+    num_common_variants, num_unique_variants_file1, num_unique_variants_file2
 ):
     """
     Purpose:    Get the total number of variants between the two files
@@ -249,7 +1048,7 @@ def get_total_number_variants(
     Returns:    Integer of the total number of variants
     """
     total_variants = (
-        len(common_variants) + len(unique_variants_file1) + len(unique_variants_file2)
+        num_common_variants + num_unique_variants_file1 + num_unique_variants_file2
     )
     return total_variants
 
@@ -267,24 +1066,82 @@ def get_number_column_differences(differences):
     return num_col_differences
 
 
-def check_identical_dataframes(df1, df2, columns_to_compare):
+def get_row_hashes(df, columns, contains_id=False):
     """
-    Purpose:    Check if the specified dataframes are identical
+    Purpose:    Hash the values of the given columns in each row, and the ID if contains_id is True, converting numeric
+                columns to float64 first so that equal numbers hash the same whatever their dtype
+    Modifies:   Nothing
+    Returns:    Numpy array of a uint64 hash per row
+    """
+    hashes = (
+        get_variant_hashes(df) if contains_id else np.zeros(len(df), dtype=np.uint64)
+    )
+    for col in columns:
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(
+            values.dtype
+        ) and not pd.api.types.is_bool_dtype(values.dtype):
+            # Adding 0.0 turns -0.0 into 0.0, which compares equal but hashes differently
+            values = values.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0
+            column_hashes = pd.util.hash_array(values)
+        else:
+            column_hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        hashes = hashes * np.uint64(1000003) ^ column_hashes
+    return hashes
+
+
+def get_id_hashes(df, columns):
+    """
+    Purpose:    Hash the rows of each ID in the given columns into one value per ID, summing the row hashes so that
+                the rows of repeated IDs hash the same in any order
+    Modifies:   Nothing
+    Returns:    Tuple of numpy arrays of the uint64 hashes of the unique IDs in order of first appearance, which stand in
+                for the ID strings, the hashes of their rows and the position of each row's ID among the unique IDs
+    """
+    codes, ids = pd.factorize(get_variant_hashes(df))
+    hashes = np.zeros(len(ids), dtype=np.uint64)
+    if len(ids):
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        # uint64 addition wraps around, so the sum does not depend on the order of the rows
+        hashes = np.add.reduceat(get_row_hashes(df, columns)[order], starts)
+    return np.asarray(ids, dtype=np.uint64), hashes, codes
+
+
+def check_identical_row_hashes(hashes1, hashes2):
+    """
+    Purpose:    Check if two arrays of row hashes hold the same rows, in any order
     Modifies:   Nothing
     Returns:    True/False
     """
-    try:
-        df1_selected = df1[columns_to_compare].fillna(-9999)
-        df2_selected = df2[columns_to_compare].fillna(-9999)
+    return len(hashes1) == len(hashes2) and np.array_equal(
+        np.sort(hashes1), np.sort(hashes2)
+    )
 
-        return (df1_selected == df2_selected).all(axis=None)
-    except ValueError:
-        # Handles case where dataframes don't have identical numbers of rows
-        return False
+
+def check_identical_dataframes(df1, df2, columns_to_compare):
+    """
+    Purpose:    Check if the specified dataframes hold the same IDs and compared values, in any row order, by
+                comparing the sorted hashes of their rows
+    Modifies:   Nothing
+    Returns:    True/False
+    """
+    with stage("check_identical_dataframes", len(df1) + len(df2)):
+        if len(df1) != len(df2):
+            return False
+        contains_id = has_id(df1) and has_id(df2)
+        return check_identical_row_hashes(
+            get_row_hashes(df1, columns_to_compare, contains_id),
+            get_row_hashes(df2, columns_to_compare, contains_id),
+        )
 
 
 def generate_differences_summary(
-    common_variants, unique_variants_file1, unique_variants_file2, differences={}
+    num_common_variants,
+    num_unique_variants_file1,
+    num_unique_variants_file2,
+    differences={},
 ):
     """
     Purpose:    Create a summary of different statistics
@@ -292,11 +1149,11 @@ def generate_differences_summary(
     Returns:    String of the summary
     """
     total_vars = get_total_number_variants(
-        common_variants, unique_variants_file1, unique_variants_file2
+        num_common_variants, num_unique_variants_file1, num_unique_variants_file2
     )
-    common_vars = len(common_variants)
-    num_unique_vars_file1 = len(unique_variants_file1)
-    num_unique_vars_file2 = len(unique_variants_file2)
+    common_vars = num_common_variants
+    num_unique_vars_file1 = num_unique_variants_file1
+    num_unique_vars_file2 = num_unique_variants_file2
     summary = f"\n/* Differences Summary */\n"
     summary += f"-----------------------------\n"
     summary += f"Total number of variants: {total_vars}\n"
@@ -324,14 +1181,14 @@ def generate_comparison_report(
     replaced_id=False,
 ):
     """
-    Purpose:    Handles writing the aggregated and unaggregated tsv differences to the generated report
+    Purpose:    Handles writing the aggregated and unaggregated tsv differences to the generated report, formatting
+                each block of records in bulk
     Modifies:   Nothing
     Returns:    None
     """
-    first_unique_variant1 = True
-    first_unique_variant2 = True
+    num_rows = sum(len(diffs) for diffs in differences.values()) + len(unique_variants)
     try:
-        with open(output_path, "a") as f:
+        with stage("write_report", num_rows), append_to_report(output_path) as f:
             f.write(
                 f"\n\n============================== {tool.upper()} COMPARISON ==============================\n\n\n"
             )
@@ -351,31 +1208,14 @@ def generate_comparison_report(
                 else:
                     f.write(f"ID Format: {id_format}\n\n")
                 f.write("ID\tFile 1\tFile 2\t(Line in File1, Line in File2)\n")
-                for diff in diffs:
-                    file1_value = diff.get(f"{col}_file1", "NOT FOUND")
-                    file1_line = diff.get("line_file1", "NOT FOUND")
-                    file2_value = diff.get(f"{col}_file2", "NOT FOUND")
-                    file2_line = diff.get("line_file2", "NOT FOUND")
-                    f.write(f"{diff['ID']}:\t{file1_value}\t->\t{file2_value}\t({file1_line}, {file2_line})\n")
-
-            if unique_variants:
+                f.write(format_differences(diffs, col))
+
+            if not unique_variants.empty:
                 f.write(f"\n\n============[ UNIQUE VARIANTS ]============\n\n\n")
                 if replaced_id:
                     f.write("Variant Format: 'Gene (AA_Change)'\n\n")
                 else:
                     f.write(f"Variant Format: {id_format}\n\n")
-                for diff in unique_variants:
-                    if diff["File 2"] == "":
-                        if first_unique_variant1:
-                            f.write("Variants Unique to File 1:\n")
-                            first_unique_variant1 = False
-                        f.write(f"\t{diff['File 1']}\n")
-                    else:
-                        if first_unique_variant2:
-                            if not first_unique_variant1:
-                                f.write("\n")
-                            f.write("Variants Unique to File 2:\n")
-                            first_unique_variant2 = False
-                        f.write(f"\t{diff['File 2']}\n")
+                f.write(format_unique_variants(unique_variants))
     except Exception as e:
         raise Exception(f"Error writing differences to file: {e}")
@@ -1,5 +1 @@
-from .run_compare_aggregated_tsv import main as run_compare_aggregated_tsv
-from .run_compare_json import main as run_compare_json
-from .run_compare_reference_matches_tsv import main as run_compare_reference_matches_tsv
-from .run_compare_unaggregated_tsv import main as run_compare_unaggregated_tsv
-from .run_compare_yml import main as run_compare_yml
+# The runners are imported individually by the comparison router, so each comparison only loads its own dependencies
@@ -1,21 +1,34 @@
 from comparisons import CompareAggregatedTSV
 from run_utils import *
+from snapshot import compare_dataframes, get_baseline_snapshot
+from structured_output import (
+    get_tsv_tables,
+    write_identical_tables,
+    write_structured_tables,
+)
 import logging
 
 
-def main(input_file1, input_file2, output_file, columns_to_compare):
+def main(
+    input_file1,
+    input_file2,
+    output_file,
+    columns_to_compare,
+    load_options=None,
+    tolerances=None,
+    snapshot_store=None,
+):
     """
-    Purpose:    Control function for the aggregated tsv file comparison
+    Purpose:    Control function for the aggregated tsv file comparison. If snapshot_store is given, only the
+                variants that changed since the stored snapshot of file 1 are compared.
     Modifies:   Nothing
     Returns:    None
     """
     id_format = "Chromosome-Start-Stop-Reference-Variant"
 
     comparer = CompareAggregatedTSV(
-        input_file1, input_file2, output_file, columns_to_compare
+        input_file1, input_file2, output_file, columns_to_compare, load_options
     )
-    add_line_numbers(comparer.df1, comparer.df2)
-    check_column_formatting(comparer.df1, comparer.df2)
     comparer.check_id()
 
     columns_dropped_message = output_dropped_cols(
@@ -25,30 +38,43 @@ def main(input_file1, input_file2, output_file, columns_to_compare):
         comparer.df1, comparer.df2, comparer.columns_to_compare
     )
 
-    if check_identical_dataframes(comparer.df1, comparer.df2, comparer.columns_to_compare):
+    snapshot = get_baseline_snapshot(
+        snapshot_store,
+        "aggregated_tsv",
+        comparer.input_file1,
+        comparer.df1,
+        comparer.columns_to_compare,
+        comparer.contains_id,
+    )
+    results = compare_dataframes(
+        comparer.df1,
+        comparer.df2,
+        comparer.columns_to_compare,
+        comparer.contains_id,
+        tolerances,
+        snapshot,
+    )
+    if results is None:
         logging.info("The Aggregated TSV files are identical.")
-    else:
-        common_variants = get_common_variants(comparer.df1, comparer.df2)
-        unique_variants_file1, unique_variants_file2 = get_unique_variants(
-            comparer.df1, comparer.df2, common_variants
-        )
-
-        differences, unique_variants = get_file_differences(
-            comparer.df1,
-            comparer.df2,
-            comparer.columns_to_compare,
-            unique_variants_file1,
-            unique_variants_file2,
-            comparer.contains_id,
+        write_identical_tables(
+            comparer.output_path,
+            "aggregated_tsv",
+            "Aggregated TSV",
+            comparer.input_file1,
+            comparer.input_file2,
         )
+    else:
         differences_summary = generate_differences_summary(
-            common_variants, unique_variants_file1, unique_variants_file2, differences
+            results["num_common_variants"],
+            len(results["unique_variants_file1"]),
+            len(results["unique_variants_file2"]),
+            results["differences"],
         )
         generate_comparison_report(
             "Aggregated TSV",
             id_format,
-            differences,
-            unique_variants,
+            results["differences"],
+            results["unique_variants"],
             comparer.input_file1,
             comparer.input_file2,
             comparer.output_path,
@@ -56,6 +82,15 @@ def main(input_file1, input_file2, output_file, columns_to_compare):
             differences_summary,
             comparer.replaced_id,
         )
+        write_structured_tables(
+            comparer.output_path,
+            "aggregated_tsv",
+            get_tsv_tables,
+            "Aggregated TSV",
+            comparer.input_file1,
+            comparer.input_file2,
+            results,
+        )
 
 
 if __name__ == "__main__":
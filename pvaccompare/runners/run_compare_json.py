@@ -1,5 +1,7 @@
 import logging
 from comparisons import CompareJSON
+from profiling import stage
+from structured_output import write_identical_tables, write_structured_tables
 
 
 def main(input_file1, input_file2, output_file):
@@ -8,16 +10,25 @@ def main(input_file1, input_file2, output_file):
     Modifies:   Nothing
     Returns:    None
     """
-    comparer = CompareJSON(input_file1, input_file2, output_file)
-    comparer.compare_metric_data()
+    with stage("load_json"):
+        comparer = CompareJSON(input_file1, input_file2, output_file)
+    with stage("compare_metric_data"):
+        comparer.compare_metric_data()
 
     if any(
         key != "Shared Fields" and comparer.input_differences[key]
         for key in comparer.input_differences
     ):
-        comparer.generate_input_comparison_report()
+        with stage("write_report"):
+            comparer.generate_input_comparison_report()
+        write_structured_tables(
+            output_file, "metrics_json", comparer.get_structured_tables
+        )
     else:
         logging.info("The JSON metric inputs are identical.")
+        write_identical_tables(
+            output_file, "metrics_json", "Metrics JSON", input_file1, input_file2
+        )
 
 
 if __name__ == "__main__":
@@ -1,22 +1,36 @@
 from run_utils import *
+from structured_output import (
+    get_tsv_tables,
+    write_identical_tables,
+    write_structured_tables,
+)
 from comparisons import CompareReferenceMatchesTSV
+from profiling import stage
 import logging
 
 
-def main(input_file1, input_file2, output_file, columns_to_compare):
+def main(
+    input_file1,
+    input_file2,
+    output_file,
+    columns_to_compare,
+    load_options=None,
+    tolerances=None,
+    grouped=False,
+):
     """
-    Purpose:    Control function for the reference matches tsv comparison
+    Purpose:    Control function for the reference matches tsv comparison. If grouped is True, records with several
+                hits are compared by the values of all their hits instead of writing only their number of hits.
+                Grouped hits are compared exactly, so tolerances only apply to files without repeated IDs. The
+                reference match columns are all text, which tolerances do not apply to anyway.
     Modifies:   Nothing
     Returns:    None
     """
     id_format = "Chromosome-Start-Stop-Reference-Variant-Transcript-MT_Epitope_Seq-Hit_ID-Match_Start-Match_Stop"
 
     comparer = CompareReferenceMatchesTSV(
-        input_file1, input_file2, output_file, columns_to_compare
+        input_file1, input_file2, output_file, columns_to_compare, load_options
     )
-    add_line_numbers(comparer.df1, comparer.df2)
-    check_column_formatting(comparer.df1, comparer.df2)
-    comparer.create_id_column()
 
     columns_dropped_message = output_dropped_cols(
         comparer.df1, comparer.df2, comparer.columns_to_compare
@@ -25,40 +39,110 @@ def main(input_file1, input_file2, output_file, columns_to_compare):
         comparer.df1, comparer.df2, comparer.columns_to_compare
     )
 
-    if check_identical_dataframes(comparer.df1, comparer.df2, comparer.columns_to_compare):
+    if check_identical_dataframes(
+        comparer.df1, comparer.df2, comparer.columns_to_compare
+    ):
         logging.info("The Reference Matches TSV files are identical.")
-    else:
-        common_variants = get_common_variants(comparer.df1, comparer.df2)
-        unique_variants_file1, unique_variants_file2 = get_unique_variants(
-            comparer.df1, comparer.df2, common_variants
+        write_identical_tables(
+            comparer.output_path,
+            "reference_match_tsv",
+            "Reference Matches TSV",
+            comparer.input_file1,
+            comparer.input_file2,
         )
-
-        if comparer.check_duplicate_ids():
+    else:
+        duplicate_ids = comparer.check_duplicate_ids(grouped)
+        if duplicate_ids and grouped:
+            # Each ID is joined once for the variant counts, its hits are compared as a group
+            results = get_file_differences(
+                drop_duplicate_ids(comparer.df1),
+                drop_duplicate_ids(comparer.df2),
+                [],
+            )
+            results["differences"] = get_grouped_differences(
+                comparer.df1, comparer.df2, comparer.columns_to_compare
+            )
+            generate_comparison_report(
+                "Reference Matches TSV",
+                id_format,
+                results["differences"],
+                results["unique_variants"],
+                comparer.input_file1,
+                comparer.input_file2,
+                comparer.output_path,
+                columns_dropped_message,
+                generate_differences_summary(
+                    results["num_common_variants"],
+                    len(results["unique_variants_file1"]),
+                    len(results["unique_variants_file2"]),
+                    results["differences"],
+                ),
+            )
+            write_structured_tables(
+                comparer.output_path,
+                "reference_match_tsv",
+                get_tsv_tables,
+                "Reference Matches TSV",
+                comparer.input_file1,
+                comparer.input_file2,
+                results,
+            )
+        elif duplicate_ids:
+            # Only the variant counts are reported, so each ID is joined once
+            results = get_file_differences(
+                drop_duplicate_ids(comparer.df1),
+                drop_duplicate_ids(comparer.df2),
+                [],
+                sort=False,
+            )
             differences_summary = generate_differences_summary(
-                common_variants, unique_variants_file1, unique_variants_file2
+                results["num_common_variants"],
+                len(results["unique_variants_file1"]),
+                len(results["unique_variants_file2"]),
+            )
+            with stage("write_report"):
+                comparer.output_counts(differences_summary, id_format)
+            write_structured_tables(
+                comparer.output_path,
+                "reference_match_tsv",
+                get_tsv_tables,
+                "Reference Matches TSV",
+                comparer.input_file1,
+                comparer.input_file2,
+                results,
             )
-            comparer.output_counts(differences_summary, id_format)
         else:
-            differences, unique_variants = get_file_differences(
+            results = get_file_differences(
                 comparer.df1,
                 comparer.df2,
                 comparer.columns_to_compare,
-                unique_variants_file1,
-                unique_variants_file2,
+                tolerances=tolerances,
             )
             differences_summary = generate_differences_summary(
-                common_variants, unique_variants_file1, unique_variants_file2, differences
+                results["num_common_variants"],
+                len(results["unique_variants_file1"]),
+                len(results["unique_variants_file2"]),
+                results["differences"],
             )
             generate_comparison_report(
                 "Reference Matches TSV",
                 id_format,
-                differences,
-                unique_variants,
+                results["differences"],
+                results["unique_variants"],
                 comparer.input_file1,
                 comparer.input_file2,
                 comparer.output_path,
                 columns_dropped_message,
             )
+            write_structured_tables(
+                comparer.output_path,
+                "reference_match_tsv",
+                get_tsv_tables,
+                "Reference Matches TSV",
+                comparer.input_file1,
+                comparer.input_file2,
+                results,
+            )
 
 
 if __name__ == "__main__":
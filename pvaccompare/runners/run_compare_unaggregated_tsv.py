@@ -1,22 +1,51 @@
 from run_utils import *
+from structured_output import (
+    get_tsv_tables,
+    write_identical_tables,
+    write_structured_tables,
+)
 from comparisons import CompareUnaggregatedTSV
+from profiling import stage
+from snapshot import compare_dataframes, get_baseline_snapshot
+from streaming_utils import stream_tsv_differences
 import logging
 
 
-def main(input_file1, input_file2, output_file, columns_to_compare):
+def main(
+    input_file1,
+    input_file2,
+    output_file,
+    columns_to_compare,
+    chunksize=None,
+    num_buckets=64,
+    load_options=None,
+    tolerances=None,
+    snapshot_store=None,
+):
     """
-    Purpose:    Control function for the unaggregated tsv file comparison
+    Purpose:    Control function for the unaggregated tsv file comparison. If snapshot_store is given, only the
+                variants that changed since the stored snapshot of file 1 are compared, except when streaming.
     Modifies:   Nothing
     Returns:    None
     """
     id_format = "Chromosome-Start-Stop-Reference-Variant-HLA_Allele-Sub_peptide_Position-Mt_Epitope_Seq-Index"
 
+    if chunksize is not None:
+        main_streaming(
+            input_file1,
+            input_file2,
+            output_file,
+            columns_to_compare,
+            id_format,
+            chunksize,
+            num_buckets,
+            tolerances,
+        )
+        return
+
     comparer = CompareUnaggregatedTSV(
-        input_file1, input_file2, output_file, columns_to_compare
+        input_file1, input_file2, output_file, columns_to_compare, load_options
     )
-    add_line_numbers(comparer.df1, comparer.df2)
-    check_column_formatting(comparer.df1, comparer.df2)
-    comparer.create_id_column()
 
     columns_dropped_message = output_dropped_cols(
         comparer.df1, comparer.df2, comparer.columns_to_compare
@@ -25,35 +54,120 @@ def main(input_file1, input_file2, output_file, columns_to_compare):
         comparer.df1, comparer.df2, comparer.columns_to_compare
     )
 
-    if check_identical_dataframes(comparer.df1, comparer.df2, comparer.columns_to_compare):
+    snapshot = get_baseline_snapshot(
+        snapshot_store,
+        "unaggregated_tsv",
+        comparer.input_file1,
+        comparer.df1,
+        comparer.columns_to_compare,
+    )
+    results = compare_dataframes(
+        comparer.df1,
+        comparer.df2,
+        comparer.columns_to_compare,
+        tolerances=tolerances,
+        snapshot=snapshot,
+    )
+    if results is None:
         logging.info("The Unaggregated TSV files are identical.")
-    else:
-        common_variants = get_common_variants(comparer.df1, comparer.df2)
-        unique_variants_file1, unique_variants_file2 = get_unique_variants(
-            comparer.df1, comparer.df2, common_variants
-        )
-
-        differences, unique_variants = get_file_differences(
-            comparer.df1,
-            comparer.df2,
-            comparer.columns_to_compare,
-            unique_variants_file1,
-            unique_variants_file2,
+        write_identical_tables(
+            comparer.output_path,
+            "unaggregated_tsv",
+            "Unaggregated TSV",
+            comparer.input_file1,
+            comparer.input_file2,
         )
+    else:
         differences_summary = generate_differences_summary(
-            common_variants, unique_variants_file1, unique_variants_file2, differences
+            results["num_common_variants"],
+            len(results["unique_variants_file1"]),
+            len(results["unique_variants_file2"]),
+            results["differences"],
         )
         generate_comparison_report(
             "Unaggregated TSV",
             id_format,
-            differences,
-            unique_variants,
+            results["differences"],
+            results["unique_variants"],
             comparer.input_file1,
             comparer.input_file2,
             comparer.output_path,
             columns_dropped_message,
             differences_summary,
         )
+        write_structured_tables(
+            comparer.output_path,
+            "unaggregated_tsv",
+            get_tsv_tables,
+            "Unaggregated TSV",
+            comparer.input_file1,
+            comparer.input_file2,
+            results,
+        )
+
+
+def main_streaming(
+    input_file1,
+    input_file2,
+    output_file,
+    columns_to_compare,
+    id_format,
+    chunksize,
+    num_buckets,
+    tolerances=None,
+):
+    """
+    Purpose:    Control function for the chunked, bucketed unaggregated tsv file comparison
+    Modifies:   Nothing
+    Returns:    None
+    """
+    with stage("stream_tsv_differences"):
+        results = stream_tsv_differences(
+            input_file1,
+            input_file2,
+            CompareUnaggregatedTSV.id_columns,
+            columns_to_compare,
+            chunksize,
+            num_buckets,
+            tolerances,
+        )
+
+    if results["identical"]:
+        logging.info("The Unaggregated TSV files are identical.")
+        write_identical_tables(
+            output_file,
+            "unaggregated_tsv",
+            "Unaggregated TSV",
+            input_file1,
+            input_file2,
+        )
+    else:
+        differences_summary = generate_differences_summary(
+            results["num_common_variants"],
+            len(results["unique_variants_file1"]),
+            len(results["unique_variants_file2"]),
+            results["differences"],
+        )
+        generate_comparison_report(
+            "Unaggregated TSV",
+            id_format,
+            results["differences"],
+            results["unique_variants"],
+            input_file1,
+            input_file2,
+            output_file,
+            results["columns_dropped_message"],
+            differences_summary,
+        )
+        write_structured_tables(
+            output_file,
+            "unaggregated_tsv",
+            get_tsv_tables,
+            "Unaggregated TSV",
+            input_file1,
+            input_file2,
+            results,
+        )
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 import logging
 from comparisons import CompareYML
+from profiling import stage
+from structured_output import write_identical_tables, write_structured_tables
 
 
 def main(input_file1, input_file2, output_file):
@@ -9,17 +11,25 @@ def main(input_file1, input_file2, output_file):
     Returns:    None
     """
     logging.basicConfig(level=logging.INFO)
-    comparer = CompareYML(input_file1, input_file2, output_file)
+    with stage("load_and_diff_yml"):
+        comparer = CompareYML(input_file1, input_file2, output_file)
 
     if not comparer.differences:
         logging.info("The YAML input files are identical.")
+        write_identical_tables(
+            output_file, "input_yml", "Input YML", input_file1, input_file2
+        )
     else:
         try:
-            comparer.interpret_diff()
+            with stage("write_report"):
+                comparer.interpret_diff()
         except Exception as e:
             logging.error(
                 f"Error occurred while generating input comparison report: {e}"
             )
+        write_structured_tables(
+            output_file, "input_yml", comparer.get_structured_tables
+        )
 
 
 if __name__ == "__main__":
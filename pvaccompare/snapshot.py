@@ -0,0 +1,126 @@
+from parse_cache import get_cache_key
+from profiling import stage
+from run_utils import *
+import logging
+
+# Increase whenever the way the rows are hashed changes so stale snapshots are not reused
+SNAPSHOT_VERSION = 2
+
+
+def get_snapshot_key(input_file, file_type, columns_to_compare, contains_id=True):
+    """
+    Purpose:    Build the key of a file's snapshot from the file contents and the columns that are hashed
+    Modifies:   Nothing
+    Returns:    String of the snapshot key
+    """
+    return get_cache_key(
+        input_file,
+        "snapshot",
+        SNAPSHOT_VERSION,
+        file_type,
+        list(columns_to_compare),
+        contains_id,
+    )
+
+
+def create_snapshot(file_type, df, columns_to_compare):
+    """
+    Purpose:    Hash the rows of every variant of a file in the compared columns
+    Modifies:   Nothing
+    Returns:    Dictionary of the snapshot, holding the hashes of the unique IDs and a hash of each ID's rows
+    """
+    ids, hashes, _ = get_id_hashes(df, columns_to_compare)
+    return {
+        "version": SNAPSHOT_VERSION,
+        "file_type": file_type,
+        "columns": list(columns_to_compare),
+        "ids": ids,
+        "hashes": hashes,
+    }
+
+
+def get_baseline_snapshot(
+    snapshot_store, file_type, input_file, df, columns_to_compare, contains_id=True
+):
+    """
+    Purpose:    Load the snapshot of file 1 stored by a previous run, or create and store it if there is none
+    Modifies:   The snapshot store
+    Returns:    Dictionary of the snapshot, or None if snapshot_store is None or the file has no ID
+    """
+    if snapshot_store is None or not has_id(df):
+        return None
+    key = get_snapshot_key(input_file, file_type, columns_to_compare, contains_id)
+    with stage("load_snapshot"):
+        snapshot = snapshot_store.load(key)
+    if snapshot is None:
+        with stage("create_snapshot", len(df)):
+            snapshot = create_snapshot(file_type, df, columns_to_compare)
+        snapshot_store.store(key, snapshot)
+    return snapshot
+
+
+def get_changed_rows(snapshot, df1, df2, columns_to_compare):
+    """
+    Purpose:    Hash the rows of file 2 by ID and find the IDs that were changed, added or removed relative to the
+                snapshot of file 1
+    Modifies:   Nothing
+    Returns:    Tuple of the row positions of the changed and removed IDs in file 1, the row positions of the changed
+                and added IDs in file 2 and the number of unchanged IDs
+    """
+    ids2, hashes2, codes2 = get_id_hashes(df2, columns_to_compare)
+    positions = pd.Index(snapshot["ids"]).get_indexer(ids2)
+    unchanged = positions >= 0
+    unchanged[unchanged] = (
+        snapshot["hashes"][positions[unchanged]] == hashes2[unchanged]
+    )
+    rows1 = np.flatnonzero(~np.isin(get_variant_hashes(df1), ids2[unchanged]))
+    rows2 = np.flatnonzero(~unchanged[codes2])
+    return rows1, rows2, int(np.count_nonzero(unchanged))
+
+
+def get_incremental_differences(
+    snapshot, df1, df2, columns_to_compare, contains_id=True, tolerances=None
+):
+    """
+    Purpose:    Find the differences of the dataframes by comparing only the rows of the IDs that changed since the
+                snapshot of file 1, counting the unchanged IDs as common variants without differences
+    Modifies:   Nothing
+    Returns:    Dictionary of the comparison results, or None if file 2 matches the snapshot
+    """
+    with stage("get_changed_rows", len(df2)):
+        rows1, rows2, num_unchanged = get_changed_rows(
+            snapshot, df1, df2, columns_to_compare
+        )
+    if len(rows1) == 0 and len(rows2) == 0:
+        return None
+    logging.info(
+        "\u2022 Skipped %d variants unchanged since the snapshot of file 1",
+        num_unchanged,
+    )
+    results = get_file_differences(
+        df1.iloc[rows1],
+        df2.iloc[rows2],
+        columns_to_compare,
+        contains_id,
+        tolerances,
+    )
+    results["num_common_variants"] += num_unchanged
+    return results
+
+
+def compare_dataframes(
+    df1, df2, columns_to_compare, contains_id=True, tolerances=None, snapshot=None
+):
+    """
+    Purpose:    Check if the dataframes are identical and otherwise find their differences, comparing only the rows
+                of the IDs that changed since the snapshot of file 1 if one is given
+    Modifies:   Nothing
+    Returns:    Dictionary of the comparison results, or None if the dataframes are identical
+    """
+    if snapshot is not None:
+        return get_incremental_differences(
+            snapshot, df1, df2, columns_to_compare, contains_id, tolerances
+        )
+    if check_identical_dataframes(df1, df2, columns_to_compare):
+        return None
+    return get_file_differences(df1, df2, columns_to_compare, contains_id, tolerances)
@@ -0,0 +1,259 @@
+from run_utils import *
+from itertools import zip_longest
+import os
+import pickle
+import tempfile
+
+
+def resolve_column_dtype(kinds, has_empty_chunk):
+    """
+    Purpose:    Determine the dtype pandas would infer for a column when parsing the whole file at once
+    Modifies:   Nothing
+    Returns:    String of the dtype
+    """
+    if not kinds:
+        return "float64"
+    if kinds == {"i"}:
+        return "float64" if has_empty_chunk else "int64"
+    if kinds <= {"i", "f"}:
+        return "float64"
+    if kinds == {"b"} and not has_empty_chunk:
+        return "bool"
+    return "object"
+
+
+def infer_column_dtypes(input_file, usecols, chunksize):
+    """
+    Purpose:    Scan the tsv file in chunks to find dtypes that match a full, single pass parse
+    Modifies:   Nothing
+    Returns:    Dictionary of column names to dtypes, or None if the file has no rows
+    """
+    kinds = {col: set() for col in usecols}
+    has_empty_chunk = {col: False for col in usecols}
+    num_chunks = 0
+    for chunk in pd.read_csv(
+        input_file, sep="\t", usecols=usecols, chunksize=chunksize
+    ):
+        num_chunks += 1
+        for col in usecols:
+            if chunk[col].isna().all():
+                has_empty_chunk[col] = True
+            else:
+                kinds[col].add(chunk[col].dtype.kind)
+    if num_chunks == 0:
+        return None
+    return {
+        col: resolve_column_dtype(kinds[col], has_empty_chunk[col]) for col in usecols
+    }
+
+
+def get_string_id_columns(dtypes1, renames1, dtypes2, renames2, id_columns):
+    """
+    Purpose:    Find the ID columns holding integers in only one of the files, which are converted to strings so the IDs
+                of both files hash the same and land in the same buckets
+    Modifies:   Nothing
+    Returns:    List of ID column names
+    """
+    if dtypes1 is None or dtypes2 is None:
+        return []
+    integer_columns = []
+    for dtypes, renames in [(dtypes1, renames1), (dtypes2, renames2)]:
+        renamed_dtypes = {renames.get(col, col): dtype for col, dtype in dtypes.items()}
+        integer_columns.append(
+            {col for col in id_columns if renamed_dtypes.get(col) == "int64"}
+        )
+    return sorted(integer_columns[0] ^ integer_columns[1])
+
+
+def read_tsv_chunks(
+    input_file, usecols, renames, dtypes, id_columns, chunksize, string_id_columns=()
+):
+    """
+    Purpose:    Read the tsv file in chunks, formatting each chunk the same way as a fully loaded file and converting the
+                ID parts of string_id_columns to strings
+    Modifies:   Nothing
+    Returns:    Generator of dataframes with line numbers and ID parts
+    """
+    line = 2
+    for chunk in pd.read_csv(
+        input_file, sep="\t", usecols=usecols, dtype=dtypes, chunksize=chunksize
+    ):
+        chunk["line"] = range(line, line + len(chunk))
+        line += len(chunk)
+        chunk.rename(columns=renames, inplace=True)
+        create_id_parts(chunk, id_columns)
+        for col in string_id_columns:
+            part = get_id_part_name(col)
+            chunk[part] = chunk[part].astype(str)
+        yield chunk
+
+
+def get_bucket_path(bucket_dir, file_number, bucket):
+    """
+    Purpose:    Get the on-disk location of a bucket
+    Modifies:   Nothing
+    Returns:    String of the bucket file path
+    """
+    return os.path.join(bucket_dir, f"file{file_number}_bucket{bucket}.pkl")
+
+
+def write_bucket_chunks(chunk, bucket_dir, file_number, num_buckets):
+    """
+    Purpose:    Partition a chunk by a hash of its IDs and append each part to its on-disk bucket
+    Modifies:   The bucket files in bucket_dir
+    Returns:    None
+    """
+    buckets = get_variant_hashes(chunk) % np.uint64(num_buckets)
+    for bucket, bucket_chunk in chunk.groupby(buckets, sort=False):
+        with open(get_bucket_path(bucket_dir, file_number, bucket), "ab") as f:
+            pickle.dump(bucket_chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_bucket(bucket_dir, file_number, bucket, empty_df):
+    """
+    Purpose:    Load every chunk written to a bucket into a single dataframe
+    Modifies:   Nothing
+    Returns:    Dataframe of the bucket, or empty_df if nothing was written to it
+    """
+    chunks = []
+    path = get_bucket_path(bucket_dir, file_number, bucket)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    chunks.append(pickle.load(f))
+                except EOFError:
+                    break
+    if not chunks:
+        return empty_df
+    return pd.concat(chunks)
+
+
+def get_header_dataframe(usecols, renames, id_columns):
+    """
+    Purpose:    Create an empty dataframe with the columns a fully loaded and formatted file would have
+    Modifies:   Nothing
+    Returns:    Empty dataframe
+    """
+    df = pd.DataFrame(columns=usecols)
+    df["line"] = pd.Series(dtype="int64")
+    df.rename(columns=renames, inplace=True)
+    create_id_parts(df, id_columns)
+    return df
+
+
+def stream_tsv_differences(
+    input_file1,
+    input_file2,
+    id_columns,
+    columns_to_compare,
+    chunksize,
+    num_buckets,
+    tolerances=None,
+):
+    """
+    Purpose:    Compare two tsv files in chunks, partitioning rows into on-disk buckets by a hash of their ID
+                so that only one bucket of each file is held in memory at a time
+    Modifies:   Nothing
+    Returns:    Dictionary of the comparison results
+    """
+    required_columns = set(id_columns).union(columns_to_compare)
+    usecols1, renames1 = get_required_columns(input_file1, required_columns)
+    usecols2, renames2 = get_required_columns(input_file2, required_columns)
+    log_column_renames(renames1, 1)
+    log_column_renames(renames2, 2)
+
+    empty_df1 = get_header_dataframe(usecols1, renames1, id_columns)
+    empty_df2 = get_header_dataframe(usecols2, renames2, id_columns)
+    results = {
+        "columns_dropped_message": output_dropped_cols(
+            empty_df1, empty_df2, columns_to_compare
+        ),
+        "columns_to_compare": check_columns_to_compare(
+            empty_df1, empty_df2, columns_to_compare
+        ),
+        "identical": True,
+    }
+    columns_to_compare = results["columns_to_compare"]
+
+    dtypes1 = infer_column_dtypes(input_file1, usecols1, chunksize)
+    dtypes2 = infer_column_dtypes(input_file2, usecols2, chunksize)
+    string_id_columns = get_string_id_columns(
+        dtypes1, renames1, dtypes2, renames2, id_columns
+    )
+
+    # The row hashes of both files are compared once every chunk is read, so rows may move between chunks
+    hashes1 = []
+    hashes2 = []
+    with tempfile.TemporaryDirectory(prefix="pvaccompare_buckets_") as bucket_dir:
+        for chunk1, chunk2 in zip_longest(
+            read_tsv_chunks(
+                input_file1,
+                usecols1,
+                renames1,
+                dtypes1,
+                id_columns,
+                chunksize,
+                string_id_columns,
+            ),
+            read_tsv_chunks(
+                input_file2,
+                usecols2,
+                renames2,
+                dtypes2,
+                id_columns,
+                chunksize,
+                string_id_columns,
+            ),
+        ):
+            if chunk1 is not None:
+                empty_df1 = chunk1.iloc[0:0]
+                hashes1.append(get_row_hashes(chunk1, columns_to_compare, True))
+                write_bucket_chunks(chunk1, bucket_dir, 1, num_buckets)
+            if chunk2 is not None:
+                empty_df2 = chunk2.iloc[0:0]
+                hashes2.append(get_row_hashes(chunk2, columns_to_compare, True))
+                write_bucket_chunks(chunk2, bucket_dir, 2, num_buckets)
+
+        results["identical"] = check_identical_row_hashes(
+            np.concatenate(hashes1 or [np.zeros(0, dtype=np.uint64)]),
+            np.concatenate(hashes2 or [np.zeros(0, dtype=np.uint64)]),
+        )
+        if results["identical"]:
+            return results
+
+        num_common_variants = 0
+        unique_variants_file1 = []
+        unique_variants_file2 = []
+        differences = {col: [] for col in columns_to_compare}
+        for bucket in range(num_buckets):
+            df1 = load_bucket(bucket_dir, 1, bucket, empty_df1)
+            df2 = load_bucket(bucket_dir, 2, bucket, empty_df2)
+
+            bucket_results = get_file_differences(
+                df1, df2, columns_to_compare, tolerances=tolerances, sort=False
+            )
+
+            num_common_variants += bucket_results["num_common_variants"]
+            unique_variants_file1.append(bucket_results["unique_variants_file1"])
+            unique_variants_file2.append(bucket_results["unique_variants_file2"])
+            for col, diffs in bucket_results["differences"].items():
+                differences[col].append(diffs)
+
+    differences = {
+        col: pd.concat(diffs, ignore_index=True)
+        for col, diffs in differences.items()
+        if diffs
+    }
+    sort_differences(differences)
+    unique_variants_file1 = pd.concat(unique_variants_file1, ignore_index=True)
+    unique_variants_file2 = pd.concat(unique_variants_file2, ignore_index=True)
+
+    results["num_common_variants"] = num_common_variants
+    results["unique_variants_file1"] = unique_variants_file1
+    results["unique_variants_file2"] = unique_variants_file2
+    results["differences"] = differences
+    results["unique_variants"] = get_unique_variant_records(
+        unique_variants_file1, unique_variants_file2
+    )
+    return results
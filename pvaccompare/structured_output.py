@@ -0,0 +1,225 @@
+import contextlib
+import importlib.util
+import logging
+import os
+
+from profiling import stage
+from report_writer import to_report_strings
+
+# Structured output settings of the reports being written, keyed by the absolute report path
+structured_outputs = {}
+
+
+def get_structured_format(output_format):
+    """
+    Purpose:    Check that the packages needed for the structured output format are installed, falling back to jsonl if not
+    Modifies:   Nothing
+    Returns:    String of the structured output format to use
+    """
+    if output_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        logging.warning(
+            "pyarrow is not installed, writing the structured output as jsonl instead of parquet"
+        )
+        return "jsonl"
+    return output_format
+
+
+def get_structured_output_prefix(report_path):
+    """
+    Purpose:    Get the path prefix the structured output files of a report are written to
+    Modifies:   Nothing
+    Returns:    String of the path prefix
+    """
+    return os.path.splitext(report_path)[0]
+
+
+@contextlib.contextmanager
+def record_structured_output(output_path, structured_output=None):
+    """
+    Purpose:    Write the structured results of the comparisons appending to output_path while in the context,
+                structured_output being a (path prefix, format) tuple or None to disable it
+    Modifies:   structured_outputs
+    Returns:    Generator yielding nothing
+    """
+    if structured_output is None:
+        yield
+        return
+
+    path = os.path.abspath(output_path)
+    structured_outputs[path] = structured_output
+    try:
+        yield
+    finally:
+        del structured_outputs[path]
+
+
+def write_structured_tables(output_path, comparison, get_tables, *args):
+    """
+    Purpose:    Write each table returned by get_tables(*args) as prefix.comparison.table.format, if structured output
+                is enabled for the report, only building the tables when it is
+    Modifies:   Nothing
+    Returns:    None
+    """
+    structured_output = structured_outputs.get(os.path.abspath(output_path))
+    if structured_output is None:
+        return
+
+    output_prefix, output_format = structured_output
+    with stage("write_structured_tables") as record:
+        tables = get_tables(*args)
+        record["rows"] = sum(len(table) for table in tables.values())
+        for name, table in tables.items():
+            path = f"{output_prefix}.{comparison}.{name}.{output_format}"
+            try:
+                if output_format == "parquet":
+                    table.to_parquet(path, index=False)
+                else:
+                    table.to_json(path, orient="records", lines=True)
+            except Exception as e:
+                raise Exception(f"Error writing structured output to {path}: {e}")
+
+
+def get_summary_table(
+    tool,
+    input_file1,
+    input_file2,
+    num_differences,
+    num_common_variants=None,
+    num_unique_variants_file1=None,
+    num_unique_variants_file2=None,
+):
+    """
+    Purpose:    Build the one row summary table of a comparison, the variant counts being None for comparisons of
+                files without variants or when they were not counted
+    Modifies:   Nothing
+    Returns:    Dataframe of the summary
+    """
+    import pandas as pd
+
+    counts = {
+        "num_variants": (
+            None
+            if num_common_variants is None
+            else num_common_variants
+            + num_unique_variants_file1
+            + num_unique_variants_file2
+        ),
+        "num_common_variants": num_common_variants,
+        "num_unique_variants_file1": num_unique_variants_file1,
+        "num_unique_variants_file2": num_unique_variants_file2,
+        "num_differences": num_differences,
+    }
+    summary = pd.DataFrame(
+        [
+            {
+                "comparison": tool,
+                "file1": input_file1,
+                "file2": input_file2,
+                **counts,
+                "identical": num_differences == 0
+                and not num_unique_variants_file1
+                and not num_unique_variants_file2,
+            }
+        ]
+    )
+    return summary.astype({col: "Int64" for col in counts})
+
+
+def write_identical_tables(output_path, comparison, tool, input_file1, input_file2):
+    """
+    Purpose:    Write the summary table of a comparison whose files are identical, so it can be told apart from a
+                comparison that was not run. The variants of identical tsv files are not counted, as they may not
+                have been parsed.
+    Modifies:   Nothing
+    Returns:    None
+    """
+    unique_variants = 0 if comparison.endswith("_tsv") else None
+    write_structured_tables(
+        output_path,
+        comparison,
+        lambda: {
+            "summary": get_summary_table(
+                tool,
+                input_file1,
+                input_file2,
+                0,
+                num_unique_variants_file1=unique_variants,
+                num_unique_variants_file2=unique_variants,
+            )
+        },
+    )
+
+
+def get_tsv_tables(tool, input_file1, input_file2, results):
+    """
+    Purpose:    Build the summary, differences and unique variants tables of a tsv comparison from its results
+    Modifies:   Nothing
+    Returns:    Dictionary of table names to dataframes
+    """
+    import pandas as pd
+
+    differences = results.get("differences", {})
+    summary = get_summary_table(
+        tool,
+        input_file1,
+        input_file2,
+        sum(len(diffs) for diffs in differences.values()),
+        results["num_common_variants"],
+        len(results["unique_variants_file1"]),
+        len(results["unique_variants_file2"]),
+    )
+
+    # Values are written as their report text so columns of different types share one table
+    difference_tables = [
+        pd.DataFrame(
+            {
+                "ID": diffs["ID"].to_numpy(),
+                "column": col,
+                "value_file1": to_report_strings(diffs[f"{col}_file1"]).to_numpy(),
+                "value_file2": to_report_strings(diffs[f"{col}_file2"]).to_numpy(),
+                "line_file1": diffs["line_file1"].to_numpy(),
+                "line_file2": diffs["line_file2"].to_numpy(),
+            }
+        )
+        for col, diffs in differences.items()
+    ]
+    if difference_tables:
+        differences_table = pd.concat(difference_tables, ignore_index=True)
+    else:
+        differences_table = pd.DataFrame(
+            columns=[
+                "ID",
+                "column",
+                "value_file1",
+                "value_file2",
+                "line_file1",
+                "line_file2",
+            ]
+        )
+
+    unique_variants_table = pd.concat(
+        [
+            results["unique_variants_file1"][["ID", "line"]].assign(file=1),
+            results["unique_variants_file2"][["ID", "line"]].assign(file=2),
+        ],
+        ignore_index=True,
+    )[["ID", "file", "line"]]
+
+    return {
+        "summary": summary,
+        "differences": differences_table,
+        "unique_variants": unique_variants_table,
+    }
+
+
+def get_change_table(records):
+    """
+    Purpose:    Build the table of changes found in a yml or json comparison
+    Modifies:   Nothing
+    Returns:    Dataframe of the change type, field and the values in each file as strings
+    """
+    import pandas as pd
+
+    return pd.DataFrame(
+        records, columns=["change_type", "field", "value_file1", "value_file2"]
+    )
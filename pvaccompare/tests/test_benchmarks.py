@@ -0,0 +1,89 @@
+import unittest
+import os
+import shutil
+import tempfile
+import pandas as pd
+from benchmarks.generate_results import generate_results_folders
+from benchmarks.run_benchmarks import run_benchmarks
+from compare_tools import run_comparisons
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_benchmarks.py
+# python -m unittest discover -s tests
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.results_folder1, self.results_folder2 = generate_results_folders(
+            self.temp_dir,
+            num_variants=200,
+            peptides_per_variant=4,
+            difference_rate=0.05,
+            unique_rate=0.1,
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_ids(self, results_folder):
+        aggregated = pd.read_csv(
+            os.path.join(
+                results_folder, "MHC_Class_I", "sample.all_epitopes.aggregated.tsv"
+            ),
+            sep="\t",
+        )
+        return set(aggregated["ID"])
+
+    def test_generated_results_are_compared(self):
+        ids1 = self.read_ids(self.results_folder1)
+        ids2 = self.read_ids(self.results_folder2)
+        output_file = os.path.join(self.temp_dir, "report")
+        run_comparisons(
+            ["MHC_Class_I"],
+            self.results_folder1,
+            self.results_folder2,
+            output_file,
+            ["Best Peptide", "IC50 MT", "Tier"],
+            ["Biotype", "Median MT IC50 Score"],
+            ["Peptide", "Match Window"],
+        )
+        with open(f"{output_file}_MHC_Class_I.tsv", "r") as f:
+            report = f.read()
+
+        for comparison in [
+            "INPUT YML",
+            "METRICS JSON",
+            "AGGREGATED TSV",
+            "UNAGGREGATED TSV",
+            "REFERENCE MATCHES TSV",
+        ]:
+            self.assertIn(f"{comparison} COMPARISON", report)
+        self.assertIn(f"Number of common variants: {len(ids1 & ids2)}", report)
+        self.assertIn(
+            f"Number of variants unique to file 1: {len(ids1 - ids2)}", report
+        )
+        self.assertIn(
+            f"Number of variants unique to file 2: {len(ids2 - ids1)}", report
+        )
+        self.assertIn("Number of differences in Median MT IC50 Score", report)
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(
+            self.results_folder1, self.results_folder2, ["aggregated"], repeats=1
+        )
+
+        self.assertEqual(list(results), ["aggregated"])
+        self.assertEqual(len(results["aggregated"]["all_seconds"]), 1)
+        self.assertGreater(results["aggregated"]["seconds"], 0)
+        self.assertGreater(results["aggregated"]["max_rss_mb"], 0)
+
+    def test_benchmark_peak_memory_is_its_own(self):
+        # A large allocation in the parent must not count toward the peak memory of the benchmark processes
+        allocation_mb = 400
+        allocation = b"\x01" * (allocation_mb * 1024**2)
+        results = run_benchmarks(
+            self.results_folder1, self.results_folder2, ["yml"], repeats=1
+        )
+        del allocation
+
+        self.assertLess(results["yml"]["max_rss_mb"], allocation_mb / 2)
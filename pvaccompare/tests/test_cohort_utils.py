@@ -0,0 +1,177 @@
+import unittest
+import itertools
+import os
+import tempfile
+from unittest import mock
+from cohort_utils import *
+from comparisons import CompareAggregatedTSV, CompareUnaggregatedTSV
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_cohort_utils.py
+# python -m unittest discover -s tests
+class TestCohortUtils(unittest.TestCase):
+    def setUp(self):
+        self.output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".tsv")
+        self.unaggregated_files = [
+            "tests/test_data/unaggregated_input1.tsv",
+            "tests/test_data/unaggregated_input2.tsv",
+            "tests/test_data/unaggregated_input3.tsv",
+        ]
+        self.unaggregated_columns = [
+            "Biotype",
+            "Median MT IC50 Score",
+            "Median WT IC50 Score",
+            "WT Epitope Seq",
+            "Tumor DNA VAF",
+            "Gene Expression",
+        ]
+
+    def tearDown(self):
+        os.remove(self.output_file.name)
+
+    def test_matrix_matches_pairwise_comparisons(self):
+        dfs = load_cohort_files(
+            self.unaggregated_files, CompareUnaggregatedTSV, self.unaggregated_columns
+        )
+        columns, _ = output_dropped_cohort_cols(dfs, self.unaggregated_columns)
+        results = get_cohort_differences(dfs, columns)
+
+        for i, j in itertools.combinations(range(len(dfs)), 2):
+            df1, df2 = load_tsv_files(
+                self.unaggregated_files[i],
+                self.unaggregated_files[j],
+                *CompareUnaggregatedTSV.get_load_arguments(columns),
+            )
+            pairwise = get_file_differences(
+                df1, df2, check_columns_to_compare(df1, df2, columns)
+            )
+            self.assertEqual(
+                results["missing"][i, j], len(pairwise["unique_variants_file1"])
+            )
+            self.assertEqual(
+                results["missing"][j, i], len(pairwise["unique_variants_file2"])
+            )
+            for col in columns:
+                expected = len(pairwise["differences"].get(col, []))
+                self.assertEqual(results["differences"][col][i, j], expected)
+                self.assertEqual(results["differences"][col][j, i], expected)
+
+    def test_codes_match_pairwise_comparisons(self):
+        rng = np.random.default_rng(0)
+        dfs = []
+        for _ in range(4):
+            ids = [f"variant{i}" for i in rng.choice(40, 30, replace=False)]
+            scores = rng.choice([1.0, 2.0, 2.05, np.nan], 30)
+            peptides = rng.choice(np.array(["A", "B", None], dtype=object), 30)
+            dfs.append(
+                pd.DataFrame({"ID": ids, "Score": scores, "Best Peptide": peptides})
+            )
+        columns = ["Score", "Best Peptide"]
+        tolerances = ColumnTolerances({"Score": (0.0, 0.0)})
+
+        with mock.patch(
+            "cohort_utils.get_difference_mask", wraps=get_difference_mask
+        ) as difference_mask:
+            results = get_cohort_differences(dfs, columns, tolerances)
+        # Only numeric columns with a tolerance are compared pair by pair
+        difference_mask.assert_not_called()
+        self.assertEqual(
+            get_cohort_differences(dfs, ["Score"])["differences"]["Score"][0, 1],
+            np.count_nonzero(get_difference_mask(*self.join_scores(dfs[0], dfs[1]))),
+        )
+
+        self.assert_matches_pairwise(dfs, columns, tolerances, results)
+
+    def assert_matches_pairwise(self, dfs, columns, tolerances, results):
+        wide = join_cohort(dfs, columns)
+        present = [
+            wide[(version, "present")].to_numpy() for version in range(1, len(dfs) + 1)
+        ]
+        for col in columns:
+            disagreeing = np.zeros(len(wide), dtype=bool)
+            for i, j in itertools.combinations(range(len(dfs)), 2):
+                mask = get_difference_mask(
+                    wide[(i + 1, col)], wide[(j + 1, col)], *tolerances.get(col)
+                )
+                mask &= present[i] & present[j]
+                disagreeing |= mask
+                self.assertEqual(
+                    results["differences"][col][i, j], np.count_nonzero(mask)
+                )
+                self.assertEqual(
+                    results["differences"][col][j, i], np.count_nonzero(mask)
+                )
+            in_all_versions = np.logical_and.reduce(present)
+            self.assertEqual(
+                results["num_agreeing"][col],
+                np.count_nonzero(in_all_versions & ~disagreeing),
+            )
+
+    def test_tolerance_codes_match_pairwise_comparisons(self):
+        rng = np.random.default_rng(0)
+        values = [0.0, 0.05, 0.1, 0.15, 0.3, 1.0, 1.1, np.inf, np.nan]
+        dfs = []
+        for version in range(5):
+            ids = [f"variant{i}" for i in rng.choice(300, 250, replace=False)]
+            scores = rng.choice(values, 250)
+            dfs.append(
+                pd.DataFrame(
+                    {
+                        "ID": ids,
+                        "Score": scores,
+                        "Float32 Score": scores.astype(np.float32),
+                        "Relative Score": scores * 100,
+                        # Text in one version, so only the numeric versions use the tolerance
+                        "Mixed Score": scores.astype(str) if version == 0 else scores,
+                    }
+                )
+            )
+        columns = ["Score", "Float32 Score", "Relative Score", "Mixed Score"]
+        tolerances = ColumnTolerances({"Relative Score": (0.0, 0.1)})
+
+        results = get_cohort_differences(dfs, columns, tolerances)
+        self.assert_matches_pairwise(dfs, columns, tolerances, results)
+
+        # Values whose clusters are all within the tolerance are compared without the pairwise fallback
+        for df in dfs:
+            df["Score"] = rng.choice([1.0, 1.05, 3.0, np.nan], len(df))
+        with mock.patch(
+            "cohort_utils.get_difference_mask", wraps=get_difference_mask
+        ) as difference_mask:
+            results = get_cohort_differences(dfs, ["Score"], tolerances)
+        difference_mask.assert_not_called()
+        self.assert_matches_pairwise(dfs, ["Score"], tolerances, results)
+
+    def join_scores(self, df1, df2):
+        joined = df1.merge(df2, on="ID")
+        return joined["Score_x"], joined["Score_y"]
+
+    def test_report(self):
+        run_cohort_comparison(
+            "Aggregated TSV",
+            "aggregated_tsv",
+            CompareAggregatedTSV,
+            [
+                "tests/test_data/aggregated_input1.tsv",
+                "tests/test_data/aggregated_input2.tsv",
+                "tests/test_data/aggregated_input1.tsv",
+            ],
+            self.output_file.name,
+            ["Best Peptide", "Tier", "Missing Column"],
+        )
+        with open(self.output_file.name, "r") as f:
+            report = f.read()
+
+        self.assertIn("AGGREGATED TSV COHORT COMPARISON", report)
+        self.assertIn("Version 3: tests/test_data/aggregated_input1.tsv", report)
+        self.assertIn(
+            "Column dropped: 'Missing Column' is not present in version 1, 2, 3", report
+        )
+        # Versions 1 and 3 are the same file, so they only differ from version 2
+        for col in ["BEST PEPTIDE", "TIER"]:
+            section = report.split(f"[ DIFFERENCES IN {col} ]")[1]
+            matrix = [line.split("\t") for line in section.split("\n")[6:9]]
+            self.assertEqual(matrix[0][3], "0")
+            self.assertEqual(matrix[2][1], "0")
+            self.assertEqual(matrix[0][2], matrix[1][3])
@@ -109,3 +109,48 @@ class TestRunCompareReferenceMatchesTSV(unittest.TestCase):
         ) as expected_file:
             expected_output = expected_file.read().strip()
         self.assertEqual(sanitized_output.strip(), expected_output)
+
+    def test_grouped_duplicate_records(self):
+        with open("tests/test_data/reference_matches_input1.tsv", "r") as f:
+            header, first, second, *rows = f.read().splitlines()
+        changed = first.split("\t")
+        changed[10] = "SAPSLSPX"
+        # Both files repeat the first record, with a different match window in file 2, and file 1 repeats the second
+        self.input_file1.write(
+            "\n".join([header, first, second, first, second] + rows).encode()
+        )
+        self.input_file2.write(
+            "\n".join([header, first, second, "\t".join(changed)] + rows).encode()
+        )
+        self.input_file1.close()
+        self.input_file2.close()
+
+        with self.assertLogs(level="INFO") as log:
+            main(
+                self.input_file1.name,
+                self.input_file2.name,
+                self.output_file.name,
+                self.columns_to_compare,
+                grouped=True,
+            )
+        self.assertIn(
+            "INFO:root:\u2022 Duplicate unique records were found in both files. Comparing the values of each record as a group.",
+            log.output,
+        )
+
+        self.output_file.seek(0)
+        output_content = self.output_file.read().decode()
+        first_id = "chr8-22566400-22566401-G-C-ENST00000240123.12-APSLSPHKM-ENSP00000356113.3-233-241"
+        second_id = "chr4-373601-373602-C-T-ENST00000240499.8-KIYTGEKPY-ENSP00000340524.5-620-631"
+        self.assertIn("Number of common variants: 18\n", output_content)
+        self.assertIn("Number of differences in Peptide: 1\n", output_content)
+        self.assertIn("Number of differences in Match Window: 2\n", output_content)
+        self.assertIn(
+            f"{second_id}:\tLNEHKKIYTGEKPYK, LNEHKKIYTGEKPYK\t->\tLNEHKKIYTGEKPYK\t(3, 3)\n",
+            output_content,
+        )
+        self.assertIn(
+            f"{first_id}:\tSAPSLSPH, SAPSLSPH\t->\tSAPSLSPH, SAPSLSPX\t(2, 2)\n",
+            output_content,
+        )
+        self.assertNotIn("UNIQUE VARIANTS", output_content)
@@ -1,6 +1,24 @@
 import unittest
 import os
 import tempfile
+import importlib.util
+import shutil
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+from unittest import mock
+from parse_cache import ParsedFileCache
+from run import define_parser
+from structured_output import record_structured_output
+from run_utils import (
+    create_id_parts,
+    get_file_differences,
+    get_ids,
+    get_variant_codes,
+    get_variant_hashes,
+    join_variant_codes,
+)
 from runners.run_compare_unaggregated_tsv import main
 
 
@@ -48,6 +66,64 @@ class TestRunCompareUnaggregatedTSV(unittest.TestCase):
 
         self.assertIn("INFO:root:The Unaggregated TSV files are identical.", log.output)
 
+    def write_reordered_files(self):
+        with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
+            header, *rows = f.read().splitlines()
+        self.input_file1.write("\n".join([header] + rows).encode())
+        self.input_file2.write("\n".join([header] + rows[::-1]).encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+    def test_reordered_identical_files(self):
+        self.write_reordered_files()
+
+        with self.assertLogs(level="INFO") as log:
+            main(
+                self.input_file1.name,
+                self.input_file2.name,
+                self.output_file.name,
+                self.columns_to_compare,
+            )
+
+        self.assertIn("INFO:root:The Unaggregated TSV files are identical.", log.output)
+
+    def test_identical_summary(self):
+        self.write_reordered_files()
+        output_prefix = os.path.splitext(self.output_file.name)[0]
+        summary_file = f"{output_prefix}.unaggregated_tsv.summary.jsonl"
+        self.addCleanup(os.remove, summary_file)
+
+        for chunksize in [None, 4]:
+            with record_structured_output(
+                self.output_file.name, (output_prefix, "jsonl")
+            ):
+                main(
+                    self.input_file1.name,
+                    self.input_file2.name,
+                    self.output_file.name,
+                    self.columns_to_compare,
+                    chunksize=chunksize,
+                )
+            summary = pd.read_json(summary_file, lines=True)
+            self.assertTrue(summary["identical"][0])
+            self.assertEqual(summary["num_differences"][0], 0)
+            self.assertEqual(summary["num_unique_variants_file1"][0], 0)
+
+    def test_streaming_reordered_identical_files(self):
+        self.write_reordered_files()
+
+        with self.assertLogs(level="INFO") as log:
+            main(
+                self.input_file1.name,
+                self.input_file2.name,
+                self.output_file.name,
+                self.columns_to_compare,
+                chunksize=4,
+                num_buckets=3,
+            )
+
+        self.assertIn("INFO:root:The Unaggregated TSV files are identical.", log.output)
+
     def test_different_files(self):
         with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
             content1 = f.read()
@@ -81,6 +157,67 @@ class TestRunCompareUnaggregatedTSV(unittest.TestCase):
             expected_output = expected_file.read().strip()
         self.assertEqual(sanitized_output.strip(), expected_output)
 
+    def test_numeric_blocks(self):
+        # Comparing the numeric columns a few rows at a time gives the same report as comparing them all at once
+        with mock.patch("run_utils.NUMERIC_BLOCK_ROWS", 3):
+            self.test_different_files()
+
+    def test_variant_code_join(self):
+        # Repeated IDs pair every row of file 1 with every row of file 2 sharing the ID, like a merge on ID
+        df1 = pd.DataFrame({"ID": ["b", "a", "c", "a", "d"]})
+        df2 = pd.DataFrame({"ID": ["a", "e", "b", "a", "b"]})
+        codes1, codes2, num_codes = get_variant_codes(df1, df2)
+        self.assertEqual(num_codes, 5)
+        self.assertEqual(codes1[1], codes2[0])
+
+        rows1, rows2 = join_variant_codes(codes1, codes2, num_codes)
+        merged = (
+            df1.reset_index()
+            .merge(df2.reset_index(), on="ID")
+            .sort_values(["index_x", "index_y"])
+        )
+        self.assertEqual(rows1.tolist(), merged["index_x"].tolist())
+        self.assertEqual(rows2.tolist(), merged["index_y"].tolist())
+
+        rows1, rows2 = join_variant_codes(codes1[:0], codes2[:0], 0)
+        self.assertEqual((len(rows1), len(rows2)), (0, 0))
+
+    def test_id_parts(self):
+        # Variants are matched on their typed ID columns the way they would be on the joined ID strings
+        df1 = pd.DataFrame(
+            {"Chromosome": ["chr1", "chr2", "chr1", "chr1"], "Start": [5, 12, 5, 1]}
+        )
+        df2 = pd.DataFrame(
+            {"Chromosome": ["chr1", "chr1", "chr2"], "Start": ["5", "5.0", "12"]}
+        )
+        ids = []
+        for df in [df1, df2]:
+            ids.append((df["Chromosome"] + "-" + df["Start"].astype(str)).tolist())
+            df["Chromosome"] = df["Chromosome"].astype("category")
+            create_id_parts(df, ["Chromosome", "Start"])
+            self.assertEqual(get_ids(df, np.arange(len(df))).tolist(), ids[-1])
+
+        codes1, codes2, num_codes = get_variant_codes(df1, df2)
+        expected_codes, expected_ids = pd.factorize(np.array(ids[0] + ids[1]))
+        self.assertEqual(num_codes, len(expected_ids))
+        self.assertEqual(np.r_[codes1, codes2].tolist(), expected_codes.tolist())
+        for df, df_ids in zip([df1, df2], ids):
+            self.assertEqual(
+                pd.factorize(get_variant_hashes(df))[0].tolist(),
+                pd.factorize(np.array(df_ids))[0].tolist(),
+            )
+
+    def test_repeated_id_counts(self):
+        # a is in file 1 twice and b in file 2 three times, whose counts have no bits in common
+        df1 = pd.DataFrame({"ID": ["a", "a", "b"], "Score": [1.0, 1.0, 2.0]})
+        df2 = pd.DataFrame({"ID": ["a", "b", "b", "b"], "Score": [1.0, 2.0, 2.0, 2.0]})
+        for df in [df1, df2]:
+            df["line"] = range(2, len(df) + 2)
+        results = get_file_differences(df1, df2, ["Score"], contains_id=False)
+        self.assertEqual(results["num_common_variants"], 2)
+        self.assertEqual(len(results["unique_variants_file1"]), 0)
+        self.assertEqual(len(results["unique_variants_file2"]), 0)
+
     def test_columns_missing(self):
         with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
             content1 = f.read()
@@ -121,3 +258,164 @@ class TestRunCompareUnaggregatedTSV(unittest.TestCase):
         ) as expected_file:
             expected_output = expected_file.read().strip()
         self.assertEqual(sanitized_output.strip(), expected_output)
+
+    def test_streaming_identical_files(self):
+        with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
+            content = f.read()
+        self.input_file1.write(content.encode())
+        self.input_file2.write(content.encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+        with self.assertLogs(level="INFO") as log:
+            main(
+                self.input_file1.name,
+                self.input_file2.name,
+                self.output_file.name,
+                self.columns_to_compare,
+                chunksize=4,
+                num_buckets=3,
+            )
+
+        self.assertIn("INFO:root:The Unaggregated TSV files are identical.", log.output)
+
+    def test_streaming_arguments(self):
+        parser = define_parser()
+        arguments = ["--pvactools_release", "--streaming", "1", "2", "output"]
+        args = parser.parse_args(
+            arguments + ["--chunksize", "10", "--num_buckets", "2"]
+        )
+        self.assertEqual((args.chunksize, args.num_buckets), (10, 2))
+        for option in ["--chunksize", "--num_buckets", "--jobs"]:
+            for value in ["0", "-1", "a"]:
+                with self.assertRaises(SystemExit), contextlib.redirect_stderr(
+                    io.StringIO()
+                ):
+                    parser.parse_args(arguments + [option, value])
+
+    def test_streaming_different_files(self):
+        with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
+            content1 = f.read()
+        with open("tests/test_data/unaggregated_input2.tsv", "r") as f:
+            content2 = f.read()
+
+        self.input_file1.write(content1.encode())
+        self.input_file2.write(content2.encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+        main(
+            self.input_file1.name,
+            self.input_file2.name,
+            self.output_file.name,
+            self.columns_to_compare,
+            chunksize=4,
+            num_buckets=3,
+        )
+
+        self.output_file.seek(0)
+        output_content = self.output_file.read().decode()
+        sanitized_output = "\n".join(
+            [
+                line
+                for line in output_content.splitlines()
+                if not line.startswith("File 1:") and not line.startswith("File 2:")
+            ]
+        )
+        with open(
+            "tests/test_data/unaggregated_expected_output.tsv", "r"
+        ) as expected_file:
+            expected_output = expected_file.read().strip()
+        self.assertEqual(sanitized_output.strip(), expected_output)
+
+    def test_streaming_mixed_id_types(self):
+        # A Start that is not a number makes the column strings in file 2 only, its other variants still match file 1
+        with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
+            content = f.read()
+        lines = content.splitlines()
+        row = lines[-1].split("\t")
+        row[1] = "unknown"
+        self.input_file1.write(content.encode())
+        self.input_file2.write("\n".join(lines + ["\t".join(row)]).encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+        main(
+            self.input_file1.name,
+            self.input_file2.name,
+            self.output_file.name,
+            self.columns_to_compare,
+            chunksize=4,
+            num_buckets=3,
+        )
+
+        self.output_file.seek(0)
+        output_content = self.output_file.read().decode()
+        self.assertIn("Number of common variants: 18", output_content)
+        self.assertIn("Number of variants unique to file 1: 0", output_content)
+        self.assertIn("Number of variants unique to file 2: 1", output_content)
+
+    def write_input_files(self):
+        with open("tests/test_data/unaggregated_input1.tsv", "r") as f:
+            content1 = f.read()
+        with open("tests/test_data/unaggregated_input2.tsv", "r") as f:
+            content2 = f.read()
+
+        self.input_file1.write(content1.encode())
+        self.input_file2.write(content2.encode())
+        self.input_file1.close()
+        self.input_file2.close()
+
+    def check_output(self, load_options):
+        self.output_file.seek(0)
+        self.output_file.truncate()
+        main(
+            self.input_file1.name,
+            self.input_file2.name,
+            self.output_file.name,
+            self.columns_to_compare,
+            load_options=load_options,
+        )
+
+        self.output_file.seek(0)
+        output_content = self.output_file.read().decode()
+        sanitized_output = "\n".join(
+            [
+                line
+                for line in output_content.splitlines()
+                if not line.startswith("File 1:") and not line.startswith("File 2:")
+            ]
+        )
+        with open(
+            "tests/test_data/unaggregated_expected_output.tsv", "r"
+        ) as expected_file:
+            expected_output = expected_file.read().strip()
+        self.assertEqual(sanitized_output.strip(), expected_output)
+
+    @unittest.skipUnless(
+        importlib.util.find_spec("pyarrow"), "pyarrow is not installed"
+    )
+    def test_pyarrow_engine(self):
+        self.write_input_files()
+        self.check_output({"engine": "pyarrow"})
+
+    @unittest.skipUnless(
+        importlib.util.find_spec("polars") and importlib.util.find_spec("pyarrow"),
+        "polars is not installed",
+    )
+    def test_polars_engine(self):
+        self.write_input_files()
+        self.check_output({"engine": "polars"})
+
+    def test_cached_files(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        cache = ParsedFileCache(cache_dir)
+
+        self.write_input_files()
+        self.check_output({"cache": cache})
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        with mock.patch("run_utils.load_tsv_file") as load_tsv_file:
+            self.check_output({"cache": cache})
+        load_tsv_file.assert_not_called()
@@ -1,6 +1,7 @@
 import unittest
 import os
 import tempfile
+from comparisons.compare_yml import CompareYML
 from runners.run_compare_yml import main
 
 
@@ -59,3 +60,56 @@ class TestRunCompareYML(unittest.TestCase):
             expected_output = expected_file.read().strip()
 
         self.assertEqual(sanitized_output.strip(), expected_output)
+
+    def get_differences(self, content1, content2):
+        self.input_file1.write(content1.encode())
+        self.input_file2.write(content2.encode())
+        self.input_file1.close()
+        self.input_file2.close()
+        return CompareYML(
+            self.input_file1.name, self.input_file2.name, self.output_file.name
+        ).differences
+
+    def test_lists_compared_as_sets(self):
+        differences = self.get_differences(
+            "epitope_lengths: [8, 9, 10]\nalgorithms: [a, b]\n",
+            "epitope_lengths: [10, 9, 8, 8]\nalgorithms: [a, c]\n",
+        )
+        self.assertEqual(
+            differences,
+            {
+                "iterable_item_added": [("algorithms", None, "c")],
+                "iterable_item_removed": [("algorithms", "b", None)],
+            },
+        )
+
+    def test_type_changes(self):
+        differences = self.get_differences(
+            "threshold: 500\nvaf: 0.25\nfile: null\n",
+            "threshold: 500.0\nvaf: 0.25\nfile: input.vcf\n",
+        )
+        self.assertEqual(
+            differences,
+            {
+                "type_changes": [
+                    ("threshold", 500, 500.0),
+                    ("file", None, "input.vcf"),
+                ]
+            },
+        )
+        comparer = CompareYML(
+            self.input_file1.name, self.input_file2.name, self.output_file.name
+        )
+        comparer.interpret_diff()
+        with open(self.output_file.name) as f:
+            self.assertIn(
+                "=== Types Changed ===\n\tthreshold: <class 'int'> -> <class 'float'>",
+                f.read(),
+            )
+
+    def test_nested_fields(self):
+        differences = self.get_differences(
+            "run:\n  threads: 4\n  methods: [a]\nname: sample\n",
+            "run:\n  threads: 8\n  methods: [a]\nname: sample\n",
+        )
+        self.assertEqual(differences, {"values_changed": [("run", 4, 8)]})
@@ -0,0 +1,179 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import pandas as pd
+from compare_tools import run_comparisons
+from compare_tools import comparison_router
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_comparison_router.py
+# python -m unittest discover -s tests
+class TestComparisonRouter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.results_folder1 = os.path.join(self.temp_dir, "results1")
+        self.results_folder2 = os.path.join(self.temp_dir, "results2")
+        self.prefixes = ["MHC_Class_I", "MHC_Class_II"]
+        for number, results_folder in enumerate(
+            [self.results_folder1, self.results_folder2], start=1
+        ):
+            for prefix in self.prefixes:
+                os.makedirs(os.path.join(results_folder, prefix, "log"))
+                files = {
+                    f"yml_input{number}.yml": "log/inputs.yml",
+                    f"json_input{number}.json": "sample.all_epitopes.aggregated.metrics.json",
+                    f"aggregated_input{number}.tsv": "sample.all_epitopes.aggregated.tsv",
+                    f"unaggregated_input{number}.tsv": "sample.all_epitopes.tsv",
+                    f"reference_matches_input{number}.tsv": "sample.all_epitopes.aggregated.tsv.reference_matches",
+                }
+                for source, destination in files.items():
+                    shutil.copy(
+                        os.path.join("tests/test_data", source),
+                        os.path.join(results_folder, prefix, destination),
+                    )
+        self.aggregated_columns = ["Best Peptide", "Best Transcript", "Tier"]
+        self.unaggregated_columns = ["Biotype", "Median MT IC50 Score"]
+        self.reference_match_columns = ["Peptide", "Match Window"]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_reports(self, name, jobs, structured_format=None, comparisons=None):
+        output_file = os.path.join(self.temp_dir, name)
+        run_comparisons(
+            self.prefixes,
+            self.results_folder1,
+            self.results_folder2,
+            output_file,
+            self.aggregated_columns,
+            self.unaggregated_columns,
+            self.reference_match_columns,
+            jobs=jobs,
+            structured_format=structured_format,
+            comparisons=comparisons,
+        )
+        reports = []
+        for prefix in self.prefixes:
+            with open(f"{output_file}_{prefix}.tsv", "r") as f:
+                # Skip the report generation date and time
+                reports.append(f.read().split("\n", 1)[1])
+        return reports
+
+    def test_parallel_matches_serial(self):
+        serial_reports = self.run_reports("serial", jobs=1)
+        parallel_reports = self.run_reports("parallel", jobs=3)
+
+        self.assertEqual(serial_reports, parallel_reports)
+        for report in serial_reports:
+            self.assertIn("INPUT YML COMPARISON", report)
+            self.assertIn("REFERENCE MATCHES TSV COMPARISON", report)
+
+    def test_identical_files_are_not_parsed(self):
+        shutil.rmtree(self.results_folder2)
+        shutil.copytree(self.results_folder1, self.results_folder2)
+        runners = [
+            "run_compare_yml",
+            "run_compare_json",
+            "run_compare_aggregated_tsv",
+            "run_compare_unaggregated_tsv",
+            "run_compare_reference_matches_tsv",
+        ]
+        patches = [
+            mock.patch(f"compare_tools.comparison_router.{runner}")
+            for runner in runners
+        ]
+        mocks = [patch.start() for patch in patches]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+        with self.assertLogs(level="INFO") as log:
+            reports = self.run_reports("identical", jobs=1)
+
+        for runner_mock in mocks:
+            runner_mock.assert_not_called()
+        expected_logs = [
+            "INFO:root:The YAML input files are identical.",
+            "INFO:root:The JSON metric inputs are identical.",
+            "INFO:root:The Aggregated TSV files are identical.",
+            "INFO:root:The Unaggregated TSV files are identical.",
+            "INFO:root:The Reference Matches TSV files are identical.",
+        ]
+        for expected_log in expected_logs:
+            self.assertEqual(log.output.count(expected_log), len(self.prefixes))
+        for report in reports:
+            self.assertNotIn("COMPARISON", report)
+
+    def test_structured_output(self):
+        reports = self.run_reports("structured", jobs=1, structured_format="jsonl")
+
+        for prefix, report in zip(self.prefixes, reports):
+            output_prefix = os.path.join(self.temp_dir, f"structured_{prefix}")
+            summary = pd.read_json(
+                f"{output_prefix}.unaggregated_tsv.summary.jsonl", lines=True
+            )
+            differences = pd.read_json(
+                f"{output_prefix}.unaggregated_tsv.differences.jsonl", lines=True
+            )
+            self.assertIn(
+                f"Number of common variants: {summary['num_common_variants'][0]}",
+                report,
+            )
+            self.assertEqual(summary["num_differences"][0], len(differences))
+            for col, num_differences in differences["column"].value_counts().items():
+                self.assertIn(
+                    f"Number of differences in {col}: {num_differences}", report
+                )
+            self.assertFalse(summary["identical"][0])
+            for comparison in ["input_yml", "metrics_json", "reference_match_tsv"]:
+                self.assertTrue(
+                    os.path.exists(f"{output_prefix}.{comparison}.differences.jsonl")
+                )
+
+    def test_identical_structured_output(self):
+        shutil.rmtree(self.results_folder2)
+        shutil.copytree(self.results_folder1, self.results_folder2)
+        self.run_reports("identical", jobs=1, structured_format="jsonl")
+
+        for prefix in self.prefixes:
+            output_prefix = os.path.join(self.temp_dir, f"identical_{prefix}")
+            for comparison in [
+                "input_yml",
+                "metrics_json",
+                "aggregated_tsv",
+                "unaggregated_tsv",
+                "reference_match_tsv",
+            ]:
+                summary = pd.read_json(
+                    f"{output_prefix}.{comparison}.summary.jsonl", lines=True
+                )
+                self.assertTrue(summary["identical"][0])
+                self.assertEqual(summary["num_differences"][0], 0)
+                self.assertFalse(
+                    os.path.exists(f"{output_prefix}.{comparison}.differences.jsonl")
+                )
+
+    def test_selected_comparisons(self):
+        with mock.patch(
+            "compare_tools.comparison_router.find_file",
+            wraps=comparison_router.find_file,
+        ) as find_file:
+            reports = self.run_reports(
+                "selected", jobs=1, comparisons=["reference_matches", "aggregated"]
+            )
+
+        located_patterns = {call.args[2] for call in find_file.call_args_list}
+        self.assertEqual(
+            located_patterns, {"*all_epitopes.aggregated.tsv", "*.reference_matches"}
+        )
+        for report in reports:
+            self.assertIn("Comparisons: aggregated, reference_matches\n", report)
+            self.assertIn("Aggregated Columns:", report)
+            self.assertNotIn("Unaggregated Columns:", report)
+            self.assertIn("AGGREGATED TSV COMPARISON", report)
+            self.assertIn("REFERENCE MATCHES TSV COMPARISON", report)
+            self.assertNotIn("INPUT YML COMPARISON", report)
+            self.assertNotIn("METRICS JSON COMPARISON", report)
+            self.assertNotIn("UNAGGREGATED TSV COMPARISON", report)
@@ -0,0 +1,138 @@
+import unittest
+import os
+import shutil
+import tempfile
+import importlib.util
+from unittest import mock
+import run_utils
+from arrow_files import get_arrow_path
+from comparisons import CompareUnaggregatedTSV
+from convert import convert_results_folders
+from run_utils import load_prepared_tsv_file
+from runners.run_compare_aggregated_tsv import main as compare_aggregated
+from runners.run_compare_reference_matches_tsv import main as compare_reference_matches
+from runners.run_compare_unaggregated_tsv import main as compare_unaggregated
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_convert.py
+# python -m unittest discover -s tests
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestConvert(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_file = os.path.join(self.temp_dir, "output.tsv")
+        self.results_folders = []
+        for number in [1, 2]:
+            results_folder = os.path.join(self.temp_dir, f"results{number}")
+            os.makedirs(os.path.join(results_folder, "MHC_Class_I"))
+            files = {
+                f"aggregated_input{number}.tsv": "sample.all_epitopes.aggregated.tsv",
+                f"unaggregated_input{number}.tsv": "sample.all_epitopes.tsv",
+                f"reference_matches_input{number}.tsv": "sample.all_epitopes.aggregated.tsv.reference_matches",
+            }
+            for source, destination in files.items():
+                shutil.copy(
+                    os.path.join("tests/test_data", source),
+                    os.path.join(results_folder, "MHC_Class_I", destination),
+                )
+            self.results_folders.append(results_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def get_files(self, name):
+        return [
+            os.path.join(results_folder, "MHC_Class_I", name)
+            for results_folder in self.results_folders
+        ]
+
+    def read_report(self):
+        with open(self.output_file) as f:
+            lines = f.read().splitlines()
+        os.remove(self.output_file)
+        return "\n".join(
+            line
+            for line in lines
+            if not line.startswith("File 1:") and not line.startswith("File 2:")
+        ).strip()
+
+    def test_convert_results_folders(self):
+        self.assertEqual(len(convert_results_folders(self.results_folders)), 6)
+        for input_file in self.get_files("sample.all_epitopes.tsv"):
+            self.assertTrue(os.path.exists(get_arrow_path(input_file)))
+
+        # Up to date files are only converted again when forced
+        self.assertEqual(convert_results_folders(self.results_folders), [])
+        self.assertEqual(
+            len(
+                convert_results_folders(
+                    self.results_folders, ["aggregated"], force=True
+                )
+            ),
+            2,
+        )
+
+    def test_converted_reports(self):
+        convert_results_folders(self.results_folders)
+        comparisons = [
+            (
+                compare_aggregated,
+                "sample.all_epitopes.aggregated.tsv",
+                ["Best Peptide", "Best Transcript", "Tier"],
+            ),
+            (
+                compare_unaggregated,
+                "sample.all_epitopes.tsv",
+                ["Biotype", "Median MT IC50 Score", "Tumor DNA VAF"],
+            ),
+            (
+                compare_reference_matches,
+                "sample.all_epitopes.aggregated.tsv.reference_matches",
+                ["Peptide", "Match Window"],
+            ),
+        ]
+        for runner, name, columns in comparisons:
+            # The converted files give the same report as parsing the tsv files
+            runner(*self.get_files(name), self.output_file, columns)
+            parsed_report = self.read_report()
+            with mock.patch("run_utils.load_tsv_file") as load_tsv_file:
+                runner(*self.get_files(name), self.output_file, columns)
+            load_tsv_file.assert_not_called()
+            self.assertEqual(self.read_report(), parsed_report)
+            self.assertIn("DIFFERENCES IN", parsed_report)
+
+    def test_converted_columns(self):
+        input_file = self.get_files("sample.all_epitopes.tsv")[0]
+        id_columns = CompareUnaggregatedTSV.id_columns
+        required_columns = id_columns + ["Biotype", "Median MT IC50 Score"]
+        parsed = load_prepared_tsv_file(
+            input_file, 1, list(required_columns), id_columns, float32_scores=True
+        )
+        convert_results_folders(self.results_folders[:1], ["unaggregated"])
+        with mock.patch("run_utils.load_tsv_file") as load_tsv_file:
+            converted = load_prepared_tsv_file(
+                input_file, 1, list(required_columns), id_columns, float32_scores=True
+            )
+        load_tsv_file.assert_not_called()
+        self.assertEqual(list(converted.columns), list(parsed.columns))
+        self.assertEqual(list(converted.dtypes), list(parsed.dtypes))
+        self.assertTrue(converted.equals(parsed))
+
+    def test_out_of_date_file(self):
+        convert_results_folders(self.results_folders[:1], ["unaggregated"])
+        input_file = self.get_files("sample.all_epitopes.tsv")[0]
+        id_columns = CompareUnaggregatedTSV.id_columns
+        stat = os.stat(input_file)
+        os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        # A tsv file modified after its conversion is parsed again
+        with mock.patch(
+            "run_utils.load_tsv_file", wraps=run_utils.load_tsv_file
+        ) as load_tsv_file, self.assertLogs(level="INFO") as log:
+            load_prepared_tsv_file(input_file, 1, id_columns + ["Biotype"], id_columns)
+        load_tsv_file.assert_called_once()
+        self.assertIn(
+            f"INFO:root:\u2022 The converted file of {input_file} is out of date, parsing it instead",
+            log.output,
+        )
@@ -0,0 +1,58 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import parse_cache
+from parse_cache import MemoryFileCache, ParsedFileCache
+from run_utils import align_categories
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_parse_cache.py
+# python -m unittest discover -s tests
+class TestParsedFileCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ParsedFileCache(self.cache_dir, max_size=2500)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for key in ["a", "b"]:
+            self.cache.store(key, b"x" * 1000)
+            os.utime(self.cache.get_path(key), ns=(0, 0))
+        self.assertIsNotNone(self.cache.load("a"))
+        self.cache.store("c", b"x" * 1000)
+
+        self.assertIsNotNone(self.cache.load("a"))
+        self.assertIsNone(self.cache.load("b"))
+        self.assertIsNotNone(self.cache.load("c"))
+
+    def test_memory_entries_are_shared(self):
+        input_file = os.path.join(self.cache_dir, "baseline.tsv")
+        with open(input_file, "w") as f:
+            f.write("ID\tScore\n")
+        self.addCleanup(parse_cache.memory_cache_entries.clear)
+        cache = MemoryFileCache(self.cache_dir)
+        key = cache.get_key(input_file)
+        df = pd.DataFrame(
+            {"ID": ["a", "b"], "Score": [1.0, 2.0], "Tier": ["Pass", "Poor"]}
+        ).astype({"Tier": "category"})
+        cache.store(key, (df, {"Old": "Score"}))
+
+        loaded, renames = cache.load(key)
+        self.assertEqual(renames, {"Old": "Score"})
+        self.assertTrue(
+            np.shares_memory(loaded["Score"].to_numpy(), df["Score"].to_numpy())
+        )
+
+        # Replacing and dropping whole columns of a loaded dataframe leaves the entry unchanged
+        other = pd.DataFrame({"Tier": ["Fail"]}).astype({"Tier": "category"})
+        align_categories(loaded, other)
+        loaded.drop(columns=["ID"], inplace=True)
+        reloaded, _ = cache.load(key)
+        self.assertTrue(reloaded.equals(df))
+        self.assertEqual(list(reloaded["Tier"].cat.categories), ["Pass", "Poor"])
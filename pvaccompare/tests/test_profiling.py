@@ -0,0 +1,139 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from compare_tools import run_comparisons
+from profiling import (
+    format_stage_table,
+    is_profiling,
+    record_stages,
+    report_stages,
+    stage,
+)
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_profiling.py
+# python -m unittest discover -s tests
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.results_folders = [
+            os.path.join(self.temp_dir, "results1"),
+            os.path.join(self.temp_dir, "results2"),
+        ]
+        for number, results_folder in enumerate(self.results_folders, start=1):
+            os.makedirs(os.path.join(results_folder, "MHC_Class_I", "log"))
+            files = {
+                f"yml_input{number}.yml": "log/inputs.yml",
+                f"aggregated_input{number}.tsv": "sample.all_epitopes.aggregated.tsv",
+                f"unaggregated_input{number}.tsv": "sample.all_epitopes.tsv",
+            }
+            for source, destination in files.items():
+                shutil.copy(
+                    os.path.join("tests/test_data", source),
+                    os.path.join(results_folder, "MHC_Class_I", destination),
+                )
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_profiled_comparisons(self, jobs):
+        with record_stages() as stages:
+            run_comparisons(
+                ["MHC_Class_I"],
+                *self.results_folders,
+                os.path.join(self.temp_dir, f"output_{jobs}"),
+                ["Best Peptide", "Best Transcript", "Tier"],
+                ["Biotype", "Median MT IC50 Score"],
+                ["Peptide", "Match Window"],
+                jobs=jobs,
+            )
+        return stages
+
+    def test_disabled(self):
+        self.assertFalse(is_profiling())
+        with stage("load_tsv_files", 10) as record:
+            pass
+        self.assertEqual(record, {})
+
+        with record_stages(False) as stages:
+            self.assertFalse(is_profiling())
+            with stage("load_tsv_files", 10):
+                pass
+        self.assertEqual(stages, [])
+
+    def test_nested_stages(self):
+        with record_stages() as stages:
+            self.assertTrue(is_profiling())
+            with stage("comparison"):
+                with stage("load_tsv_files") as record:
+                    record["rows"] = 10
+                with stage("get_file_differences", 10):
+                    pass
+        self.assertFalse(is_profiling())
+
+        self.assertEqual(
+            [(record["stage"], record["parent"], record["depth"]) for record in stages],
+            [
+                ("comparison", None, 0),
+                ("load_tsv_files", "comparison", 1),
+                ("get_file_differences", "comparison", 1),
+            ],
+        )
+        self.assertEqual([record["rows"] for record in stages], [None, 10, 10])
+        for record in stages:
+            self.assertGreaterEqual(record["wall_seconds"], 0)
+            self.assertGreaterEqual(record["cpu_seconds"], 0)
+            self.assertGreater(record["peak_rss_mb"], 0)
+            self.assertGreaterEqual(record["peak_rss_growth_mb"], 0)
+
+        table = format_stage_table(stages).split("\n")
+        self.assertEqual(len(table), 4)
+        self.assertTrue(table[0].startswith("Stage"))
+        self.assertTrue(table[2].startswith("  load_tsv_files"))
+        self.assertTrue(table[2].endswith(" 10"))
+
+    def test_report_stages_json(self):
+        with record_stages() as stages:
+            with stage("load_tsv_files", 10):
+                pass
+        json_path = os.path.join(self.temp_dir, "profile.json")
+        report_stages(stages, json_path=json_path)
+        with open(json_path) as f:
+            self.assertEqual(json.load(f), {"stages": stages})
+
+    def test_comparison_stages(self):
+        stages = self.run_profiled_comparisons(1)
+        top_stages = [record["stage"] for record in stages if record["depth"] == 0]
+        self.assertEqual(
+            top_stages,
+            [
+                "MHC_Class_I input YML",
+                "MHC_Class_I aggregated TSV",
+                "MHC_Class_I unaggregated TSV",
+            ],
+        )
+        stage_names = {record["stage"] for record in stages}
+        for name in [
+            "check_identical_files",
+            "load_tsv_files",
+            "load_tsv_file",
+            "create_id_parts",
+            "check_identical_dataframes",
+            "get_file_differences",
+            "write_report",
+        ]:
+            self.assertIn(name, stage_names)
+        load_stages = [
+            record for record in stages if record["stage"] == "load_tsv_file"
+        ]
+        self.assertTrue(all(record["rows"] > 0 for record in load_stages))
+
+    def test_parallel_comparison_stages(self):
+        # The stages recorded in the worker processes are passed back in report order
+        self.assertEqual(
+            [record["stage"] for record in self.run_profiled_comparisons(2)],
+            [record["stage"] for record in self.run_profiled_comparisons(1)],
+        )
@@ -0,0 +1,110 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import run_utils
+from compare_tools import run_comparisons
+from run_batch import run_batch
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_run_batch.py
+# python -m unittest discover -s tests
+class TestRunBatch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.baseline_folder = os.path.join(self.temp_dir, "baseline")
+        self.candidate_folders = [
+            os.path.join(self.temp_dir, "candidate1"),
+            os.path.join(self.temp_dir, "candidate2"),
+        ]
+        self.prefixes = ["MHC_Class_I"]
+        folders = {
+            self.baseline_folder: 1,
+            self.candidate_folders[0]: 2,
+            self.candidate_folders[1]: 2,
+        }
+        for results_folder, number in folders.items():
+            for prefix in self.prefixes:
+                os.makedirs(os.path.join(results_folder, prefix, "log"))
+                files = {
+                    f"yml_input{number}.yml": "log/inputs.yml",
+                    f"json_input{number}.json": "sample.all_epitopes.aggregated.metrics.json",
+                    f"aggregated_input{number}.tsv": "sample.all_epitopes.aggregated.tsv",
+                    f"unaggregated_input{number}.tsv": "sample.all_epitopes.tsv",
+                    f"reference_matches_input{number}.tsv": "sample.all_epitopes.aggregated.tsv.reference_matches",
+                }
+                for source, destination in files.items():
+                    shutil.copy(
+                        os.path.join("tests/test_data", source),
+                        os.path.join(results_folder, prefix, destination),
+                    )
+        self.aggregated_columns = ["Best Peptide", "Best Transcript", "Tier"]
+        self.unaggregated_columns = ["Biotype", "Median MT IC50 Score"]
+        self.reference_match_columns = ["Peptide", "Match Window"]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_report(self, output_file, prefix):
+        with open(f"{output_file}_{prefix}.tsv", "r") as f:
+            # Skip the report generation date and time
+            return f.read().split("\n", 1)[1]
+
+    def test_baseline_is_loaded_once(self):
+        output_dir = os.path.join(self.temp_dir, "batch")
+        with mock.patch(
+            "run_utils.load_tsv_file", wraps=run_utils.load_tsv_file
+        ) as load_tsv_file:
+            output_files = run_batch(
+                self.prefixes,
+                self.baseline_folder,
+                self.candidate_folders,
+                output_dir,
+                self.aggregated_columns,
+                self.unaggregated_columns,
+                self.reference_match_columns,
+            )
+
+        loaded_files = [call.args[0] for call in load_tsv_file.call_args_list]
+        baseline_files = [
+            path for path in loaded_files if path.startswith(self.baseline_folder)
+        ]
+        self.assertEqual(len(baseline_files), 3)
+        self.assertEqual(len(set(baseline_files)), 3)
+        self.assertEqual(len(loaded_files), 3 + 3 * len(self.candidate_folders))
+
+        self.check_reports(output_files)
+
+    def test_parallel_candidates(self):
+        output_files = run_batch(
+            self.prefixes,
+            self.baseline_folder,
+            self.candidate_folders,
+            os.path.join(self.temp_dir, "parallel"),
+            self.aggregated_columns,
+            self.unaggregated_columns,
+            self.reference_match_columns,
+            jobs=2,
+        )
+
+        self.check_reports(output_files)
+
+    def check_reports(self, output_files):
+        for candidate_folder, output_file in zip(self.candidate_folders, output_files):
+            expected_output_file = os.path.join(self.temp_dir, "expected")
+            run_comparisons(
+                self.prefixes,
+                self.baseline_folder,
+                candidate_folder,
+                expected_output_file,
+                self.aggregated_columns,
+                self.unaggregated_columns,
+                self.reference_match_columns,
+            )
+            for prefix in self.prefixes:
+                self.assertEqual(
+                    self.read_report(output_file, prefix),
+                    self.read_report(expected_output_file, prefix),
+                )
@@ -0,0 +1,105 @@
+import unittest
+import importlib.util
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from report_writer import to_report_strings
+from run_utils import (
+    NA_VALUES,
+    get_column_dtypes,
+    get_required_columns,
+    load_tsv_file,
+    read_tsv,
+)
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_run_utils.py
+# python -m unittest discover -s tests
+class TestRunUtils(unittest.TestCase):
+    def setUp(self):
+        self.input_file = tempfile.NamedTemporaryFile(delete=False, suffix=".tsv")
+        self.input_file.close()
+        self.required_columns = [
+            "Chromosome",
+            "Start",
+            "Best Peptide",
+            "Median MT IC50 Score",
+        ]
+
+    def tearDown(self):
+        os.remove(self.input_file.name)
+
+    def write_tsv_file(self, starts=("100", "200")):
+        with open(self.input_file.name, "w") as f:
+            f.write("Chromosome\tStart\tbest_peptide\tMedian MT IC50 Score\tUnused\n")
+            for start, score in zip(starts, ["0.1", "1234.5678"]):
+                f.write(f"chr1\t{start}\tAAA\t{score}\tx\n")
+
+    def test_required_columns(self):
+        self.write_tsv_file()
+        usecols, renames = get_required_columns(
+            self.input_file.name, self.required_columns
+        )
+        self.assertEqual(
+            usecols, ["Chromosome", "Start", "best_peptide", "Median MT IC50 Score"]
+        )
+        self.assertEqual(renames, {"best_peptide": "Best Peptide"})
+
+        # Only the required columns are parsed, with the dtypes of known columns pinned
+        df = load_tsv_file(self.input_file.name, self.required_columns)
+        self.assertEqual(list(df.columns), usecols)
+        self.assertIsInstance(df["Chromosome"].dtype, pd.CategoricalDtype)
+        self.assertEqual(df["Start"].dtype, np.int32)
+        self.assertEqual(df["Median MT IC50 Score"].dtype, np.float64)
+
+    def test_float32_scores(self):
+        self.write_tsv_file()
+        self.assertEqual(
+            get_column_dtypes(["Median MT IC50 Score", "Start"], {}, True),
+            {"Median MT IC50 Score": "float32", "Start": "int32"},
+        )
+        df = load_tsv_file(
+            self.input_file.name, self.required_columns, float32_scores=True
+        )
+        scores = df["Median MT IC50 Score"]
+        self.assertEqual(scores.dtype, np.float32)
+
+        # The report formats the float32 values the way Python formats them as 64-bit floats
+        self.assertEqual(
+            to_report_strings(scores).tolist(),
+            [str(float(np.float32(value))) for value in [0.1, 1234.5678]],
+        )
+
+    def test_pinned_dtype_fallback(self):
+        for starts in [("100", "NA"), ("100", "200.5")]:
+            with self.subTest(starts=starts):
+                self.write_tsv_file(starts)
+                with self.assertLogs(level="DEBUG") as log:
+                    df = load_tsv_file(self.input_file.name, self.required_columns)
+                self.assertIn("Could not apply pinned dtypes", log.output[0])
+                # The Start column is inferred instead, the other columns are still loaded
+                self.assertEqual(df["Start"].dtype, np.float64)
+                self.assertEqual(df["best_peptide"].tolist(), ["AAA", "AAA"])
+                if starts[1] == "NA":
+                    self.assertTrue(np.isnan(df["Start"][1]))
+
+    def test_missing_values(self):
+        with open(self.input_file.name, "w") as f:
+            f.write("Value\tScore\tFlag\n")
+            for value in NA_VALUES:
+                f.write(f"{value}\t{value}\tTrue\n")
+            f.write("nil\t1.5\t\n")
+
+        # The tokens are the ones pandas parses as missing by default
+        df = pd.read_csv(self.input_file.name, sep="\t")
+        self.assertEqual(df["Value"].isna().tolist(), [True] * len(NA_VALUES) + [False])
+
+        for engine in ["pyarrow", "polars"]:
+            with self.subTest(engine=engine):
+                if not all(map(importlib.util.find_spec, [engine, "pyarrow"])):
+                    self.skipTest(f"{engine} is not installed")
+                pd.testing.assert_frame_equal(
+                    read_tsv(self.input_file.name, engine=engine), df
+                )
@@ -0,0 +1,129 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+import pandas as pd
+from parse_cache import ParsedFileCache
+from run_utils import get_id_hashes, get_variant_hashes
+from snapshot import create_snapshot, get_changed_rows
+from runners.run_compare_aggregated_tsv import main as compare_aggregated
+from runners.run_compare_unaggregated_tsv import main as compare_unaggregated
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_snapshot.py
+# python -m unittest discover -s tests
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.snapshot_store = ParsedFileCache(os.path.join(self.temp_dir, "snapshots"))
+        self.output_file = os.path.join(self.temp_dir, "output.tsv")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_report(self):
+        with open(self.output_file) as f:
+            lines = f.read().splitlines()
+        os.remove(self.output_file)
+        return "\n".join(
+            line
+            for line in lines
+            if not line.startswith("File 1:") and not line.startswith("File 2:")
+        ).strip()
+
+    def check_incremental_reports(
+        self, runner, input_file1, input_file2, expected_output, columns
+    ):
+        # The first run stores the snapshot of file 1 and the second run compares against it
+        for run in range(2):
+            with mock.patch(
+                "snapshot.create_snapshot", wraps=create_snapshot
+            ) as create:
+                runner(
+                    input_file1,
+                    input_file2,
+                    self.output_file,
+                    columns,
+                    snapshot_store=self.snapshot_store,
+                )
+            self.assertEqual(create.call_count, 1 if run == 0 else 0)
+            with open(expected_output) as f:
+                self.assertEqual(self.read_report(), f.read().strip())
+
+    def test_id_hashes(self):
+        df1 = pd.DataFrame({"ID": ["a", "b", "a"], "Score": [1.0, 2.0, 3.0]})
+        df2 = pd.DataFrame({"ID": ["b", "a", "a"], "Score": [2, 3, 1]})
+        ids1, hashes1, codes1 = get_id_hashes(df1, ["Score"])
+        ids2, hashes2, _ = get_id_hashes(df2, ["Score"])
+        self.assertEqual(ids1.tolist(), get_variant_hashes(df1)[:2].tolist())
+        self.assertEqual(codes1.tolist(), [0, 1, 0])
+        # The rows of a repeated ID hash the same in any order
+        self.assertEqual(dict(zip(ids1, hashes1)), dict(zip(ids2, hashes2)))
+
+    def test_changed_rows(self):
+        df1 = pd.DataFrame(
+            {"ID": ["a", "b", "c", "d", "d"], "Score": [1.0, 2.0, 3.0, 4.0, 5.0]}
+        )
+        df2 = pd.DataFrame(
+            {"ID": ["e", "d", "c", "a", "d"], "Score": [6.0, 5.0, 3.5, 1.0, 4.0]}
+        )
+        snapshot = create_snapshot("aggregated_tsv", df1, ["Score"])
+        rows1, rows2, num_unchanged = get_changed_rows(snapshot, df1, df2, ["Score"])
+        # a and d are unchanged, c changed, b was removed and e was added
+        self.assertEqual(rows1.tolist(), [1, 2])
+        self.assertEqual(rows2.tolist(), [0, 2])
+        self.assertEqual(num_unchanged, 2)
+
+    def test_aggregated_snapshot(self):
+        columns = [
+            "Num Passing Transcripts",
+            "Best Peptide",
+            "Best Transcript",
+            "Num Passing Peptides",
+            "Tier",
+        ]
+        self.check_incremental_reports(
+            compare_aggregated,
+            "tests/test_data/aggregated_input1.tsv",
+            "tests/test_data/aggregated_input2.tsv",
+            "tests/test_data/aggregated_expected_output.tsv",
+            columns,
+        )
+
+    def test_unaggregated_snapshot(self):
+        columns = [
+            "Biotype",
+            "Median MT IC50 Score",
+            "Median WT IC50 Score",
+            "Median MT Percentile",
+            "Median WT Percentile",
+            "WT Epitope Seq",
+            "Tumor DNA VAF",
+            "Tumor RNA Depth",
+            "Tumor RNA VAF",
+            "Gene Expression",
+        ]
+        self.check_incremental_reports(
+            compare_unaggregated,
+            "tests/test_data/unaggregated_input1.tsv",
+            "tests/test_data/unaggregated_input2.tsv",
+            "tests/test_data/unaggregated_expected_output.tsv",
+            columns,
+        )
+
+    def test_identical_to_snapshot(self):
+        input_file = "tests/test_data/aggregated_input1.tsv"
+        for _ in range(2):
+            with self.assertLogs(level="INFO") as log:
+                compare_aggregated(
+                    input_file,
+                    input_file,
+                    self.output_file,
+                    ["Best Peptide", "Tier"],
+                    snapshot_store=self.snapshot_store,
+                )
+            self.assertIn(
+                "INFO:root:The Aggregated TSV files are identical.", log.output
+            )
@@ -0,0 +1,98 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Targets for the time spent importing the tool and running each command, excluding interpreter startup. Wall clock
+# times vary too much on shared machines, so the targets are only checked when PVACCOMPARE_CHECK_STARTUP_TIME is set
+# and otherwise a bound of LOOSE_TIME_FACTOR times the target is always checked, which still catches an eager import
+# of the heavy dependencies
+CHECK_STARTUP_TIME = bool(os.environ.get("PVACCOMPARE_CHECK_STARTUP_TIME"))
+HELP_TIME_TARGET = 0.5
+YML_COMPARISON_TIME_TARGET = 1.5
+LOOSE_TIME_FACTOR = 4
+
+# Reports the time taken by the command and the heavy dependencies it imported
+MEASURE_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+{command}
+elapsed = time.perf_counter() - start
+heavy_modules = ["pandas", "numpy", "yaml", "deepdiff", "pyarrow", "polars"]
+print(json.dumps({{
+    "elapsed": elapsed,
+    "imported": [module for module in heavy_modules if module in sys.modules],
+}}))
+"""
+
+HELP_COMMAND = """
+import contextlib, io
+sys.argv = ["run.py", "-h"]
+import run
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        run.main()
+    except SystemExit:
+        pass
+"""
+
+YML_COMPARISON_COMMAND = """
+import run
+from compare_tools.comparison_router import run_comparison_job, run_compare_yml
+run_comparison_job(
+    "input YML",
+    run_compare_yml,
+    "tests/test_data/yml_input1.yml",
+    "tests/test_data/yml_input2.yml",
+    {output_file!r},
+    (),
+)
+"""
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_startup.py
+# python -m unittest discover -s tests
+# PVACCOMPARE_CHECK_STARTUP_TIME=1 python -m unittest tests/test_startup.py
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        self.output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".tsv")
+
+    def tearDown(self):
+        os.remove(self.output_file.name)
+
+    def measure(self, command):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE_SCRIPT.format(command=command)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def assert_within_target(self, elapsed, target):
+        if CHECK_STARTUP_TIME:
+            self.assertLess(elapsed, target)
+        else:
+            self.assertLess(elapsed, target * LOOSE_TIME_FACTOR)
+
+    def test_help(self):
+        measurement = self.measure(HELP_COMMAND)
+
+        self.assertEqual(measurement["imported"], [])
+        self.assert_within_target(measurement["elapsed"], HELP_TIME_TARGET)
+
+    def test_yml_comparison(self):
+        measurement = self.measure(
+            YML_COMPARISON_COMMAND.format(output_file=self.output_file.name)
+        )
+
+        self.assertNotIn("pandas", measurement["imported"])
+        # The test inputs have no nested fields, so DeepDiff is not needed
+        self.assertNotIn("deepdiff", measurement["imported"])
+        self.assert_within_target(measurement["elapsed"], YML_COMPARISON_TIME_TARGET)
@@ -0,0 +1,143 @@
+import unittest
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from run_utils import get_difference_mask, get_file_differences
+from tolerances import (
+    ColumnTolerances,
+    get_column_tolerances,
+    load_tolerance_file,
+    parse_tolerance_argument,
+)
+
+
+# To run the tests navigate to pvaccompare/ and run the following:
+# python -m unittest tests/test_tolerances.py
+# python -m unittest discover -s tests
+class TestTolerances(unittest.TestCase):
+    def setUp(self):
+        self.tolerance_file = tempfile.NamedTemporaryFile(
+            "w", delete=False, suffix=".yml"
+        )
+
+    def tearDown(self):
+        os.remove(self.tolerance_file.name)
+
+    def write_tolerance_file(self, content):
+        self.tolerance_file.write(content)
+        self.tolerance_file.close()
+
+    def test_column_tolerances(self):
+        tolerances = ColumnTolerances(
+            {
+                "*": (1, 0),
+                "*IC50 Score": (50, 0.1),
+                "NetMHC*IC50 Score": (10, 0),
+                "Median MT IC50 Score": (0, 0),
+            }
+        )
+        self.assertEqual(tolerances.get("Median MT IC50 Score"), (0, 0))
+        self.assertEqual(tolerances.get("Median WT IC50 Score"), (50, 0.1))
+        self.assertEqual(tolerances.get("NetMHC MT IC50 Score"), (10, 0))
+        self.assertEqual(tolerances.get("Tumor DNA VAF"), (1, 0))
+        self.assertEqual(ColumnTolerances().get("Tumor DNA VAF"), (0.1, 0.0))
+
+    def test_parse_tolerance_argument(self):
+        self.assertEqual(
+            parse_tolerance_argument("*IC50 Score=50:0.1"), ("*IC50 Score", (50, 0.1))
+        )
+        self.assertEqual(
+            parse_tolerance_argument("Tumor DNA VAF=0.01"), ("Tumor DNA VAF", (0.01, 0))
+        )
+        for value in [
+            "Tumor DNA VAF",
+            "=1",
+            "Tumor DNA VAF=a",
+            "Tumor DNA VAF=-1",
+            "*IC50 Score=nan",
+            "*IC50 Score=inf",
+            "*IC50 Score=1:nan",
+            "*IC50 Score=1:-inf",
+        ]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_tolerance_argument(value)
+
+    def test_tolerance_file(self):
+        self.write_tolerance_file(
+            "'*IC50 Score': {absolute: 50, relative: 0.1}\n"
+            "'*Percentile': 0.05\n"
+            "Tumor RNA Depth: {relative: 0.5}\n"
+        )
+        self.assertEqual(
+            load_tolerance_file(self.tolerance_file.name),
+            {
+                "*IC50 Score": (50, 0.1),
+                "*Percentile": (0.05, 0),
+                "Tumor RNA Depth": (0.1, 0.5),
+            },
+        )
+
+        tolerances = get_column_tolerances(
+            self.tolerance_file.name, [("*Percentile", (1, 0))]
+        )
+        self.assertEqual(tolerances.get("Median MT Percentile"), (1, 0))
+        self.assertIsNone(get_column_tolerances())
+
+    def test_invalid_tolerance_file(self):
+        self.write_tolerance_file("'*IC50 Score': {absolute: 50, rtol: 0.1}\n")
+        with self.assertRaises(Exception) as context:
+            load_tolerance_file(self.tolerance_file.name)
+        self.assertIn("unknown keys ['rtol']", str(context.exception))
+
+        with open(self.tolerance_file.name, "w") as f:
+            f.write("'*IC50 Score': .nan\n")
+        with self.assertRaises(Exception) as context:
+            load_tolerance_file(self.tolerance_file.name)
+        self.assertIn("must be finite", str(context.exception))
+
+    def test_file_differences(self):
+        df1 = pd.DataFrame(
+            {
+                "ID": ["chr1-1-1-A-T", "chr1-2-2-A-T", "chr1-3-3-A-T", "chr1-4-4-A-T"],
+                "IC50": [1000.0, 20.0, 5.0, np.nan],
+                "VAF": [0.5, 0.5, 0.5, 0.5],
+                "line": [2, 3, 4, 5],
+            }
+        )
+        df2 = pd.DataFrame(
+            {
+                "ID": ["chr1-1-1-A-T", "chr1-2-2-A-T", "chr1-3-3-A-T", "chr1-4-4-A-T"],
+                "IC50": [1090.0, 30.0, 5.0, 1.0],
+                "VAF": [0.52, 0.5, 0.6, 0.5],
+                "line": [2, 3, 4, 5],
+            }
+        )
+
+        results = get_file_differences(df1, df2, ["IC50", "VAF"], sort=False)
+        self.assertEqual(
+            results["differences"]["IC50"]["ID"].tolist(),
+            ["chr1-1-1-A-T", "chr1-2-2-A-T", "chr1-4-4-A-T"],
+        )
+        self.assertNotIn("VAF", results["differences"])
+
+        # 90 is within 10% of 1090 but 10 is not within 10% of 30, the missing value always differs
+        tolerances = ColumnTolerances({"IC50": (0, 0.1), "VAF": (0.01, 0)})
+        results = get_file_differences(
+            df1, df2, ["IC50", "VAF"], tolerances=tolerances, sort=False
+        )
+        self.assertEqual(
+            results["differences"]["IC50"]["ID"].tolist(),
+            ["chr1-2-2-A-T", "chr1-4-4-A-T"],
+        )
+        self.assertEqual(
+            results["differences"]["VAF"]["ID"].tolist(),
+            ["chr1-1-1-A-T", "chr1-3-3-A-T"],
+        )
+
+        # The per-column mask used by the cohort comparison applies the same tolerances
+        self.assertEqual(
+            get_difference_mask(df1["IC50"], df2["IC50"], 0, 0.1).tolist(),
+            [False, True, False, True],
+        )
@@ -0,0 +1,130 @@
+import argparse
+import fnmatch
+import math
+
+# The tolerances of numeric columns that no configured pattern matches
+DEFAULT_ABSOLUTE_TOLERANCE = 0.1
+DEFAULT_RELATIVE_TOLERANCE = 0.0
+
+
+# Absolute and relative tolerances of the numeric columns, configured by column name or by a glob pattern such as
+# '*IC50 Score' for a whole family of predictor columns. Two values differ when their absolute difference is greater
+# than absolute + relative * the larger of their absolute values.
+class ColumnTolerances:
+    def __init__(self, tolerances=None):
+        self.tolerances = dict(tolerances or {})
+
+    def get(self, column):
+        """
+        Purpose:    Get the tolerances of a column, from its exact name if it is configured and otherwise from the
+                    longest pattern matching it
+        Modifies:   Nothing
+        Returns:    Tuple of the absolute and relative tolerance
+        """
+        if column in self.tolerances:
+            return self.tolerances[column]
+        matches = [
+            pattern
+            for pattern in self.tolerances
+            if fnmatch.fnmatchcase(column, pattern)
+        ]
+        if matches:
+            return self.tolerances[max(matches, key=len)]
+        return DEFAULT_ABSOLUTE_TOLERANCE, DEFAULT_RELATIVE_TOLERANCE
+
+    def describe(self):
+        """
+        Purpose:    Describe the configured tolerances for the report header
+        Modifies:   Nothing
+        Returns:    String of each pattern and its tolerances
+        """
+        return ", ".join(
+            f"{pattern} (absolute {absolute:g}, relative {relative:g})"
+            for pattern, (absolute, relative) in self.tolerances.items()
+        )
+
+
+def parse_tolerance_values(pattern, absolute, relative=DEFAULT_RELATIVE_TOLERANCE):
+    """
+    Purpose:    Check that the tolerances of a pattern are finite, non-negative numbers, as a NaN or infinite tolerance
+                would hide every difference in the matching columns
+    Modifies:   Nothing
+    Returns:    Tuple of the absolute and relative tolerance as floats
+    """
+    try:
+        absolute, relative = float(absolute), float(relative)
+    except (TypeError, ValueError):
+        raise ValueError(f"The tolerances of '{pattern}' must be numbers")
+    if not math.isfinite(absolute) or not math.isfinite(relative):
+        raise ValueError(f"The tolerances of '{pattern}' must be finite")
+    if absolute < 0 or relative < 0:
+        raise ValueError(f"The tolerances of '{pattern}' must not be negative")
+    return absolute, relative
+
+
+def parse_tolerance_argument(value):
+    """
+    Purpose:    Parse a --tolerance argument of the form COLUMN=ABSOLUTE or COLUMN=ABSOLUTE:RELATIVE, where COLUMN can be a pattern
+    Modifies:   Nothing
+    Returns:    Tuple of the pattern and a tuple of its absolute and relative tolerance
+    """
+    pattern, separator, tolerances = value.rpartition("=")
+    if not separator or not pattern:
+        raise argparse.ArgumentTypeError(
+            f"Invalid tolerance '{value}', expected COLUMN=ABSOLUTE or COLUMN=ABSOLUTE:RELATIVE"
+        )
+    try:
+        return pattern, parse_tolerance_values(pattern, *tolerances.split(":", 1))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def load_tolerance_file(tolerance_file):
+    """
+    Purpose:    Load the tolerances from a YAML or JSON file mapping each column or pattern to either its absolute
+                tolerance or a mapping with 'absolute' and/or 'relative' keys
+    Modifies:   Nothing
+    Returns:    Dictionary of each pattern to a tuple of its absolute and relative tolerance
+    """
+    import yaml
+
+    try:
+        with open(tolerance_file) as f:
+            config = yaml.safe_load(f) or {}
+    except Exception as e:
+        raise Exception(f"Error loading tolerance file {tolerance_file}: {e}")
+    if not isinstance(config, dict):
+        raise Exception(
+            f"Error loading tolerance file {tolerance_file}: expected a mapping of columns to tolerances"
+        )
+
+    tolerances = {}
+    for pattern, value in config.items():
+        if isinstance(value, dict):
+            unknown_keys = set(value) - {"absolute", "relative"}
+            if unknown_keys:
+                raise Exception(
+                    f"Error loading tolerance file {tolerance_file}: unknown keys {sorted(unknown_keys)} for '{pattern}'"
+                )
+            value = (
+                value.get("absolute", DEFAULT_ABSOLUTE_TOLERANCE),
+                value.get("relative", DEFAULT_RELATIVE_TOLERANCE),
+            )
+        else:
+            value = (value,)
+        try:
+            tolerances[str(pattern)] = parse_tolerance_values(pattern, *value)
+        except ValueError as e:
+            raise Exception(f"Error loading tolerance file {tolerance_file}: {e}")
+    return tolerances
+
+
+def get_column_tolerances(tolerance_file=None, tolerance_arguments=None):
+    """
+    Purpose:    Combine the tolerances of the tolerance file with those given on the command line, which take precedence
+    Modifies:   Nothing
+    Returns:    ColumnTolerances, or None if no tolerances are configured
+    """
+    tolerances = load_tolerance_file(tolerance_file) if tolerance_file else {}
+    tolerances.update(tolerance_arguments or [])
+    return ColumnTolerances(tolerances) if tolerances else None